@@ -32,14 +32,6 @@ class BrainstormerAgent(BaseAgent):
         with open(task_directory, "r") as file:
             minimal_task = file.read().strip()
 
-        graph, agent = get_agent(
-            model_name=model_name,
-            api_key=api_key,
-            system_prompt=system_prompt,
-            temperature=temperature,
-            include_graph=True,
-        )
-
         console = Console(width=CONSOLE_WIDTH)
         ui = AgentUI(console)
 
@@ -47,11 +39,10 @@ class BrainstormerAgent(BaseAgent):
             model_name=model_name,
             api_key=api_key,
             system_prompt=system_prompt,
-            agent=agent,
+            agent=None,
             console=console,
             ui=ui,
             get_agent=get_agent,
             temperature=temperature,
-            graph=graph,
         )
         self.minimal_task = minimal_task  # minimal default prompt for brainstorming
@@ -26,14 +26,6 @@ class CodeGenAgent(BaseAgent):
         temperature: float = 0,
     ):
 
-        graph, agent = get_agent(
-            model_name=model_name,
-            api_key=api_key,
-            system_prompt=system_prompt,
-            temperature=temperature,
-            include_graph=True,
-        )
-
         console = Console(width=CONSOLE_WIDTH)
         ui = AgentUI(console)
 
@@ -41,10 +33,9 @@ class CodeGenAgent(BaseAgent):
             model_name=model_name,
             api_key=api_key,
             system_prompt=system_prompt,
-            agent=agent,
+            agent=None,
             console=console,
             ui=ui,
             get_agent=get_agent,
             temperature=temperature,
-            graph=graph,
         )
@@ -1,4 +1,4 @@
-from app.src.config.create_base_agent import create_base_agent
+from app.src.config.agent_registry import agent_registry
 from app.src.agents.code_gen.config.tools import ALL_TOOLS
 import os
 
@@ -33,7 +33,7 @@ def get_agent(
         with open(os.path.join(dir, "system_prompt.txt"), "r") as file:
             system_prompt = file.read().strip()
 
-    return create_base_agent(
+    return agent_registry.get_agent(
         model_name=model_name,
         api_key=api_key,
         tools=tools,
@@ -1,15 +1,109 @@
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 from app.src.config.tools import FILE_TOOLS
+from app.src.config.worker_pool import worker_pool, DEFAULT_TIMEOUT
+from app.src.config.command_runner import run_command, CommandResult
+from app.src.config.process_manager import (
+    process_manager,
+    ManagedProcess,
+    ProcessError,
+    DEFAULT_READ_BYTES,
+    MAX_READ_BYTES,
+)
 from app.src.config.permissions import PermissionDeniedException, permission_manager
-import subprocess
-import tempfile
+from app.src.config.sandbox import sandbox
+from app.src.config.ui import command_progress
+import asyncio
+import signal
 import shlex
 import re
 import os
 
 
+EXECUTION_TIMEOUT = DEFAULT_TIMEOUT  # seconds
+
+DANGEROUS_CODE_PATTERNS = [
+    r"rm\s+-rf\s+/",
+    r"format\s+c:",
+    r"mkfs\s+/dev/",
+]
+
+EXTREMELY_DANGEROUS_COMMANDS = [
+    r"^rm\s+-rf\s+/$",
+    r"^dd\s+.*of=/dev/sd[a-z]$",
+    r"^mkfs\s+/dev/sd[a-z]$",
+    r"^fdisk\s+/dev/sd[a-z]$",
+    r":\(\)\{.*\}",
+]
+
+
+def _blocked(text: str, patterns: list[str]) -> str | None:
+    for pattern in patterns:
+        if re.search(pattern, text, re.IGNORECASE):
+            return f"🚫 BLOCKED: Extremely destructive operation: {pattern}"
+    return None
+
+
+def _format_output(stdout: str, stderr: str, returncode: int) -> str:
+    output = ""
+    if stdout:
+        output += f"Output:\n{stdout}"
+    if stderr:
+        output += f"\nErrors:\n{stderr}"
+    if returncode != 0:
+        output += f"\nReturn code: {returncode}"
+    return output.strip()
+
+
+def _usage_summary(elapsed: float, cpu_seconds: float | None, peak_rss_kb: int | None) -> str:
+    summary = f"Finished in {elapsed:.1f}s"
+    if cpu_seconds is not None:
+        summary += f", CPU {cpu_seconds:.1f}s"
+    if peak_rss_kb:
+        summary += f", peak memory {peak_rss_kb / 1024:.0f} MiB"
+    return summary
+
+
+def _cpu_limit_hit(returncode: int | None) -> bool:
+    """Whether a command was killed for exceeding RLIMIT_CPU, directly or under a shell."""
+    sigxcpu = getattr(signal, "SIGXCPU", None)
+    return sigxcpu is not None and returncode in (-sigxcpu, 128 + sigxcpu)
+
+
+def _run_code(code: str, session: bool, reset_session: bool, timeout: int, config) -> str:
+    timeout = max(1, min(timeout or EXECUTION_TIMEOUT, EXECUTION_TIMEOUT))
+    scope = None
+    if session or reset_session:
+        scope = ((config or {}).get("configurable") or {}).get("thread_id", "")
+    try:
+        result = worker_pool.run(
+            code, os.getcwd(), timeout=timeout, session=scope, reset=reset_session
+        )
+    except Exception as e:
+        return f"❌ Execution error: {str(e)}"
+
+    if result.timed_out:
+        output = f"⏰ Code execution timed out ({timeout} second limit exceeded)"
+        partial = _format_output(result.stdout, result.stderr, 0)
+        if partial:
+            output += f"\nPartial output before it was interrupted:\n{partial}"
+    else:
+        output = _format_output(result.stdout, result.stderr, result.returncode)
+        output = output or "Code executed successfully"
+    output += f"\n[{_usage_summary(result.duration, result.cpu_seconds, result.peak_rss_kb)}]"
+    if result.note:
+        output += f"\n[{result.note}]"
+    return output
+
+
 @tool
-def execute_code(code: str) -> str:
+def execute_code(
+    code: str,
+    session: bool = False,
+    reset_session: bool = False,
+    timeout: int = EXECUTION_TIMEOUT,
+    config: RunnableConfig = None,
+) -> str:
     """
     **PRIMARY PURPOSE**: Safely executes python code snippets in a controlled environment.
 
@@ -18,20 +112,32 @@ def execute_code(code: str) -> str:
     - Validating logic before implementing in files
     - Running data analysis or processing scripts
     - Executing safe computational tasks
+    - Iterative debugging, with session=True to keep state between calls
 
     **SECURITY RESTRICTIONS**:
     - TIMEOUT: Execution limited to 300 seconds maximum
-    - MEMORY: Basic memory usage monitoring
+    - MEMORY: Workers whose memory use grows too large are recycled
+    - SANDBOX: Each run may use 600 CPU seconds and 4 GiB of memory, 1024 open files;
+      temporary files go to a private scratch directory
+    - OUTPUT: stdout and stderr are each capped at 256 KiB per run
     - EXTREME CAUTION: Only blocks truly destructive operations
 
     **BEHAVIOR**:
-    - Executes code in isolated environment
-    - Captures both stdout and stderr
-    - Automatically times out long-running code
-    - Prevents access to sensitive system resources
+    - Runs in a pre-started python interpreter, in the current working directory,
+      with the workspace importable; installed packages earlier snippets imported
+      are already loaded, so runs start fast
+    - By default every run starts from a clean slate: nothing is kept afterwards
+    - With session=True, variables, functions and imports persist between calls
+      of this conversation, like notebook cells. Workspace modules imported in a
+      session are not reloaded when their files change (use importlib.reload)
+    - Captures both stdout and stderr, including output of subprocesses
+    - Timed out code is interrupted and its partial output returned
 
     **PARAMETERS**:
         code (str): The code to execute. Must be valid python code that is safe and non-malicious
+        session (bool, optional): Run in this conversation's persistent session (default False)
+        reset_session (bool, optional): Discard the session's state before running
+        timeout (int, optional): Seconds before the run is interrupted (default and maximum 300)
 
     **RETURNS**:
         str: Code output, error messages, or security violation warnings
@@ -40,55 +146,87 @@ def execute_code(code: str) -> str:
         execute_code("print('Hello World')")
         execute_code("result = 2 + 2; print(f'Result: {result}')")
         execute_code("for i in range(3): print(i)")
+        execute_code("import pandas as pd; df = pd.read_csv('data.csv')", session=True)
+        execute_code("print(df.describe())", session=True)
     """
     if not permission_manager.get_permission(tool_name="execute_code", code=code):
         raise PermissionDeniedException()
 
-    dangerous_patterns = [
-        r"rm\s+-rf\s+/",
-        r"format\s+c:",
-        r"mkfs\s+/dev/",
-    ]
+    if blocked := _blocked(code, DANGEROUS_CODE_PATTERNS):
+        return blocked
 
-    for pattern in dangerous_patterns:
-        if re.search(pattern, code, re.IGNORECASE):
-            return f"🚫 BLOCKED: Extremely destructive operation: {pattern}"
+    return _run_code(code, session, reset_session, timeout, config)
 
-    try:
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".py", delete=False
-        ) as tmp_file:
-            tmp_file.write(code)
-            tmp_file_path = tmp_file.name
-
-        result = subprocess.run(
-            ["python", tmp_file_path],
-            capture_output=True,
-            text=True,
-            timeout=300,
-            cwd=os.getcwd(),
+
+async def _aexecute_code(
+    code: str,
+    session: bool = False,
+    reset_session: bool = False,
+    timeout: int = EXECUTION_TIMEOUT,
+    config: RunnableConfig = None,
+) -> str:
+    """Async variant of execute_code; the blocking pool call runs in a thread."""
+    if not await permission_manager.aget_permission(tool_name="execute_code", code=code):
+        raise PermissionDeniedException()
+
+    if blocked := _blocked(code, DANGEROUS_CODE_PATTERNS):
+        return blocked
+
+    return await asyncio.to_thread(_run_code, code, session, reset_session, timeout, config)
+
+
+execute_code.coroutine = _aexecute_code
+
+
+def _format_command_result(result: CommandResult, timeout: int) -> str:
+    if result.timed_out:
+        output = (
+            f"⏰ Command execution timed out ({timeout} second limit exceeded); "
+            "the command and every process it started were stopped"
         )
+        partial = _format_output(result.stdout, result.stderr, 0)
+        if partial:
+            output += f"\nPartial output:\n{partial}"
+    else:
+        output = _format_output(result.stdout, result.stderr, result.returncode)
+        output = output or "Command executed successfully (no output)"
+
+    if _cpu_limit_hit(result.returncode):
+        output += (
+            f"\n[Stopped by the sandbox: CPU time limit of "
+            f"{sandbox.limits.cpu_seconds}s per process exceeded]"
+        )
+    output += f"\n[{_usage_summary(result.elapsed, result.cpu_seconds, result.peak_rss_kb)}]"
+    if result.detached_output:
+        output += (
+            "\n[Background processes started by the command are still running; "
+            "their later output is not captured]"
+        )
+    return output
 
-        os.unlink(tmp_file_path)  # cleanup
 
-        output = ""
-        if result.stdout:
-            output += f"Output:\n{result.stdout}"
-        if result.stderr:
-            output += f"\nErrors:\n{result.stderr}"
-        if result.returncode != 0:
-            output += f"\nReturn code: {result.returncode}"
+def _run_shell(command: str, timeout: int) -> str:
+    try:
+        parsed_command = shlex.split(command)
+    except ValueError as e:
+        return f"❌ Invalid command syntax: {str(e)}"
 
-        return output.strip() if output.strip() else "Code executed successfully"
+    if not parsed_command:
+        return "❌ Empty command"
 
-    except subprocess.TimeoutExpired:
-        return "⏰ Code execution timed out (300 second limit exceeded)"
+    timeout = max(1, min(timeout or EXECUTION_TIMEOUT, EXECUTION_TIMEOUT))
+    try:
+        with command_progress(command) as progress:
+            result = run_command(command, os.getcwd(), timeout=timeout, on_output=progress.feed)
+    except PermissionError:
+        return f"❌ Permission denied executing: {command}"
     except Exception as e:
         return f"❌ Execution error: {str(e)}"
+    return _format_command_result(result, timeout)
 
 
 @tool
-def execute_command(command: str) -> str:
+def execute_command(command: str, timeout: int = EXECUTION_TIMEOUT) -> str:
     """
     **PRIMARY PURPOSE**: Safely executes linux command-line commands in a controlled environment.
 
@@ -99,7 +237,11 @@ def execute_command(command: str) -> str:
     - Safe read-only operations
 
     **SECURITY RESTRICTIONS**:
-    - TIMEOUT: Commands limited to 300 seconds maximum
+    - TIMEOUT: Commands limited to 300 seconds maximum; on timeout the command and
+      every process it started are stopped
+    - SANDBOX: Each process may use 600 CPU seconds and 4 GiB of memory, 1024 open
+      files; temporary files go to a private scratch directory
+    - OUTPUT: Only the first 32 KiB and the last 96 KiB of each stream are kept
     - EXTREME ONLY: Only blocks filesystem destruction and hardware access
 
     **ALLOWED COMMANDS**:
@@ -113,13 +255,15 @@ def execute_command(command: str) -> str:
     - Development tools: git, make, gcc, python, node
 
     **BEHAVIOR**:
-    - Executes in isolated environment
-    - Captures both stdout and stderr
+    - Executes in isolated environment, in its own process group
+    - Streams stdout and stderr while the command runs (progress is shown to the user)
+    - Reports the elapsed time, CPU time and peak memory of the command
     - Automatically times out long-running commands
     - Prevents dangerous system modifications
 
     **PARAMETERS**:
         command (str): Shell command to execute (must be safe)
+        timeout (int, optional): Seconds before the command is stopped (default and maximum 300)
 
     **RETURNS**:
         str: Command output, error messages, or security violation warnings
@@ -137,63 +281,290 @@ def execute_command(command: str) -> str:
     ):
         raise PermissionDeniedException()
 
-    extremely_dangerous_commands = [
-        r"^rm\s+-rf\s+/$",
-        r"^dd\s+.*of=/dev/sd[a-z]$",
-        r"^mkfs\s+/dev/sd[a-z]$",
-        r"^fdisk\s+/dev/sd[a-z]$",
-        r":\(\)\{.*\}",
-    ]
+    if blocked := _blocked(command, EXTREMELY_DANGEROUS_COMMANDS):
+        return blocked
 
-    for pattern in extremely_dangerous_commands:
-        if re.search(pattern, command, re.IGNORECASE):
-            return f"🚫 BLOCKED: Extremely destructive operation: {pattern}"
+    return _run_shell(command, timeout)
 
-    try:
-        try:
-            parsed_command = shlex.split(command)
-        except ValueError as e:
-            return f"❌ Invalid command syntax: {str(e)}"
-
-        if not parsed_command:
-            return "❌ Empty command"
-
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            timeout=300,
-            shell=True,
-            cwd=os.getcwd(),
-        )
 
-        output = ""
-        if result.stdout:
-            output += f"Output:\n{result.stdout}"
-        if result.stderr:
-            output += f"\nErrors:\n{result.stderr}"
-        if result.returncode != 0:
-            output += f"\nReturn code: {result.returncode}"
-
-        return (
-            output.strip()
-            if output.strip()
-            else "Command executed successfully (no output)"
-        )
+async def _aexecute_command(command: str, timeout: int = EXECUTION_TIMEOUT) -> str:
+    """Async variant of execute_command; the streaming runner works in a thread."""
+    if not await permission_manager.aget_permission(
+        tool_name="execute_command", command=command
+    ):
+        raise PermissionDeniedException()
 
-    except subprocess.TimeoutExpired:
-        return "⏰ Command execution timed out (300 second limit exceeded)"
-    except FileNotFoundError:
-        return f"❌ Command not found: {parsed_command[0] if parsed_command else 'unknown'}"
-    except PermissionError:
-        return f"❌ Permission denied executing: {command}"
+    if blocked := _blocked(command, EXTREMELY_DANGEROUS_COMMANDS):
+        return blocked
+
+    return await asyncio.to_thread(_run_shell, command, timeout)
+
+
+execute_command.coroutine = _aexecute_command
+
+WAIT_TIMEOUT = 60  # seconds, default of wait_for_process
+WAIT_FAILURE_TAIL_BYTES = 2 * 1024  # output shown when a wait fails
+
+
+def _describe_process(managed: ManagedProcess) -> str:
+    return (
+        f"{managed.process_id}: `{managed.command}` {managed.status()}, "
+        f"{managed.log.end:,} bytes of output"
+    )
+
+
+def _output_tail(managed: ManagedProcess, size: int) -> str:
+    data, _, _ = managed.log.read(managed.log.end - size, size)
+    return data.decode("utf-8", errors="replace")
+
+
+@tool
+def start_process(command: str) -> str:
+    """
+    **PRIMARY PURPOSE**: Starts a long-running command (dev server, watcher, worker) in the background and returns a handle to it.
+
+    **WHEN TO USE**:
+    - Running a web server, API or database the project needs while you test it
+      (npm run dev, python manage.py runserver, uvicorn app:app, docker compose up)
+    - Any command that does not exit on its own; execute_command would block on
+      it until its timeout
+
+    **BEHAVIOR**:
+    - Runs the shell command in the working directory, in its own process group,
+      and returns immediately with a process id like "p1"
+    - stdout and stderr are merged and kept (the last 4 MiB) for read_process_output
+    - Follow with wait_for_process to know when the server is ready
+    - Stop it with stop_process when done; every process still running is
+      stopped when the session ends
+    - At most 8 background processes can run at the same time
+
+    **PARAMETERS**:
+        command (str): Shell command to start
+
+    **RETURNS**:
+        str: The process id and pid, or an error message
+
+    **EXAMPLES**:
+        start_process("npm run dev -- --port 5173")
+        start_process("python -m http.server 8000")
+        start_process("uvicorn app.main:app --port 8080")
+    """
+    if not permission_manager.get_permission(
+        tool_name="start_process", command=command
+    ):
+        raise PermissionDeniedException()
+
+    if blocked := _blocked(command, EXTREMELY_DANGEROUS_COMMANDS):
+        return blocked
+    if not command.strip():
+        return "❌ Empty command"
+
+    try:
+        managed = process_manager.start(command, os.getcwd())
+    except ProcessError as e:
+        return f"❌ {str(e)}"
     except Exception as e:
         return f"❌ Execution error: {str(e)}"
+    return (
+        f"✅ Started {managed.process_id} (pid {managed.process.pid}): `{command}`\n"
+        f"Use wait_for_process(\"{managed.process_id}\", port=...) or pattern=... to wait "
+        f"until it is ready and read_process_output(\"{managed.process_id}\") to see its output"
+    )
+
+
+@tool
+def read_process_output(
+    process_id: str, offset: int = None, max_bytes: int = DEFAULT_READ_BYTES
+) -> str:
+    """
+    **PRIMARY PURPOSE**: Reads the output of a background process started with start_process.
+
+    **WHEN TO USE**:
+    - Checking what a server logged (startup messages, requests, errors)
+    - Following new output since the last read, by passing the offset it returned
+
+    **BEHAVIOR**:
+    - Output is addressed by byte offsets counted from the start of the process
+    - Without an offset, returns the most recent output (the last max_bytes)
+    - With an offset, returns output from there on and the offset to continue from
+    - Only the last 4 MiB of output are kept; older offsets say how much was lost
+
+    **PARAMETERS**:
+        process_id (str): Id returned by start_process, like "p1"
+        offset (int, optional): Byte offset to read from (default: the tail)
+        max_bytes (int, optional): Maximum bytes to return (default 12 KiB, maximum 64 KiB)
+
+    **RETURNS**:
+        str: A header with the process status and byte range, the output, and the
+             offset to continue from, or an error message
+
+    **EXAMPLES**:
+        read_process_output("p1")
+        read_process_output("p1", offset=5120)
+    """
+    try:
+        managed = process_manager.get(process_id)
+    except ProcessError as e:
+        return f"[ERROR] {str(e)}"
+
+    max_bytes = max(1, min(max_bytes or DEFAULT_READ_BYTES, MAX_READ_BYTES))
+    end = managed.log.end
+    if offset is None:
+        offset = end - max_bytes
+    data, start, dropped = managed.log.read(offset, max_bytes)
+    following = start + len(data)
+
+    parts = [
+        f"[{_describe_process(managed)} | bytes {start:,}-{following:,}]"
+    ]
+    if dropped:
+        parts.append(f"[{dropped:,} bytes before this are no longer kept]")
+    parts.append(data.decode("utf-8", errors="replace") if data else "(no output)")
+    if following < managed.log.end:
+        parts.append(f"[... more output follows, continue with offset={following} ...]")
+    else:
+        parts.append(f"[end of output so far; read what comes next with offset={following}]")
+    return "\n".join(parts)
+
+
+def _wait_for_process(
+    process_id: str, port: int = None, pattern: str = None, timeout: int = WAIT_TIMEOUT
+) -> str:
+    try:
+        managed = process_manager.get(process_id)
+        timeout = max(1, min(timeout or WAIT_TIMEOUT, EXECUTION_TIMEOUT))
+        ready, detail = process_manager.wait(
+            process_id, timeout, port=port, pattern=pattern
+        )
+    except ProcessError as e:
+        return f"[ERROR] {str(e)}"
+    except re.error as e:
+        return f"[ERROR] Invalid pattern: {str(e)}"
+
+    if ready:
+        return f"✅ {managed.process_id}: {detail}"
+    output = f"❌ {managed.process_id}: {detail}"
+    tail = _output_tail(managed, WAIT_FAILURE_TAIL_BYTES)
+    if tail:
+        output += f"\nLast output:\n{tail}"
+    return output
+
+
+@tool
+def wait_for_process(
+    process_id: str, port: int = None, pattern: str = None, timeout: int = WAIT_TIMEOUT
+) -> str:
+    """
+    **PRIMARY PURPOSE**: Waits until a background process is ready: a port accepts connections or its output matches a pattern.
+
+    **WHEN TO USE**:
+    - After start_process, before sending requests to the server
+    - Waiting for a build or watcher to report it finished ("compiled successfully")
+    - Waiting for a background process to exit (give neither port nor pattern)
+
+    **BEHAVIOR**:
+    - Polls until the condition holds, the process exits or the timeout passes
+    - Returns as soon as the process exits, instead of waiting out the timeout,
+      with its exit code and last output
+    - The pattern is a regular expression searched in all output kept so far
+
+    **PARAMETERS**:
+        process_id (str): Id returned by start_process, like "p1"
+        port (int, optional): Local TCP port that should accept connections
+        pattern (str, optional): Regular expression the output should match
+        timeout (int, optional): Seconds to wait (default 60, maximum 300)
+
+    **RETURNS**:
+        str: What happened, with the last output of the process when it is not ready
+
+    **EXAMPLES**:
+        wait_for_process("p1", port=8000)
+        wait_for_process("p1", pattern="(?i)ready|listening on")
+        wait_for_process("p2", timeout=120)
+    """
+    return _wait_for_process(process_id, port, pattern, timeout)
+
+
+async def _await_for_process(
+    process_id: str, port: int = None, pattern: str = None, timeout: int = WAIT_TIMEOUT
+) -> str:
+    """Async variant of wait_for_process; polling works in a thread."""
+    return await asyncio.to_thread(_wait_for_process, process_id, port, pattern, timeout)
+
+
+wait_for_process.coroutine = _await_for_process
+
+
+@tool
+def stop_process(process_id: str) -> str:
+    """
+    **PRIMARY PURPOSE**: Stops a background process started with start_process, and every process it started.
+
+    **WHEN TO USE**:
+    - When you are done testing against a server
+    - To restart a server after changing its code (stop it, then start it again)
+
+    **BEHAVIOR**:
+    - Sends SIGTERM to the process group, then SIGKILL after 5 seconds
+    - Its output stays readable with read_process_output
+
+    **PARAMETERS**:
+        process_id (str): Id returned by start_process, like "p1"
+
+    **RETURNS**:
+        str: The final status of the process, or an error message
+
+    **EXAMPLES**:
+        stop_process("p1")
+    """
+    try:
+        managed = process_manager.get(process_id)
+    except ProcessError as e:
+        return f"[ERROR] {str(e)}"
+    was_running = managed.alive
+    process_manager.stop(process_id)
+    if not was_running:
+        return f"{_describe_process(managed)} (it was no longer running)"
+    return f"✅ {_describe_process(managed)}"
+
+
+async def _astop_process(process_id: str) -> str:
+    """Async variant of stop_process; stopping can wait out the grace period."""
+    return await asyncio.to_thread(stop_process.func, process_id)
+
+
+stop_process.coroutine = _astop_process
+
+
+@tool
+def list_processes() -> str:
+    """
+    **PRIMARY PURPOSE**: Lists the background processes started with start_process and their status.
+
+    **WHEN TO USE**:
+    - To find the id of a server you started earlier
+    - To check which processes are still running or how they exited
+
+    **RETURNS**:
+        str: One line per process with its id, command, status and output size
+
+    **EXAMPLES**:
+        list_processes()
+    """
+    processes = process_manager.list()
+    if not processes:
+        return "No background processes"
+    return "\n".join(_describe_process(managed) for managed in processes)
 
 
 EXECUTION_TOOLS = [
     execute_code,
     execute_command,
+    start_process,
+    read_process_output,
+    wait_for_process,
+    stop_process,
+    list_processes,
 ]
 
 ALL_TOOLS = FILE_TOOLS + EXECUTION_TOOLS
@@ -1,4 +1,4 @@
-from app.src.config.create_base_agent import create_base_agent
+from app.src.config.agent_registry import agent_registry
 from app.src.agents.web_searcher.config.tools import search_and_scrape
 import os
 
@@ -35,7 +35,7 @@ def get_agent(
         with open(os.path.join(dir, "system_prompt.txt"), "r") as file:
             system_prompt = file.read().strip()
 
-    return create_base_agent(
+    return agent_registry.get_agent(
         model_name=model_name,
         api_key=api_key,
         tools=tools,
@@ -1,9 +1,15 @@
 from langchain_core.tools import tool
+from app.src.config.http_client import http_session, request_deadline
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from urllib.parse import urlsplit
 from typing import List, Dict
 from bs4 import BeautifulSoup
-import requests
 from dotenv import load_dotenv
 from pathlib import Path
+import threading
+import asyncio
+import time
 import os
 
 
@@ -23,15 +29,23 @@ if not CX_ID:
 
 
 ENDPOINT = "https://customsearch.googleapis.com/customsearch/v1"
-TIMEOUT = 10  # seconds
+TIMEOUT = 10  # seconds, per request
+MAX_RESULTS = 5
+SEARCH_DEADLINE = 20  # seconds for the search and all page fetches together
+MAX_FETCH_WORKERS = 16
+MAX_FETCHES_PER_HOST = 2
+MAX_PAGE_BYTES = 2 * 1024 * 1024  # larger pages are cut here
+PAGE_TEXT_CHARS = 1000
+READ_CHUNK = 64 * 1024
 
 
-def google_search(query: str, n: int = 5) -> List[Dict[str, str]]:
+def google_search(query: str, n: int = 5, deadline: float | None = None) -> List[Dict[str, str]]:
     """Search Google and return structured results.
     
     Args:
         query: Search query string
         n: Maximum number of results to return
+        deadline: time.monotonic() value after which no request or retry starts
         
     Returns:
         List of dictionaries with 'title' and 'link' keys
@@ -39,6 +53,7 @@ def google_search(query: str, n: int = 5) -> List[Dict[str, str]]:
     Raises:
         ValueError: If API key or search engine ID not configured
         requests.HTTPError: If search request fails
+        TimeoutError: If the deadline passed
     """
 
     if not GGL_API_KEY or not CX_ID:
@@ -57,7 +72,13 @@ def google_search(query: str, n: int = 5) -> List[Dict[str, str]]:
             "num": batch,
             "start": start,
         }
-        resp = requests.get(ENDPOINT, params=payload, timeout=TIMEOUT)
+        timeout = TIMEOUT
+        if deadline is not None:
+            timeout = min(TIMEOUT, deadline - time.monotonic())
+            if timeout <= 0:
+                raise TimeoutError("search deadline passed")
+        with request_deadline(deadline):
+            resp = http_session.get(ENDPOINT, params=payload, timeout=timeout)
         resp.raise_for_status()
         data = resp.json()
 
@@ -79,53 +100,184 @@ def google_search(query: str, n: int = 5) -> List[Dict[str, str]]:
     return results
 
 
-def fetch_page_text(url: str) -> str:
+@dataclass
+class PageFetch:
+    """Outcome of fetching one result page.
+
+    ``elapsed`` is None when the fetch did not finish before the deadline.
+    """
+
+    url: str
+    text: str | None = None
+    error: str | None = None
+    elapsed: float | None = None
+
+
+# shared, so fetches still running after a deadline do not hold up the next search
+_fetch_pool = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS, thread_name_prefix="page-fetch")
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_host_slots_lock = threading.Lock()
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc.lower()
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MAX_FETCHES_PER_HOST)
+        return _host_slots[host]
+
+
+def _download(url: str, deadline: float) -> tuple[bytes, str | None]:
+    """Download a page, giving up at the deadline even while the body is arriving.
+
+    Returns:
+        The body, up to MAX_PAGE_BYTES, and its declared encoding
+
+    Raises:
+        TimeoutError: If the deadline passed
+        requests.RequestException: If the request fails
+    """
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("deadline passed before the request started")
+    with request_deadline(deadline), http_session.get(
+        url, timeout=min(TIMEOUT, remaining), stream=True
+    ) as response:
+        response.raise_for_status()  # Raise an exception for bad status codes
+        chunks, size = [], 0
+        for chunk in response.iter_content(READ_CHUNK):
+            if time.monotonic() >= deadline:
+                raise TimeoutError("page was still downloading at the deadline")
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= MAX_PAGE_BYTES:
+                break
+        # without a declared charset, let BeautifulSoup detect it from the markup
+        declared = "charset" in response.headers.get("content-type", "").lower()
+        return b"".join(chunks), response.encoding if declared else None
+
+
+def _page_text(content: bytes, encoding: str | None) -> str:
+    soup = BeautifulSoup(content, "html.parser", from_encoding=encoding)
+    # kill script/style
+    for s in soup(["script", "style", "noscript"]):
+        s.decompose()
+    text = soup.get_text(separator=" ")
+    return ("\n".join(line.strip() for line in text.splitlines() if line.strip()))[
+        :PAGE_TEXT_CHARS
+    ]
+
+
+def fetch_page_text(url: str, deadline: float | None = None) -> str:
     """Extract text content from a web page.
-    
+
     Args:
         url: URL to scrape
-        
+        deadline: time.monotonic() value to give up at (default: TIMEOUT from now)
+
     Returns:
         Cleaned text content (max 1000 chars) or error message
     """
-
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        html = response.text
-        soup = BeautifulSoup(html, "html.parser")
-        # kill script/style
-        for s in soup(["script", "style", "noscript"]):
-            s.decompose()
-        text = soup.get_text(separator=" ")
-        res = ("\n".join(line.strip() for line in text.splitlines() if line.strip()))[
-            :1000
-        ]
-        return res
-
+        return _page_text(*_download(url, deadline or time.monotonic() + TIMEOUT))
     except Exception as e:
         return f"[ERROR] Failed to scrape {url}: {str(e)}"
 
 
+def _fetch(url: str, deadline: float) -> PageFetch:
+    start = time.monotonic()
+    slot = _host_slot(url)
+    if not slot.acquire(timeout=max(0, deadline - start)):
+        # other pages of the host took up its connections until the deadline
+        return PageFetch(url)
+    try:
+        text = _page_text(*_download(url, deadline))
+        return PageFetch(url, text=text, elapsed=time.monotonic() - start)
+    except Exception as e:
+        return PageFetch(url, error=str(e), elapsed=time.monotonic() - start)
+    finally:
+        slot.release()
+
+
+def fetch_pages(urls: List[str], deadline: float) -> List[PageFetch]:
+    """Fetch pages concurrently, at most MAX_FETCHES_PER_HOST at a time per host.
+
+    Returns at the deadline at the latest, with the pages that finished by
+    then; fetches still running are abandoned and their results dropped.
+
+    Args:
+        urls: Pages to fetch
+        deadline: time.monotonic() value to stop waiting at
+
+    Returns:
+        One PageFetch per URL, in order
+    """
+    futures = [_fetch_pool.submit(_fetch, url, deadline) for url in urls]
+    done, _ = wait(futures, timeout=max(0, deadline - time.monotonic()))
+    return [
+        future.result() if future in done else PageFetch(url)
+        for url, future in zip(urls, futures)
+    ]
+
+
+def _describe_fetch(page: PageFetch) -> str:
+    if page.elapsed is None:
+        return f"not fetched within the {SEARCH_DEADLINE}s deadline"
+    if page.error is not None:
+        return f"failed after {page.elapsed:.1f}s"
+    return f"fetched in {page.elapsed:.1f}s"
+
+
+def _format_results(
+    search_results: List[Dict[str, str]], pages: List[PageFetch], elapsed: float
+) -> str:
+    fetched = sum(page.text is not None for page in pages)
+    formatted_results = "This answer is possibly incomplete. Consider refining search terms if needed.\n"
+    formatted_results += f"Fetched {fetched} of {len(pages)} pages in {elapsed:.1f}s.\n\n"
+    # Let's structure the results nicely for the agent:
+    for r, page in zip(search_results, pages):
+        if page.text is not None:
+            content = page.text
+        elif page.error is not None:
+            content = f"[ERROR] Failed to scrape {page.url}: {page.error}"
+        else:
+            content = "[not fetched in time]"
+        formatted_results += f"Title: {r['title']}\n"
+        formatted_results += f"Source: {r['link']} ({_describe_fetch(page)})\n"
+        formatted_results += f"Content: {content}\n\n"
+    return formatted_results
+
+
+def _search_and_scrape(query: str) -> str:
+    start = time.monotonic()
+    deadline = start + SEARCH_DEADLINE
+    search_results = google_search(query, MAX_RESULTS, deadline)
+    pages = fetch_pages([r["link"] for r in search_results], deadline)
+    return _format_results(search_results, pages, time.monotonic() - start)
+
+
 @tool
 def search_and_scrape(query: str) -> str:
     """
     Search Google for a query and get the top results structured as "title" and "content".
     This tool is used to extract information from all sources across the web.
+    Pages are fetched concurrently; the search returns within about 20 seconds with the
+    pages that loaded by then, each with its source URL and fetch time.
     Args:
         query (str): The search query to use.
     """
     try:
-        search_results = google_search(query, 5)
-        for r in search_results:
-            r["full_text"] = fetch_page_text(r["link"])
+        return _search_and_scrape(query)
+    except Exception as e:
+        return f"[ERROR] Failed to perform web search: {str(e)}"
 
-        formatted_results = "This answer is possibly incomplete. Consider refining search terms if needed.\n\n"
-        # search_results has "title" and "full_text" keys. Let's structure it nicely for the agent:
-        for r in search_results:
-            formatted_results += f"Title: {r['title']}\n"
-            formatted_results += f"Content: {r['full_text']}\n\n"
 
-        return formatted_results
+async def _asearch_and_scrape(query: str) -> str:
+    """Async variant of search_and_scrape; the fetches run on the shared thread pool."""
+    try:
+        return await asyncio.to_thread(_search_and_scrape, query)
     except Exception as e:
         return f"[ERROR] Failed to perform web search: {str(e)}"
+
+
+search_and_scrape.coroutine = _asearch_and_scrape
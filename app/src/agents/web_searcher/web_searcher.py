@@ -25,14 +25,6 @@ class WebSearcherAgent(BaseAgent):
         system_prompt: str = None,
         temperature: float = 0,
     ):
-        graph, agent = get_agent(
-            model_name=model_name,
-            api_key=api_key,
-            system_prompt=system_prompt,
-            temperature=temperature,
-            include_graph=True,
-        )
-
         console = Console(width=CONSOLE_WIDTH)
         ui = AgentUI(console)
 
@@ -40,10 +32,9 @@ class WebSearcherAgent(BaseAgent):
             model_name=model_name,
             api_key=api_key,
             system_prompt=system_prompt,
-            agent=agent,
+            agent=None,
             console=console,
             ui=ui,
             get_agent=get_agent,
             temperature=temperature,
-            graph=graph,
         )
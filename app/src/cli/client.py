@@ -1,6 +1,10 @@
 from app.src.config.agent_factory import AgentFactory
 from app.src.orchestration.orchestrated_codegen import CodeGenUnit
 from app.src.config.ui import AgentUI
+from app.src.config.checkpointer import configure_checkpointer, DEFAULT_RETENTION
+from app.src.config.context_manager import context_manager, DEFAULT_TOKEN_BUDGET
+from app.src.config.llm_cache import configure_llm_cache, DEFAULT_CACHE_BUDGET
+from app.src.config.rate_limiter import request_scheduler, DEFAULT_RPM, DEFAULT_TPM
 from app.utils.ascii_art import ASCII_ART
 from app.utils.constants import CONSOLE_WIDTH, UI_MESSAGES
 from rich.console import Console
@@ -30,6 +34,16 @@ class CLI:
         codegen_system_prompt: str = None,
         brainstormer_system_prompt: str = None,
         web_searcher_system_prompt: str = None,
+        checkpointer: str = "memory",
+        checkpoint_path: str = None,
+        checkpoint_retention: int = DEFAULT_RETENTION,
+        checkpoint_max_bytes: int = None,
+        context_token_budget: int = DEFAULT_TOKEN_BUDGET,
+        llm_cache: str = "off",
+        llm_cache_path: str = None,
+        llm_cache_max_bytes: int = DEFAULT_CACHE_BUDGET,
+        rate_limit_rpm: int = DEFAULT_RPM,
+        rate_limit_tpm: int = DEFAULT_TPM,
     ):
         self.mode = mode
         self.stream = stream
@@ -37,6 +51,18 @@ class CLI:
         self.console = Console(width=CONSOLE_WIDTH)
         self.ui = AgentUI(self.console)
 
+        configure_checkpointer(
+            backend=checkpointer,
+            path=checkpoint_path,
+            retention=checkpoint_retention,
+            max_bytes=checkpoint_max_bytes,
+        )
+        context_manager.token_budget = context_token_budget
+        configure_llm_cache(
+            mode=llm_cache, path=llm_cache_path, max_bytes=llm_cache_max_bytes
+        )
+        request_scheduler.configure(rpm=rate_limit_rpm, tpm=rate_limit_tpm)
+
         if mode == "coding":
             self._validate_coding_config(
                 api_key=api_key,
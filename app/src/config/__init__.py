@@ -1,8 +1,11 @@
 from app.src.config.create_base_agent import create_base_agent, State
 from app.src.config.ui import AgentUI
+from app.src.config.agent_registry import agent_registry, AgentRegistry
 
 __all__ = [
     "create_base_agent",
     "State",
     "AgentUI",
+    "agent_registry",
+    "AgentRegistry",
 ]
\ No newline at end of file
@@ -0,0 +1,196 @@
+from app.src.config.create_base_agent import create_base_agent
+from app.src.config.checkpointer import get_checkpointer
+from app.src.config.llm_cache import get_llm_cache
+from app.src.config.rate_limiter import request_scheduler
+from langgraph.graph.state import CompiledStateGraph
+from langchain_cerebras import ChatCerebras
+from langgraph.graph import StateGraph
+from dataclasses import dataclass
+import threading
+import hashlib
+import httpx
+import time
+
+
+PROVIDER = "cerebras"
+MAX_CONNECTIONS = 20  # per provider and API key
+MAX_KEEPALIVE_CONNECTIONS = 10
+
+
+@dataclass
+class BuildRecord:
+    """Timing information for a single compiled graph."""
+
+    model_name: str
+    temperature: float
+    tools: tuple[str, ...]
+    duration: float
+    hits: int = 0
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256((value or "").encode("utf-8")).hexdigest()[:16]
+
+
+class AgentRegistry:
+    """Process-wide cache of compiled agent graphs and LLM clients.
+
+    Graphs are keyed by (model, temperature, tool set, system prompt, API
+    key, checkpointer) so identical agents are compiled once. LLM clients are
+    shared per (model, temperature, API key) and all of them reuse one pooled
+    HTTP client per provider and API key and the rate limiter of their key
+    and model.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._http_clients: dict[tuple, httpx.Client] = {}
+        self._async_http_clients: dict[tuple, httpx.AsyncClient] = {}
+        self._llms: dict[tuple, ChatCerebras] = {}
+        self._agents: dict[tuple, tuple[StateGraph, CompiledStateGraph, list]] = {}
+        self._records: dict[tuple, BuildRecord] = {}
+
+    def get_http_client(self, api_key: str, provider: str = PROVIDER) -> httpx.Client:
+        """Return the pooled keep-alive HTTP client for a provider and API key."""
+        key = (provider, _digest(api_key))
+        with self._lock:
+            if key not in self._http_clients:
+                self._http_clients[key] = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    ),
+                    timeout=None,
+                )
+            return self._http_clients[key]
+
+    def get_async_http_client(
+        self, api_key: str, provider: str = PROVIDER
+    ) -> httpx.AsyncClient:
+        """Return the pooled async HTTP client for a provider and API key."""
+        key = (provider, _digest(api_key))
+        with self._lock:
+            if key not in self._async_http_clients:
+                self._async_http_clients[key] = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    ),
+                    timeout=None,
+                )
+            return self._async_http_clients[key]
+
+    def get_llm(self, model_name: str, api_key: str, temperature: float = 0) -> ChatCerebras:
+        """Return a shared chat model client for the given settings."""
+        cache = get_llm_cache()
+        key = (PROVIDER, model_name, temperature, _digest(api_key), id(cache))
+        with self._lock:
+            if key not in self._llms:
+                self._llms[key] = ChatCerebras(
+                    model=model_name,
+                    temperature=temperature,
+                    timeout=None,
+                    max_retries=5,
+                    api_key=api_key,
+                    http_client=self.get_http_client(api_key),
+                    http_async_client=self.get_async_http_client(api_key),
+                    cache=cache,
+                    rate_limiter=request_scheduler.limiter(api_key, model_name),
+                )
+            return self._llms[key]
+
+    def get_agent(
+        self,
+        model_name: str,
+        api_key: str,
+        tools: list,
+        system_prompt: str,
+        temperature: float = 0,
+        include_graph: bool = False,
+    ) -> CompiledStateGraph | tuple[StateGraph, CompiledStateGraph]:
+        """Return a compiled agent graph, building it only on the first request.
+
+        Args:
+            model_name: The name of the model to use
+            api_key: The API key for the model
+            tools: List of tools to be used by the agent
+            system_prompt: System prompt for the agent
+            temperature: Temperature for the model
+            include_graph: Whether to include the graph in the response
+
+        Returns:
+            Compiled state graph agent or tuple of (graph, compiled_graph)
+        """
+        # tools are keyed by identity: two closures named "call_searcher" bound
+        # to different searchers must not share a graph
+        tool_key = tuple((t.name, id(t)) for t in tools or [])
+        checkpointer = get_checkpointer()
+        key = (
+            model_name,
+            temperature,
+            tool_key,
+            _digest(system_prompt),
+            _digest(api_key),
+            id(checkpointer),
+            id(get_llm_cache()),
+        )
+
+        with self._lock:
+            if key in self._agents:
+                self._records[key].hits += 1
+            else:
+                start = time.perf_counter()
+                graph, compiled = create_base_agent(
+                    model_name=model_name,
+                    api_key=api_key,
+                    tools=tools,
+                    system_prompt=system_prompt,
+                    temperature=temperature,
+                    include_graph=True,
+                    llm=self.get_llm(model_name, api_key, temperature),
+                    checkpointer=checkpointer,
+                )
+                # keep the tools referenced so their ids stay unique
+                self._agents[key] = (graph, compiled, list(tools or []))
+                self._records[key] = BuildRecord(
+                    model_name=model_name,
+                    temperature=temperature,
+                    tools=tuple(name for name, _ in tool_key),
+                    duration=time.perf_counter() - start,
+                )
+            graph, compiled, _ = self._agents[key]
+
+        if include_graph:
+            return graph, compiled
+        return compiled
+
+    def build_records(self) -> list[BuildRecord]:
+        """Return timing records for every graph built so far."""
+        with self._lock:
+            return list(self._records.values())
+
+    def report(self) -> str:
+        """Human readable summary of graph builds and cache hits."""
+        lines = []
+        for record in self.build_records():
+            lines.append(
+                f"{record.model_name} (t={record.temperature}, "
+                f"{len(record.tools)} tools): built in {record.duration * 1000:.1f} ms, "
+                f"{record.hits} cache hits"
+            )
+        return "\n".join(lines) if lines else "No agents built yet."
+
+    def clear(self):
+        """Drop cached graphs and clients and close pooled connections."""
+        with self._lock:
+            for client in self._http_clients.values():
+                client.close()
+            self._http_clients.clear()
+            # async clients are closed by their event loop; just drop them here
+            self._async_http_clients.clear()
+            self._llms.clear()
+            self._agents.clear()
+            self._records.clear()
+
+
+agent_registry = AgentRegistry()
@@ -1,15 +1,30 @@
 from app.utils.ascii_art import ASCII_ART
 from app.src.config.exception_handler import AgentExceptionHandler
+from app.src.config.workspace_cache import workspace_cache
+from app.src.config.toolcall_parser import toolcall_stats
+from app.src.config.tool_output import tool_outputs
+from app.src.config.worker_pool import worker_pool
+from app.src.config.process_manager import process_manager
+from app.src.config.sandbox import sandbox
+from app.src.config.rate_limiter import request_scheduler
+from app.src.config.llm_cache import get_llm_cache
+from app.src.config.snapshots import get_journal
 from langchain_core.messages import AIMessage, ToolMessage, BaseMessage
 from langgraph.graph.state import CompiledStateGraph
 from typing import Union, Callable
 from langgraph.graph import StateGraph
-from app.src.config.ui import AgentUI
+from app.src.config.ui import AgentUI, TokenStreamView, rendering
 from rich.console import Console
+import asyncio
 import uuid
+import time
 import os
 
 
+# token chunks from the llm node plus the per-node state updates
+STREAM_MODES = ["messages", "updates"]
+
+
 class BaseAgent:
     """Base class for all agent implementations.
 
@@ -22,7 +37,7 @@ class BaseAgent:
         model_name: str,
         api_key: str,
         system_prompt: str,
-        agent: CompiledStateGraph,
+        agent: CompiledStateGraph | None,
         console: Console,
         ui: AgentUI,
         get_agent: Callable,
@@ -32,12 +47,56 @@ class BaseAgent:
         self.model_name = model_name
         self.api_key = api_key
         self.system_prompt = system_prompt
-        self.agent = agent
         self.console = console
         self.ui = ui
         self.get_agent = get_agent
         self.temperature = temperature
-        self.graph = graph
+        self.extra_tools = []
+        self._agent = agent
+        self._graph = graph
+
+    @property
+    def agent(self) -> CompiledStateGraph:
+        """Compiled graph, built lazily through the agent registry."""
+        if self._agent is None:
+            self._build_agent()
+        return self._agent
+
+    @agent.setter
+    def agent(self, value: CompiledStateGraph):
+        self._agent = value
+
+    @property
+    def graph(self) -> StateGraph:
+        if self._graph is None:
+            self._build_agent()
+        return self._graph
+
+    @graph.setter
+    def graph(self, value: StateGraph):
+        self._graph = value
+
+    def add_tools(self, tools: list):
+        """Register extra tools; the graph is rebuilt on next use."""
+        new_tools = [t for t in tools if t not in self.extra_tools]
+        if new_tools:
+            self.extra_tools.extend(new_tools)
+            self.reset_agent()
+
+    def reset_agent(self):
+        """Drop the current graph so the next access fetches a matching one."""
+        self._agent = None
+        self._graph = None
+
+    def _build_agent(self):
+        self._graph, self._agent = self.get_agent(
+            model_name=self.model_name,
+            api_key=self.api_key,
+            system_prompt=self.system_prompt,
+            extra_tools=self.extra_tools or None,
+            temperature=self.temperature,
+            include_graph=True,
+        )
 
     def start_chat(
         self, recursion_limit: int = 100, config: dict = None, show_welcome: bool = True
@@ -52,12 +111,22 @@ class BaseAgent:
             "recursion_limit": recursion_limit,
         }
 
-        continue_flag = False
+        resume = False
 
         while True:
             try:
-                user_input = self._get_user_input(continue_flag)
-                continue_flag = False
+                if resume and self.has_pending_run(configuration):
+                    resume = False
+                    self.ui.status_message(
+                        title="Continuing Session",
+                        message="Resuming from the last completed step...",
+                        style="primary",
+                    )
+                    self._stream(None, configuration)
+                    continue
+
+                user_input = self._get_user_input(resume)
+                resume = False
 
                 if not user_input:
                     continue
@@ -65,29 +134,76 @@ class BaseAgent:
                 if self._handle_command(user_input, configuration):
                     continue
 
-                self.ui.tmp_msg("Working on the task...", 2)
+                self._stream({"messages": [("human", user_input)]}, configuration)
 
-                for chunk in self.agent.stream(
-                    {"messages": [("human", user_input)]}, configuration
+            except KeyboardInterrupt:
+                self.ui.session_interrupted()
+                self.ui.goodbye()
+                return True
+            except Exception as e:
+                _, resume = AgentExceptionHandler.handle_exception(e, self.ui)
+                if not resume:
+                    return False
+
+    async def astart_chat(
+        self, recursion_limit: int = 100, config: dict = None, show_welcome: bool = True
+    ) -> bool:
+        """Async variant of start_chat; prompts run in a worker thread."""
+        if show_welcome:
+            self.ui.logo(ASCII_ART)
+            self.ui.help(self.model_name)
+
+        configuration = config or {
+            "configurable": {"thread_id": str(uuid.uuid4())},
+            "recursion_limit": recursion_limit,
+        }
+
+        resume = False
+
+        while True:
+            try:
+                if resume and await self.ahas_pending_run(configuration):
+                    resume = False
+                    self.ui.status_message(
+                        title="Continuing Session",
+                        message="Resuming from the last completed step...",
+                        style="primary",
+                    )
+                    await self._astream(None, configuration)
+                    continue
+
+                user_input = await asyncio.to_thread(self._get_user_input, resume)
+                resume = False
+
+                if not user_input:
+                    continue
+
+                if await asyncio.to_thread(
+                    self._handle_command, user_input, configuration
                 ):
-                    self._display_chunk(chunk)
+                    continue
 
-            except KeyboardInterrupt:
+                await self._astream(
+                    {"messages": [("human", user_input)]}, configuration
+                )
+
+            except (KeyboardInterrupt, asyncio.CancelledError):
                 self.ui.session_interrupted()
                 self.ui.goodbye()
                 return True
-            except Exception:
-                result, should_continue = AgentExceptionHandler.handle_agent_exceptions(
-                    lambda: None, self.ui, propagate=False
+            except Exception as e:
+                _, resume = await asyncio.to_thread(
+                    AgentExceptionHandler.handle_exception, e, self.ui
                 )
-                if should_continue:
-                    continue_flag = True
-                    continue
-                if result is None:
+                if not resume:
                     return False
 
     def _get_user_input(self, continue_flag: bool) -> str:
-        """Get user input, handling continuation scenarios."""
+        """Get user input, handling continuation scenarios.
+
+        Only used to continue when there is no interrupted run to resume,
+        e.g. with a checkpointer that did not survive a restart.
+        """
         if continue_flag:
             self.ui.status_message(
                 title="Continuing Session",
@@ -108,7 +224,9 @@ class BaseAgent:
             return True
 
         if user_input.lower() == "/clear":
+            old_thread_id = configuration["configurable"]["thread_id"]
             configuration["configurable"]["thread_id"] = str(uuid.uuid4())
+            self.discard_thread(old_thread_id)
             self.ui.history_cleared()
             return True
 
@@ -120,6 +238,16 @@ class BaseAgent:
             self.ui.help(self.model_name)
             return True
 
+        if user_input.lower() == "/stats":
+            self.ui.status_message(title="Statistics", message=self._stats_report())
+            return True
+
+        if user_input.lower() == "/snapshots":
+            return self._handle_snapshots_command()
+
+        if user_input.lower().startswith("/rollback"):
+            return self._handle_rollback_command(user_input)
+
         if user_input.lower().startswith("/model"):
             return self._handle_model_command(user_input)
 
@@ -129,6 +257,111 @@ class BaseAgent:
 
         return False
 
+    def _stats_report(self) -> str:
+        llm_cache = get_llm_cache()
+        if llm_cache is None:
+            llm_cache_line = "off"
+        else:
+            stats = llm_cache.stats()
+            llm_cache_line = (
+                f"{stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries"
+            )
+        return "\n".join(
+            [
+                f"Workspace cache: {workspace_cache.report()}",
+                f"LLM cache: {llm_cache_line}",
+                f"Tool calls: {toolcall_stats.report()}",
+                f"Tool outputs: {tool_outputs.report()}",
+                f"Python workers: {worker_pool.report()}",
+                f"Background processes: {process_manager.report()}",
+                f"Sandbox: {sandbox.report()}",
+                f"Rate limits:\n{request_scheduler.report()}",
+            ]
+        )
+
+    def _handle_snapshots_command(self) -> bool:
+        """List the most recent workspace snapshots."""
+        journal = get_journal()
+        if journal is None:
+            self.ui.error("Workspace snapshots are not enabled in this session.")
+            return True
+
+        lines = []
+        for snapshot in journal.recent():
+            created = time.strftime("%H:%M:%S", time.localtime(snapshot.created))
+            start = " [session start]" if snapshot.id == journal.session_start else ""
+            lines.append(
+                f"#{snapshot.id:<5} {created}  {snapshot.label}  "
+                f"({snapshot.changed} files){start}"
+            )
+        if journal.failures:
+            lines.append(
+                f"\n{journal.failures} snapshots failed, last: {journal.last_error}"
+            )
+        lines.append("\nUse /rollback <id> to restore the workspace as it was at a snapshot.")
+        self.ui.status_message(title=f"Snapshots of {journal.root}", message="\n".join(lines))
+        return True
+
+    def _handle_rollback_command(self, user_input: str) -> bool:
+        """Restore the workspace to a snapshot: /rollback <id> or /rollback start."""
+        journal = get_journal()
+        if journal is None:
+            self.ui.error("Workspace snapshots are not enabled in this session.")
+            return True
+
+        command_parts = user_input.split()
+        if len(command_parts) != 2:
+            self.ui.error("Usage: /rollback <snapshot id> or /rollback start")
+            return True
+        target = command_parts[1].lstrip("#")
+        if target.lower() == "start":
+            snapshot = journal.session_start
+        elif target.isdigit():
+            snapshot = int(target)
+        else:
+            self.ui.error("Usage: /rollback <snapshot id> or /rollback start")
+            return True
+
+        if not self.ui.confirm(
+            f"Restore {journal.root} to snapshot #{snapshot}? "
+            "Later changes are kept in a new snapshot.",
+            default=False,
+        ):
+            return True
+        try:
+            restored = journal.rollback(snapshot)
+        except (ValueError, OSError) as e:
+            self.ui.error(f"Rollback failed: {e}")
+            return True
+
+        shown = [os.path.relpath(path, journal.root) for path in restored[:15]]
+        if len(restored) > 15:
+            shown.append(f"... and {len(restored) - 15} more")
+        self.ui.status_message(
+            title=f"Rolled back to #{snapshot}",
+            message="\n".join(shown) if shown else "Nothing to restore, no file differs.",
+        )
+        return True
+
+    def discard_thread(self, thread_id: str):
+        """Free the checkpoints of a thread that can no longer be resumed."""
+        try:
+            self.agent.checkpointer.delete_thread(thread_id)
+        except NotImplementedError:
+            pass
+
+    def has_pending_run(self, configuration: dict) -> bool:
+        """Whether the thread stopped in the middle of a run.
+
+        True after a recursion limit, a failed model request or a crash: the
+        last checkpoint still has nodes scheduled, and invoking the graph with
+        no input continues from there.
+        """
+        return bool(self.agent.get_state(configuration).next)
+
+    async def ahas_pending_run(self, configuration: dict) -> bool:
+        return bool((await self.agent.aget_state(configuration)).next)
+
     def _handle_model_command(self, user_input: str) -> bool:
         """Handle model-related commands."""
         command_parts = user_input.lower().split(" ")
@@ -151,11 +384,7 @@ class BaseAgent:
                 message=f"Changing model to {new_model}",
             )
             self.model_name = new_model
-            self.agent = self.get_agent(
-                model_name=self.model_name,
-                api_key=self.api_key,
-                system_prompt=self.system_prompt,
-            )
+            self.reset_agent()
             return True
 
         self.ui.error("Unknown model command. Type /help for instructions.")
@@ -172,8 +401,14 @@ class BaseAgent:
         intermediary_chunks: bool = False,
         quiet: bool = False,
         propagate_exceptions: bool = False,
+        resume: bool = False,
     ):
-        """Invoke agent with a message and return response."""
+        """Invoke agent with a message and return response.
+
+        With ``resume``, an interrupted run on the thread continues from its
+        last checkpoint instead of sending the message again; the message is
+        only sent when there is nothing to resume.
+        """
 
         configuration = config or {
             "configurable": {"thread_id": str(uuid.uuid4())},
@@ -184,26 +419,157 @@ class BaseAgent:
             message = self._add_extra_context(message, extra_context)
 
         def execute_agent():
+            graph_input = (
+                None
+                if resume and self.has_pending_run(configuration)
+                else {"messages": [("human", message)]}
+            )
             if stream:
-                last = None
-                for chunk in self.agent.stream(
-                    {"messages": [("human", message)]},
-                    config=configuration,
-                ):
-                    if not quiet:
-                        self._display_chunk(chunk)
-                    last = chunk
+                last = self._stream(graph_input, configuration, quiet=quiet)
                 return last.get("llm", {}) if last else {}
             else:
-                return self.agent.invoke(
-                    {"messages": [("human", message)]},
-                    config=configuration,
-                )
+                # nothing is rendered, not even the progress of tools
+                with rendering(None):
+                    return self.agent.invoke(graph_input, config=configuration)
+
+        while True:
+            raw_response, resume = AgentExceptionHandler.handle_agent_exceptions(
+                execute_agent, self.ui, propagate=propagate_exceptions
+            )
+            if not resume:
+                break
 
-        raw_response, _ = AgentExceptionHandler.handle_agent_exceptions(
-            execute_agent, self.ui, propagate=propagate_exceptions
+        return self._finalize_response(
+            raw_response, include_thinking_block, intermediary_chunks, quiet
         )
 
+    async def ainvoke(
+        self,
+        message: str,
+        recursion_limit: int = 100,
+        config: dict = None,
+        extra_context: str | list[str] = None,
+        include_thinking_block: bool = False,
+        stream: bool = False,
+        intermediary_chunks: bool = False,
+        quiet: bool = False,
+        propagate_exceptions: bool = False,
+        resume: bool = False,
+    ):
+        """Async variant of invoke running the graph on the event loop."""
+
+        configuration = config or {
+            "configurable": {"thread_id": str(uuid.uuid4())},
+            "recursion_limit": recursion_limit,
+        }
+
+        if extra_context:
+            message = self._add_extra_context(message, extra_context)
+
+        async def execute_agent():
+            graph_input = (
+                None
+                if resume and await self.ahas_pending_run(configuration)
+                else {"messages": [("human", message)]}
+            )
+            if stream:
+                last = await self._astream(graph_input, configuration, quiet=quiet)
+                return last.get("llm", {}) if last else {}
+            else:
+                # nothing is rendered, not even the progress of tools
+                with rendering(None):
+                    return await self.agent.ainvoke(graph_input, config=configuration)
+
+        while True:
+            raw_response, resume = await AgentExceptionHandler.ahandle_agent_exceptions(
+                execute_agent, self.ui, propagate=propagate_exceptions
+            )
+            if not resume:
+                break
+
+        return self._finalize_response(
+            raw_response, include_thinking_block, intermediary_chunks, quiet
+        )
+
+    def _stream(self, graph_input, configuration: dict, quiet: bool = False) -> dict | None:
+        """Run the graph, rendering tokens as they arrive.
+
+        Returns the last state update, or None if the graph produced none.
+        """
+        view = None if quiet else self._token_view()
+        last = None
+        try:
+            with rendering(None if quiet else self.ui):
+                for mode, payload in self.agent.stream(
+                    graph_input, configuration, stream_mode=STREAM_MODES
+                ):
+                    last = self._handle_stream_event(mode, payload, view, configuration) or last
+        finally:
+            if view:
+                view.stop()
+        return last
+
+    async def _astream(
+        self, graph_input, configuration: dict, quiet: bool = False
+    ) -> dict | None:
+        """Async variant of _stream."""
+        view = None if quiet else self._token_view()
+        last = None
+        try:
+            with rendering(None if quiet else self.ui):
+                async for mode, payload in self.agent.astream(
+                    graph_input, configuration, stream_mode=STREAM_MODES
+                ):
+                    last = self._handle_stream_event(mode, payload, view, configuration) or last
+        finally:
+            if view:
+                view.stop()
+        return last
+
+    def _token_view(self) -> TokenStreamView:
+        # reasoning models may open with their thoughts without a <think> tag
+        return self.ui.token_stream(assume_thinking="thinking" in self.model_name)
+
+    def _handle_stream_event(
+        self,
+        mode: str,
+        payload,
+        view: TokenStreamView | None,
+        configuration: dict,
+    ) -> dict | None:
+        """Render one streamed event; returns the payload of state updates."""
+        if mode == "messages":
+            message, metadata = payload
+            # agents called from tools (e.g. the web searcher) stream through
+            # the same callbacks; only show this thread's own model output
+            thread_id = metadata.get("thread_id")
+            if (
+                view
+                and metadata.get("langgraph_node") == "llm"
+                and thread_id in (None, configuration["configurable"].get("thread_id"))
+            ):
+                view.feed(message)
+            return None
+
+        if view is None:
+            return payload
+        if "context" in payload:
+            # the model is called next: show the spinner until it answers
+            view.start()
+        elif "llm" in payload:
+            self._handle_dict_chunk(payload, streamed_content=view.finish())
+        else:
+            self._display_chunk(payload)
+        return payload
+
+    def _finalize_response(
+        self,
+        raw_response: dict | None,
+        include_thinking_block: bool,
+        intermediary_chunks: bool,
+        quiet: bool,
+    ) -> str:
+        """Turn a raw graph result into the response string."""
         if raw_response is None:
             return "[ERROR] Agent execution failed."
 
@@ -264,26 +630,39 @@ class BaseAgent:
         elif isinstance(chunk, dict):
             self._handle_dict_chunk(chunk)
 
-    def _handle_dict_chunk(self, chunk: dict):
+    def _handle_dict_chunk(self, chunk: dict, streamed_content: str | None = None):
         """Handle dictionary chunk format."""
         llm_data = chunk.get("llm", {})
         if "messages" in llm_data:
             messages = llm_data["messages"]
             if messages and isinstance(messages[0], AIMessage):
-                self._handle_ai_message(messages[0])
+                self._handle_ai_message(messages[0], content=streamed_content)
+
+        # tool calls recovered from the content of a malformed answer
+        checker_data = chunk.get("toolcall_checker") or {}
+        for message in checker_data.get("messages", []):
+            if isinstance(message, AIMessage):
+                for tool_call in message.tool_calls:
+                    self.ui.tool_call(tool_call["name"], tool_call["args"])
 
         tools_data = chunk.get("tools", {})
         if "messages" in tools_data:
             for tool_message in tools_data["messages"]:
                 self._handle_tool_message(tool_message)
 
-    def _handle_ai_message(self, message: AIMessage):
-        """Handle AI message display."""
+    def _handle_ai_message(self, message: AIMessage, content: str | None = None):
+        """Handle AI message display.
+
+        ``content`` replaces the message content when it was already filtered
+        while streaming.
+        """
+        if content is None:
+            content = message.content
         if message.tool_calls:
             for tool_call in message.tool_calls:
                 self.ui.tool_call(tool_call["name"], tool_call["args"])
-        if message.content and message.content.strip():
-            self.ui.ai_response(message.content)
+        if content and content.strip():
+            self.ui.ai_response(content)
 
     def _handle_tool_message(self, message: ToolMessage):
         """Handle tool message display."""
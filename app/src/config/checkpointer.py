@@ -0,0 +1,593 @@
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langchain_core.runnables import RunnableConfig
+from collections.abc import AsyncIterator, Iterator, Sequence
+from app.utils.constants import DATA_DIR
+from typing import Any
+import threading
+import asyncio
+import sqlite3
+import atexit
+import time
+import os
+
+
+DEFAULT_RETENTION = 20  # checkpoints kept per thread and namespace
+DEFAULT_BATCH_SIZE = 64  # buffered operations before a forced flush
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+DEFAULT_COMPACTION_INTERVAL = 30.0  # seconds
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024  # bytes
+DEFAULT_SQLITE_PATH = os.path.join(DATA_DIR, "checkpoints.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+);
+"""
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver[int]):
+    """Checkpoint saver backed by SQLite with retention and LRU eviction.
+
+    Checkpoints are stored with their channel values inline, so dropping old
+    checkpoints never breaks a newer one. Writes are buffered and flushed in
+    batches; every read flushes first, so callers always see their own
+    writes. A background thread trims each thread to the newest
+    ``retention`` checkpoints, evicts least recently used threads once the
+    store exceeds ``max_bytes`` and checkpoints the write-ahead log.
+
+    Use ``path=":memory:"`` for a bounded in-process store.
+
+    Args:
+        path: Database file, or ":memory:" for an in-memory store
+        retention: Number of checkpoints kept per thread and namespace
+        max_bytes: Optional byte budget; whole threads are evicted LRU first
+        batch_size: Buffered operations that trigger a synchronous flush
+        flush_interval: Seconds between background flushes
+        compaction_interval: Seconds between background compactions
+        serde: Optional serializer for checkpoints and writes
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_SQLITE_PATH,
+        retention: int = DEFAULT_RETENTION,
+        max_bytes: int | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        compaction_interval: float = DEFAULT_COMPACTION_INTERVAL,
+        serde: SerializerProtocol | None = None,
+    ):
+        super().__init__(serde=serde)
+        if retention < 1:
+            raise ValueError("retention must keep at least one checkpoint")
+
+        self.path = path
+        self.retention = retention
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.in_memory = path == ":memory:"
+
+        if not self.in_memory:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._pending: list[tuple[str, tuple]] = []
+        self._touched: dict[str, float] = {}
+        self._approx_bytes = 0
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        if not self.in_memory:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        if self.max_bytes:
+            self._approx_bytes = sum(self._thread_sizes_locked().values())
+
+        self._closed = threading.Event()
+        self._worker = threading.Thread(
+            target=self._background_loop,
+            args=(flush_interval, compaction_interval),
+            name="checkpointer-compaction",
+            daemon=True,
+        )
+        self._worker.start()
+        atexit.register(self.close)
+
+    # ----------------------------------------------------------------- writes
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Buffer a checkpoint for storage and return its config."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self.serde.dumps_typed(checkpoint)
+        meta_type, meta = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        row = (
+            thread_id,
+            checkpoint_ns,
+            checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),  # parent
+            type_,
+            data,
+            meta_type,
+            meta,
+        )
+        self._enqueue("checkpoint", row, thread_id)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Buffer intermediate writes linked to a checkpoint."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # special channels (errors, interrupts) overwrite, regular ones keep the first write
+        kind = (
+            "writes_replace"
+            if all(channel in WRITES_IDX_MAP for channel, _ in writes)
+            else "writes_ignore"
+        )
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            row = (
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                type_,
+                data,
+                task_path,
+            )
+            self._enqueue(kind, row, thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints and writes associated with a thread ID."""
+        with self._lock:
+            self._flush_locked()
+            self._delete_threads_locked([thread_id])
+
+    def _enqueue(self, kind: str, row: tuple, thread_id: str):
+        size = sum(len(value) for value in row if isinstance(value, bytes))
+        with self._lock:
+            self._pending.append((kind, row))
+            self._touched[thread_id] = time.time()
+            self._approx_bytes += size
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        """Write all buffered operations to the database."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending and not self._touched:
+            return
+
+        pending, self._pending = self._pending, []
+        touched, self._touched = self._touched, {}
+        statements = {
+            "checkpoint": "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            "writes_replace": "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            "writes_ignore": "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        }
+
+        self._conn.execute("BEGIN")
+        try:
+            for kind, row in pending:
+                self._conn.execute(statements[kind], row)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO threads VALUES (?, ?)", touched.items()
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        if self.max_bytes and self._approx_bytes > self.max_bytes:
+            self._evict_locked(keep={*touched})
+
+    # ------------------------------------------------------------------ reads
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Fetch the requested checkpoint, or the latest one for the thread."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        with self._lock:
+            self._flush_locked()
+            if checkpoint_id:
+                row = self._conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            self._touched[thread_id] = time.time()
+            return self._to_tuple(row)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List stored checkpoints, newest first."""
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+
+        query = "SELECT * FROM checkpoints"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(query, params).fetchall()
+            results = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                metadata = self.serde.loads_typed((row[6], row[7]))
+                if filter and not all(
+                    metadata.get(key) == value for key, value in filter.items()
+                ):
+                    continue
+                results.append(self._to_tuple(row))
+
+        yield from results
+
+    def _to_tuple(self, row: tuple) -> CheckpointTuple:
+        (
+            thread_id,
+            checkpoint_ns,
+            checkpoint_id,
+            parent_id,
+            type_,
+            data,
+            meta_type,
+            meta,
+        ) = row
+        writes = self._conn.execute(
+            "SELECT task_id, idx, channel, type, value, task_path FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[5], w[0], w[1]))
+
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, data)),
+            metadata=self.serde.loads_typed((meta_type, meta)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((w_type, value)))
+                for task_id, _, channel, w_type, value, _ in writes
+            ],
+        )
+
+    # ------------------------------------------------------------- compaction
+
+    def compact(self):
+        """Apply retention, enforce the byte budget and reclaim free pages."""
+        with self._lock:
+            self._flush_locked()
+            self._apply_retention_locked()
+            if self.max_bytes:
+                self._evict_locked(keep=set())
+            self._conn.execute("PRAGMA incremental_vacuum")
+            if not self.in_memory:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _apply_retention_locked(self):
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute(
+                """
+                DELETE FROM checkpoints WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (
+                            PARTITION BY thread_id, checkpoint_ns
+                            ORDER BY checkpoint_id DESC
+                        ) AS position FROM checkpoints
+                    ) WHERE position > ?
+                )
+                """,
+                (self.retention,),
+            )
+            self._conn.execute(
+                """
+                DELETE FROM writes WHERE NOT EXISTS (
+                    SELECT 1 FROM checkpoints c
+                    WHERE c.thread_id = writes.thread_id
+                    AND c.checkpoint_ns = writes.checkpoint_ns
+                    AND c.checkpoint_id = writes.checkpoint_id
+                )
+                """
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def thread_sizes(self) -> dict[str, int]:
+        """Return the stored size in bytes of every thread."""
+        with self._lock:
+            self._flush_locked()
+            return self._thread_sizes_locked()
+
+    def _thread_sizes_locked(self) -> dict[str, int]:
+        sizes: dict[str, int] = {}
+        for table, columns in (
+            ("checkpoints", "length(checkpoint) + length(metadata)"),
+            ("writes", "length(value)"),
+        ):
+            for thread_id, size in self._conn.execute(
+                f"SELECT thread_id, SUM({columns}) FROM {table} GROUP BY thread_id"
+            ):
+                sizes[thread_id] = sizes.get(thread_id, 0) + (size or 0)
+        return sizes
+
+    def _evict_locked(self, keep: set[str]):
+        sizes = self._thread_sizes_locked()
+        total = sum(sizes.values())
+        self._approx_bytes = total
+        if total <= self.max_bytes:
+            return
+
+        # apply retention first, it is cheaper than losing a whole thread
+        self._apply_retention_locked()
+        sizes = self._thread_sizes_locked()
+        total = sum(sizes.values())
+
+        victims = []
+        for (thread_id,) in self._conn.execute(
+            "SELECT thread_id FROM threads ORDER BY last_access ASC"
+        ):
+            if total <= self.max_bytes:
+                break
+            if thread_id in keep or thread_id not in sizes:
+                continue
+            victims.append(thread_id)
+            total -= sizes[thread_id]
+
+        if victims:
+            self._delete_threads_locked(victims)
+        self._approx_bytes = total
+
+    def _delete_threads_locked(self, thread_ids: Sequence[str]):
+        self._conn.execute("BEGIN")
+        try:
+            for table in ("checkpoints", "writes", "threads"):
+                self._conn.executemany(
+                    f"DELETE FROM {table} WHERE thread_id = ?",
+                    [(thread_id,) for thread_id in thread_ids],
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _background_loop(self, flush_interval: float, compaction_interval: float):
+        last_compaction = time.monotonic()
+        while not self._closed.wait(flush_interval):
+            try:
+                if time.monotonic() - last_compaction >= compaction_interval:
+                    self.compact()
+                    last_compaction = time.monotonic()
+                else:
+                    self.flush()
+            except sqlite3.Error:
+                # a failed background pass is retried on the next tick
+                continue
+
+    def close(self):
+        """Flush pending writes, stop the background thread and close the DB."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        with self._lock:
+            try:
+                self._flush_locked()
+                self._apply_retention_locked()
+            finally:
+                self._conn.close()
+
+    # ------------------------------------------------------------------ async
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def create_checkpointer(
+    backend: str = "memory",
+    path: str | None = None,
+    retention: int = DEFAULT_RETENTION,
+    max_bytes: int | None = None,
+) -> BaseCheckpointSaver:
+    """Create a checkpointer for the given backend.
+
+    Args:
+        backend: "memory" for a bounded in-process store, "sqlite" for a file
+        path: Database path for the sqlite backend
+        retention: Number of checkpoints kept per thread
+        max_bytes: Byte budget; defaults to 256 MiB for the memory backend
+
+    Returns:
+        Configured checkpoint saver
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if backend == "memory":
+        return SQLiteCheckpointer(
+            path=":memory:",
+            retention=retention,
+            max_bytes=max_bytes or DEFAULT_MEMORY_BUDGET,
+        )
+    if backend == "sqlite":
+        return SQLiteCheckpointer(
+            path=path or DEFAULT_SQLITE_PATH,
+            retention=retention,
+            max_bytes=max_bytes,
+        )
+    raise ValueError(f"Unknown checkpointer backend: {backend}")
+
+
+_default_checkpointer: BaseCheckpointSaver | None = None
+_default_lock = threading.Lock()
+
+
+def configure_checkpointer(**kwargs) -> BaseCheckpointSaver:
+    """Replace the process-wide checkpointer used by newly built agents.
+
+    Call this before any agent graph is built; graphs compiled against the
+    previous checkpointer stop working once it is closed.
+    """
+    global _default_checkpointer
+    with _default_lock:
+        previous = _default_checkpointer
+        _default_checkpointer = create_checkpointer(**kwargs)
+    if isinstance(previous, SQLiteCheckpointer):
+        previous.close()
+    return _default_checkpointer
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """Return the process-wide checkpointer, creating the default one lazily."""
+    global _default_checkpointer
+    with _default_lock:
+        if _default_checkpointer is None:
+            _default_checkpointer = create_checkpointer()
+        return _default_checkpointer
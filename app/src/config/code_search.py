@@ -0,0 +1,393 @@
+from app.src.config.file_tree import is_ignored, load_gitignore, IgnoreRule
+from app.src.config.workspace_cache import workspace_cache, universal_newlines
+from app.src.config.file_io import sniff_encoding, SNIFF_BYTES
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import fnmatch
+import time
+import os
+import re
+
+
+MAX_INDEXED_FILE = 1024 * 1024  # bigger files are neither indexed nor searched
+MAX_INDEXES = 4  # workspaces indexed at the same time
+REFRESH_INTERVAL = 1.0  # seconds between full checks for changes made outside the tools
+DEFAULT_MAX_RESULTS = 50
+MAX_CONTEXT_LINES = 10
+MAX_LINE_CHARS = 200
+
+REGEX_META = set(".^$*+?{}[]()|\\")
+QUANTIFIERS = set("*?{")
+
+
+def trigrams(text: str) -> set[str]:
+    """ASCII trigrams of the lowercased text.
+
+    Lowercasing lets one index serve case-sensitive and insensitive queries;
+    non-ASCII trigrams are dropped because lowercasing them is not always
+    position independent.
+    """
+    text = text.lower()
+    grams = {text[i : i + 3] for i in range(len(text) - 2)}
+    return {gram for gram in grams if gram.isascii()}
+
+
+def _literal_runs(pattern: str) -> list[str]:
+    """Substrings every match of a regex must contain.
+
+    Conservative: alternation disables the filter altogether, text inside
+    groups is ignored and a character followed by a quantifier other than
+    ``+`` is not required.
+    """
+    if "|" in pattern:
+        return []
+    runs, current, depth, i = [], [], 0, 0
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            char = pattern[i + 1]
+            i += 2
+            if char.isalnum():
+                # \d, \w, \b, back references ... are not literals
+                flush()
+                continue
+        elif char in REGEX_META:
+            flush()
+            if char == "[":
+                end = pattern.find("]", i + 2)
+                i = end + 1 if end != -1 else len(pattern)
+            elif char == "{":
+                end = pattern.find("}", i)
+                i = end + 1 if end != -1 else len(pattern)
+            else:
+                depth += {"(": 1, ")": -1}.get(char, 0)
+                i += 1
+            continue
+        else:
+            i += 1
+        if depth or (i < len(pattern) and pattern[i] in QUANTIFIERS):
+            # inside a group, or made optional by the next token
+            flush()
+            continue
+        current.append(char)
+    flush()
+    return runs
+
+
+@dataclass
+class _IndexedFile:
+    version: tuple
+    grams: frozenset[str]
+
+
+class TrigramIndex:
+    """Incrementally maintained trigram index of the text files under a root.
+
+    Files are walked with the same ignore rules as list_directory. Paths
+    written by the file tools are re-indexed on the next query; changes made
+    any other way (shell commands, generated files) are picked up by a stat
+    sweep at most every REFRESH_INTERVAL seconds.
+
+    Args:
+        root: Directory to index
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.realpath(root)
+        self._lock = threading.Lock()
+        self._files: dict[str, _IndexedFile] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._dirty: set[str] = set()
+        self._refreshed = 0.0
+
+    def mark_dirty(self, path: str):
+        with self._lock:
+            self._dirty.add(path)
+
+    def _walk(self) -> list[str]:
+        paths = []
+        stack: list[tuple[str, str, list[IgnoreRule]]] = [
+            (self.root, "", load_gitignore(self.root, ""))
+        ]
+        while stack:
+            directory, rel_dir, rules = stack.pop()
+            try:
+                items = workspace_cache.scan_dir(directory)
+            except OSError:
+                continue
+            for item in items:
+                rel_path = f"{rel_dir}/{item.name}" if rel_dir else item.name
+                if item.is_symlink or is_ignored(item.name, rel_path, item.is_dir, rules):
+                    continue
+                if item.is_dir:
+                    stack.append(
+                        (item.path, rel_path, rules + load_gitignore(item.path, rel_path))
+                    )
+                else:
+                    paths.append(item.path)
+        return paths
+
+    def covers(self, directory: str) -> bool:
+        """Whether the walk reaches a directory, i.e. it is not ignored on the way down."""
+        directory = os.path.realpath(directory)
+        if directory == self.root:
+            return True
+        if not directory.startswith(self.root + os.sep):
+            return False
+        current, rel_path = self.root, ""
+        rules = load_gitignore(self.root, "")
+        for name in os.path.relpath(directory, self.root).split(os.sep):
+            current = os.path.join(current, name)
+            rel_path = f"{rel_path}/{name}" if rel_path else name
+            if os.path.islink(current) or is_ignored(name, rel_path, True, rules):
+                return False
+            rules = rules + load_gitignore(current, rel_path)
+        return True
+
+    def _add_locked(self, path: str, indexed: _IndexedFile):
+        self._files[path] = indexed
+        for gram in indexed.grams:
+            self._postings.setdefault(gram, set()).add(path)
+
+    def _remove_locked(self, path: str):
+        indexed = self._files.pop(path, None)
+        if indexed is None:
+            return
+        for gram in indexed.grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(path)
+                if not posting:
+                    del self._postings[gram]
+
+    def _index_file(self, path: str, version: tuple) -> _IndexedFile | None:
+        if version[1] > MAX_INDEXED_FILE:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        encoding = sniff_encoding(data[:SNIFF_BYTES])
+        if encoding is None:
+            return None
+        return _IndexedFile(version, frozenset(trigrams(data.decode(encoding, errors="replace"))))
+
+    def _update(self, paths):
+        for path in paths:
+            version = workspace_cache.version(path)
+            with self._lock:
+                current = self._files.get(path)
+                if current is not None and current.version == version:
+                    continue
+                self._remove_locked(path)
+            if version is None or not os.path.isfile(path):
+                continue
+            indexed = self._index_file(path, version)
+            if indexed is not None:
+                with self._lock:
+                    self._remove_locked(path)
+                    self._add_locked(path, indexed)
+
+    def refresh(self):
+        """Bring the index up to date before a query."""
+        with self._lock:
+            dirty = [p for p in self._dirty if p == self.root or p.startswith(self.root + os.sep)]
+            self._dirty.clear()
+            full = time.monotonic() - self._refreshed >= REFRESH_INTERVAL
+
+        if not full:
+            # a deleted directory may have taken indexed files with it
+            with self._lock:
+                dirty += [
+                    p for p in self._files for d in dirty if p.startswith(d + os.sep)
+                ]
+            self._update(dirty)
+            return
+
+        paths = set(self._walk())
+        with self._lock:
+            for path in set(self._files) - paths:
+                self._remove_locked(path)
+        self._update(paths)
+        with self._lock:
+            self._refreshed = time.monotonic()
+
+    def candidates(self, required: list[str]) -> list[str]:
+        """Indexed files that contain every trigram of the required strings."""
+        grams = set()
+        for run in required:
+            grams |= trigrams(run)
+        with self._lock:
+            if not grams:
+                return sorted(self._files)
+            postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+            result = set(postings[0])
+            for posting in postings[1:]:
+                result &= posting
+                if not result:
+                    break
+            return sorted(result)
+
+    @property
+    def file_count(self) -> int:
+        with self._lock:
+            return len(self._files)
+
+
+class SearchIndexes:
+    """Process-wide trigram indexes, one per searched workspace root."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes: OrderedDict[str, TrigramIndex] = OrderedDict()
+        workspace_cache.add_listener(self._on_write)
+
+    def _on_write(self, path: str):
+        with self._lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            if path == index.root or path.startswith(index.root + os.sep):
+                index.mark_dirty(path)
+
+    def get(self, path: str) -> TrigramIndex:
+        """The index covering a directory, created on first use."""
+        root = os.path.realpath(path)
+        with self._lock:
+            for indexed_root, index in self._indexes.items():
+                # a parent's index lacks the directories its walk ignored
+                if index.covers(root):
+                    self._indexes.move_to_end(indexed_root)
+                    return index
+            index = TrigramIndex(root)
+            self._indexes[root] = index
+            # an index over a parent directory replaces those of the subdirectories it walks
+            for indexed_root in [
+                r for r in self._indexes if r.startswith(root + os.sep) and index.covers(r)
+            ]:
+                del self._indexes[indexed_root]
+            while len(self._indexes) > MAX_INDEXES:
+                self._indexes.popitem(last=False)
+            return index
+
+
+search_indexes = SearchIndexes()
+
+
+@dataclass
+class SearchResult:
+    text: str
+    matches: int
+    files: int
+    truncated: bool
+
+
+def _included(rel_path: str, include: str | None) -> bool:
+    if not include:
+        return True
+    patterns = [p.strip() for p in include.split(",") if p.strip()]
+    name = os.path.basename(rel_path)
+    return any(
+        fnmatch.fnmatch(rel_path, p) or fnmatch.fnmatch(name, p)
+        # "src/**/*.py" should also match src/a.py
+        or fnmatch.fnmatch(rel_path, p.replace("**/", ""))
+        for p in patterns
+    )
+
+
+def _clip(line: str) -> str:
+    return line if len(line) <= MAX_LINE_CHARS else line[:MAX_LINE_CHARS] + "..."
+
+
+def search(
+    path: str,
+    query: str,
+    regex: bool = False,
+    case_sensitive: bool = True,
+    include: str | None = None,
+    context_lines: int = 0,
+    max_results: int = DEFAULT_MAX_RESULTS,
+) -> SearchResult:
+    """Search the text files under a directory, narrowed by the trigram index.
+
+    Output is grouped by file, grep style: ``path:line: text`` for matches
+    and ``path-line- text`` for context lines.
+
+    Raises:
+        re.error: If the regex is invalid
+        NotADirectoryError: If path is not a directory
+    """
+    if not os.path.isdir(path):
+        raise NotADirectoryError(f"Not a directory: {path}")
+    flags = 0 if case_sensitive else re.IGNORECASE
+    pattern = re.compile(query if regex else re.escape(query), flags | re.MULTILINE)
+    required = _literal_runs(query) if regex else [query]
+    context_lines = max(0, min(context_lines, MAX_CONTEXT_LINES))
+    max_results = max(1, max_results)
+
+    index = search_indexes.get(path)
+    index.refresh()
+    scope = os.path.realpath(path)
+
+    blocks, matches, files, truncated = [], 0, 0, False
+    for file_path in index.candidates(required):
+        if file_path != scope and not file_path.startswith(scope + os.sep):
+            continue
+        rel_path = os.path.relpath(file_path, scope)
+        if not _included(rel_path, include):
+            continue
+        try:
+            with open(file_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        encoding = sniff_encoding(data[:SNIFF_BYTES])
+        if encoding is None:
+            continue
+        text = universal_newlines(data.decode(encoding, errors="replace"))
+        lines = text.split("\n")
+        if text.endswith("\n"):
+            lines.pop()
+
+        # newlines are counted once, from match to match, and a line with a
+        # hit is left at its first match
+        hit_lines, line, counted = [], 0, 0
+        while matches + len(hit_lines) < max_results:
+            match = pattern.search(text, counted)
+            if match is None:
+                break
+            line += text.count("\n", counted, match.start())
+            hit_lines.append(line)
+            line_end = text.find("\n", match.start())
+            if line_end == -1:
+                break
+            counted, line = line_end + 1, line + 1
+        if not hit_lines:
+            continue
+
+        files += 1
+        matches += len(hit_lines)
+        shown, hits = [], set(hit_lines)
+        previous = None
+        for line in hit_lines:
+            for number in range(max(0, line - context_lines), min(len(lines), line + context_lines + 1)):
+                if previous is not None and number <= previous:
+                    continue
+                if previous is not None and number > previous + 1:
+                    shown.append("--")
+                separator = ":" if number in hits else "-"
+                shown.append(f"{rel_path}{separator}{number + 1}{separator} {_clip(lines[number])}")
+                previous = number
+        blocks.append("\n".join(shown))
+        if matches >= max_results:
+            truncated = True
+            break
+
+    return SearchResult("\n\n".join(blocks), matches, files, truncated)
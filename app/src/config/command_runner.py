@@ -0,0 +1,222 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+from app.src.config.sandbox import sandbox
+import subprocess
+import threading
+import codecs
+import signal
+import time
+import sys
+import os
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DEFAULT_TIMEOUT = 300  # seconds
+HEAD_BYTES = 32 * 1024  # kept from the start of each stream
+TAIL_BYTES = 96 * 1024  # kept from the end of each stream
+READ_CHUNK = 64 * 1024
+POLL_INTERVAL = 0.05  # seconds between checks of a running command
+TERMINATE_GRACE = 2  # seconds between SIGTERM and SIGKILL of a timed out command
+DRAIN_TIMEOUT = 1  # seconds to finish reading after the command exited
+
+STDOUT = "stdout"
+STDERR = "stderr"
+
+
+class OutputBuffer:
+    """Bounded capture of a stream: the first and the last bytes of it.
+
+    Everything in between is counted but not kept, so memory stays at
+    ``head + tail`` however much a command prints.
+    """
+
+    def __init__(self, head: int = HEAD_BYTES, tail: int = TAIL_BYTES):
+        self.head_limit = head
+        self.tail_limit = tail
+        self.head = bytearray()
+        self.tail: deque[bytes] = deque()
+        self.tail_size = 0
+        self.total = 0
+        # background processes can still be writing when the result is read
+        self._lock = threading.Lock()
+
+    def feed(self, data: bytes):
+        with self._lock:
+            self.total += len(data)
+            room = self.head_limit - len(self.head)
+            if room > 0:
+                self.head += data[:room]
+                data = data[room:]
+            if not data:
+                return
+            self.tail.append(data)
+            self.tail_size += len(data)
+            while self.tail_size - len(self.tail[0]) >= self.tail_limit:
+                self.tail_size -= len(self.tail.popleft())
+
+    def text(self) -> str:
+        with self._lock:
+            head, tail = bytes(self.head), b"".join(self.tail)
+            dropped = self.total - len(head) - len(tail)
+        if len(tail) > self.tail_limit:
+            # the oldest chunk is only partly inside the window
+            dropped += len(tail) - self.tail_limit
+            tail = tail[-self.tail_limit :]
+        head = head.decode("utf-8", errors="replace")
+        tail = tail.decode("utf-8", errors="replace")
+        if not dropped:
+            return head + tail
+        return f"{head}\n[... {dropped:,} bytes of output omitted ...]\n{tail}"
+
+
+@dataclass
+class CommandResult:
+    stdout: str
+    stderr: str
+    returncode: int | None
+    elapsed: float
+    peak_rss_kb: int | None = None
+    cpu_seconds: float | None = None
+    timed_out: bool = False
+    output_bytes: int = 0
+    detached_output: bool = False  # background processes kept the output open
+
+
+def _read_stream(pipe, name: str, buffer: OutputBuffer, on_output):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    fd = pipe.fileno()
+    while True:
+        try:
+            data = os.read(fd, READ_CHUNK)
+        except OSError:
+            break
+        if not data:
+            break
+        buffer.feed(data)
+        if on_output is not None:
+            text = decoder.decode(data)
+            if text:
+                on_output(name, text)
+    pipe.close()
+
+
+def signal_group(process: subprocess.Popen, sig: int):
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, sig)
+        elif sig == signal.SIGTERM:
+            process.terminate()
+        else:
+            process.kill()
+    except OSError:
+        pass
+
+
+def _to_kb(maxrss: int) -> int:
+    # bytes on macOS, KiB elsewhere
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+def _wait(process: subprocess.Popen, timeout: float | None):
+    """Wait for the command, returning its resource usage where it can be measured.
+
+    On POSIX the shell is reaped with wait4, whose resource usage covers
+    the commands it waited for.
+
+    Raises:
+        subprocess.TimeoutExpired: If the command is still running after ``timeout``
+    """
+    if not hasattr(os, "wait4"):
+        process.wait(timeout)
+        return None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return usage
+        if deadline is not None and time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(POLL_INTERVAL)
+
+
+def run_command(
+    command: str,
+    cwd: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    on_output: Callable[[str, str], None] | None = None,
+) -> CommandResult:
+    """Run a shell command, streaming its output into bounded buffers.
+
+    The command gets its own process group (session), so on timeout the
+    whole tree it started is terminated, then killed, instead of only the
+    shell. It runs inside the sandbox, with its limits on CPU time,
+    memory, open files and processes. ``on_output(stream, text)`` is called
+    from reader threads as output arrives.
+
+    Raises:
+        OSError: If the shell cannot be started
+    """
+    # Linux carries the RSS of the forking process over exec into the child's
+    # peak, so only a peak above our own says something about the command
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+    start = time.monotonic()
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        start_new_session=os.name == "posix",
+        **sandbox.popen_kwargs(),
+    )
+    sandbox.confine(process)
+    buffers = {STDOUT: OutputBuffer(), STDERR: OutputBuffer()}
+    readers = [
+        threading.Thread(
+            target=_read_stream,
+            args=(pipe, name, buffers[name], on_output),
+            daemon=True,
+        )
+        for pipe, name in ((process.stdout, STDOUT), (process.stderr, STDERR))
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out, usage = False, None
+    try:
+        usage = _wait(process, timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        signal_group(process, signal.SIGTERM)
+        try:
+            usage = _wait(process, TERMINATE_GRACE)
+        except subprocess.TimeoutExpired:
+            signal_group(process, signal.SIGKILL)
+            usage = _wait(process, None)
+        # children that ignored SIGTERM would otherwise outlive the shell
+        signal_group(process, signal.SIGKILL)
+
+    # background processes that inherited the pipes may keep them open forever
+    drain_until = time.monotonic() + DRAIN_TIMEOUT
+    for reader in readers:
+        reader.join(max(0, drain_until - time.monotonic()))
+
+    peak = _to_kb(usage.ru_maxrss) if usage else None
+    return CommandResult(
+        stdout=buffers[STDOUT].text(),
+        stderr=buffers[STDERR].text(),
+        returncode=None if timed_out else process.returncode,
+        elapsed=time.monotonic() - start,
+        peak_rss_kb=peak if peak and peak > _to_kb(baseline) else None,
+        cpu_seconds=usage.ru_utime + usage.ru_stime if usage else None,
+        timed_out=timed_out,
+        output_bytes=buffers[STDOUT].total + buffers[STDERR].total,
+        detached_output=any(reader.is_alive() for reader in readers),
+    )
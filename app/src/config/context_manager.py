@@ -0,0 +1,258 @@
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+)
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from app.src.config.file_io import UNCHANGED_NOTICE
+import json
+
+
+DEFAULT_TOKEN_BUDGET = 48_000
+CHARS_PER_TOKEN = 3.5  # conservative for code and JSON heavy prompts
+MESSAGE_OVERHEAD = 4  # role and separator tokens per message
+KEEP_RECENT_MESSAGES = 12  # never compacted
+ELIDED_PREVIEW_CHARS = 300
+SUMMARY_SNIPPET_CHARS = 160
+FILE_READ_TOOLS = {"read_file"}
+READ_RANGE_ARGS = ("start_line", "end_line", "start_byte", "end_byte")
+SUMMARY_HEADER = "[Summary of earlier steps, compacted to save context]"
+ELIDED_NOTICE = "characters elided from an old tool output"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate based on character count."""
+    if not text:
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _content_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    # multimodal content blocks
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+
+def estimate_message_tokens(message: BaseMessage) -> int:
+    """Estimate the prompt tokens a single message will cost."""
+    tokens = MESSAGE_OVERHEAD + estimate_tokens(_content_text(message))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(tool_call["name"])
+        tokens += estimate_tokens(json.dumps(tool_call["args"], default=str))
+    return tokens
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class ContextManager:
+    """Keeps the message history sent to the model within a token budget.
+
+    When the estimated size of the history exceeds the budget, older
+    messages are compacted in three passes, stopping as soon as the history
+    fits:
+
+    1. Earlier reads of a file that was read again later are replaced by a
+       short pointer to the newer read.
+    2. Old tool outputs are elided down to a short preview.
+    3. Old assistant and tool messages are folded into one extractive
+       summary (tool calls made, files touched, notable replies).
+
+    User messages and the most recent ``keep_recent`` messages are never
+    touched.
+
+    Args:
+        token_budget: Maximum estimated tokens for the message history, or
+            None to disable compaction
+        keep_recent: Number of trailing messages kept verbatim
+    """
+
+    def __init__(
+        self,
+        token_budget: int | None = DEFAULT_TOKEN_BUDGET,
+        keep_recent: int = KEEP_RECENT_MESSAGES,
+    ):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.compactions = 0
+
+    def count_tokens(self, messages: list[BaseMessage]) -> int:
+        return sum(estimate_message_tokens(m) for m in messages)
+
+    def compact(self, messages: list[BaseMessage]) -> list[BaseMessage] | None:
+        """Return a compacted copy of the history, or None if it already fits."""
+        if not self.token_budget or self.count_tokens(messages) <= self.token_budget:
+            return None
+
+        boundary = self._protected_boundary(messages)
+        tool_calls = {
+            tool_call["id"]: tool_call
+            for message in messages
+            if isinstance(message, AIMessage)
+            for tool_call in message.tool_calls
+        }
+
+        compacted = self._drop_superseded_reads(messages, boundary, tool_calls)
+        if self.count_tokens(compacted) > self.token_budget:
+            compacted = self._elide_tool_outputs(compacted, boundary)
+        if self.count_tokens(compacted) > self.token_budget:
+            compacted = self._summarize(compacted, boundary)
+        return compacted
+
+    def _protected_boundary(self, messages: list[BaseMessage]) -> int:
+        """Index of the first message kept verbatim.
+
+        Moves back so a tool result is never separated from the assistant
+        message that requested it.
+        """
+        boundary = max(len(messages) - self.keep_recent, 0)
+        while boundary > 0 and isinstance(messages[boundary], ToolMessage):
+            boundary -= 1
+        return boundary
+
+    def _drop_superseded_reads(
+        self, messages: list[BaseMessage], boundary: int, tool_calls: dict
+    ) -> list[BaseMessage]:
+        latest_read = {}
+        for index, message in enumerate(messages):
+            key = self._read_key(message, tool_calls)
+            if key is not None:
+                latest_read[key] = index
+
+        result = []
+        for index, message in enumerate(messages):
+            key = self._read_key(message, tool_calls)
+            if index < boundary and key is not None and latest_read[key] != index:
+                message = message.model_copy(
+                    update={
+                        "content": f"[Superseded: {key[0]} was read again later in this conversation]"
+                    }
+                )
+            result.append(message)
+        return result
+
+    def _read_key(self, message: BaseMessage, tool_calls: dict) -> tuple | None:
+        """(path, range) of a file read; only a read of the same range supersedes it."""
+        if not isinstance(message, ToolMessage) or message.name not in FILE_READ_TOOLS:
+            return None
+        if _content_text(message).startswith(UNCHANGED_NOTICE):
+            # points back at the earlier read, which must therefore stay
+            return None
+        tool_call = tool_calls.get(message.tool_call_id)
+        if tool_call is None or tool_call["args"].get("file_path") is None:
+            return None
+        args = tool_call["args"]
+        return (args["file_path"], *(args.get(name) for name in READ_RANGE_ARGS))
+
+    def _elide_tool_outputs(
+        self, messages: list[BaseMessage], boundary: int
+    ) -> list[BaseMessage]:
+        result = []
+        for index, message in enumerate(messages):
+            text = _content_text(message)
+            if (
+                index < boundary
+                and isinstance(message, ToolMessage)
+                and len(text) > ELIDED_PREVIEW_CHARS
+                and ELIDED_NOTICE not in text[ELIDED_PREVIEW_CHARS:]
+            ):
+                message = message.model_copy(
+                    update={
+                        "content": text[:ELIDED_PREVIEW_CHARS]
+                        + f"\n[... {len(text) - ELIDED_PREVIEW_CHARS} {ELIDED_NOTICE} ...]"
+                    }
+                )
+            result.append(message)
+        return result
+
+    def _summarize(
+        self, messages: list[BaseMessage], boundary: int
+    ) -> list[BaseMessage]:
+        result, pending = [], []
+
+        def flush():
+            if pending:
+                result.append(self._summary_message(pending))
+                pending.clear()
+
+        for message in messages[:boundary]:
+            if isinstance(message, HumanMessage):
+                flush()
+                result.append(message)
+            else:
+                pending.append(message)
+        flush()
+
+        return result + messages[boundary:]
+
+    def _summary_message(self, messages: list[BaseMessage]) -> AIMessage:
+        lines = []
+        for message in messages:
+            if isinstance(message, AIMessage) and _content_text(message).startswith(
+                SUMMARY_HEADER
+            ):
+                # fold an earlier summary in as is instead of summarizing it again
+                lines.extend(_content_text(message).splitlines()[1:])
+            elif isinstance(message, AIMessage):
+                for tool_call in message.tool_calls:
+                    args = ", ".join(
+                        f"{key}={_shorten(str(value), 60)}"
+                        for key, value in tool_call["args"].items()
+                    )
+                    lines.append(f"- called {tool_call['name']}({args})")
+                text = _content_text(message).strip()
+                if text:
+                    lines.append(f"- said: {_shorten(text, SUMMARY_SNIPPET_CHARS)}")
+            elif isinstance(message, ToolMessage):
+                text = _content_text(message).strip()
+                if text.lower().startswith(("error", "[error]", "❌")):
+                    lines.append(f"- {message.name} failed: {_shorten(text, SUMMARY_SNIPPET_CHARS)}")
+
+        # takes the place of the first message it folds in
+        return AIMessage(
+            content=SUMMARY_HEADER + "\n" + "\n".join(lines), id=messages[0].id
+        )
+
+    def as_update(self, messages: list[BaseMessage]) -> dict:
+        """Graph state update with only the messages compaction changed.
+
+        Compacted messages keep their id, so the state's reducer replaces
+        them in place; messages folded into a summary are removed by id.
+        A history that stays over budget after earlier compactions thus
+        costs no update at all.
+        """
+        compacted = self.compact(messages)
+        if compacted is None:
+            return {}
+        if any(message.id is None for message in messages):
+            return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *compacted]}
+
+        original = {message.id: message for message in messages}
+        kept = {message.id for message in compacted}
+        update = [
+            RemoveMessage(id=message.id) for message in messages if message.id not in kept
+        ]
+        for message in compacted:
+            before = original.get(message.id)
+            if (
+                before is None
+                or type(before) is not type(message)
+                or before.content != message.content
+            ):
+                update.append(message)
+        if not update:
+            return {}
+        self.compactions += 1
+        return {"messages": update}
+
+
+context_manager = ContextManager()
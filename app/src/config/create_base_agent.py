@@ -1,12 +1,31 @@
 from langchain_cerebras import ChatCerebras
 from langgraph.graph.state import CompiledStateGraph
-from langchain_core.messages import ToolMessage
+from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.graph.message import add_messages
 from langgraph.graph import StateGraph, END, START
 from typing import TypedDict, Annotated
-from langgraph.prebuilt import ToolNode
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from app.src.config.checkpointer import get_checkpointer
+from app.src.config.llm_cache import get_llm_cache
+from app.src.config.context_manager import context_manager, estimate_tokens
+from app.src.config.rate_limiter import (
+    ainvoke_with_backoff,
+    invoke_with_backoff,
+    request_scheduler,
+)
+from app.src.config.tool_executor import ToolExecutor
+from app.src.config.tools import read_tool_output
+from app.src.config.toolcall_parser import (
+    ANSWER,
+    NATIVE,
+    RETRY,
+    SALVAGED,
+    looks_like_tool_call,
+    salvage_tool_calls,
+    toolcall_stats,
+)
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
 
 
 class State(TypedDict):
@@ -21,6 +40,8 @@ def create_base_agent(
     system_prompt: str,
     temperature: float = 0,
     include_graph: bool = False,
+    llm: ChatCerebras = None,
+    checkpointer: BaseCheckpointSaver = None,
 ) -> CompiledStateGraph | tuple[StateGraph, CompiledStateGraph]:
     """Create a base agent with common configuration and error handling.
 
@@ -31,18 +52,23 @@ def create_base_agent(
         system_prompt: System prompt for the agent
         temperature: Temperature for the model
         include_graph: Whether to include the graph in the response
+        llm: Optional shared chat model; a new client is created when omitted
+        checkpointer: Optional checkpoint saver; the process-wide one is used when omitted
 
     Returns:
         Compiled state graph agent or tuple of (graph, compiled_graph)
     """
 
-    llm = ChatCerebras(
-        model=model_name,
-        temperature=temperature,
-        timeout=None,
-        max_retries=5,
-        api_key=api_key,
-    )
+    if llm is None:
+        llm = ChatCerebras(
+            model=model_name,
+            temperature=temperature,
+            timeout=None,
+            max_retries=5,
+            api_key=api_key,
+            cache=get_llm_cache(),
+            rate_limiter=request_scheduler.limiter(api_key, model_name),
+        )
 
     template = ChatPromptTemplate.from_messages(
         [
@@ -51,6 +77,9 @@ def create_base_agent(
         ]
     )
 
+    if tools and read_tool_output not in tools:
+        # long outputs of any tool are spilled to disk and paged back with it
+        tools = [*tools, read_tool_output]
     if tools:
         llm_with_tools = llm.bind_tools(tools)
     else:
@@ -58,29 +87,72 @@ def create_base_agent(
     llm_chain = template | llm_with_tools
     graph = StateGraph(State)
 
-    def llm_node(state: State):
-        return {"messages": [llm_chain.invoke({"messages": state["messages"]})]}
+    system_tokens = estimate_tokens(system_prompt)
 
-    tool_node = ToolNode(tools=tools, handle_tool_errors=False)
+    def llm_node(state: State):
+        prompt_tokens = system_tokens + context_manager.count_tokens(state["messages"])
+        response = invoke_with_backoff(
+            lambda: llm_chain.invoke({"messages": state["messages"]}), prompt_tokens
+        )
+        return {"messages": [response]}
 
-    def forward(state: State):
-        return {}
+    async def allm_node(state: State):
+        prompt_tokens = system_tokens + context_manager.count_tokens(state["messages"])
+        response = await ainvoke_with_backoff(
+            lambda: llm_chain.ainvoke({"messages": state["messages"]}), prompt_tokens
+        )
+        return {"messages": [response]}
 
-    graph.add_node("llm", llm_node)
-    graph.add_node("tools", tool_node)
-    graph.add_node("toolcall_checker", forward)
+    tool_executor = ToolExecutor(tools=tools)
+    tools_by_name = {tool.name: tool for tool in tools or []}
 
-    graph.add_edge(START, "llm")
+    def toolcall_checker(state: State):
+        """Turn tool calls written into the content into real ones."""
+        ai_message = state["messages"][-1]
+        if ai_message.tool_calls:
+            toolcall_stats.record(NATIVE)
+            return {}
+
+        tool_calls, remaining = salvage_tool_calls(ai_message.content, tools_by_name)
+        if tool_calls:
+            toolcall_stats.record(SALVAGED)
+            # same id, so the salvaged message replaces the original one
+            return {
+                "messages": [
+                    ai_message.model_copy(
+                        update={"content": remaining, "tool_calls": tool_calls}
+                    )
+                ]
+            }
+
+        toolcall_stats.record(RETRY)
+        return {
+            "messages": [
+                HumanMessage(
+                    content="Error: Your tool call was malformed or non-JSON. Please fix and retry."
+                )
+            ]
+        }
+
+    def context_node(state: State):
+        return context_manager.as_update(state["messages"])
+
+    graph.add_node("context", context_node)
+    graph.add_node("llm", RunnableLambda(llm_node, afunc=allm_node))
+    graph.add_node("tools", RunnableLambda(tool_executor, afunc=tool_executor.acall))
+    graph.add_node("toolcall_checker", toolcall_checker)
+
+    graph.add_edge(START, "context")
+    graph.add_edge("context", "llm")
     graph.add_conditional_edges(
         "llm", tool_call_attempted, {"toolcall_checker": "toolcall_checker", END: END}
     )
     graph.add_conditional_edges(
         "toolcall_checker", valid_toolcall, {"tools": "tools", "llm": "llm"}
     )
-    graph.add_edge("tools", "llm")
+    graph.add_edge("tools", "context")
 
-    mem = MemorySaver()
-    built_graph = graph.compile(checkpointer=mem)
+    built_graph = graph.compile(checkpointer=checkpointer or get_checkpointer())
 
     if include_graph:
         return graph, built_graph
@@ -99,38 +171,20 @@ def tool_call_attempted(state: State):
         raise ValueError("No messages found in input state to check for tool calls.")
 
     # Check if tool calls were made or if it looks like the agent tried to make one
-    if tool_calls or any(
-        substr in content for substr in ("{", "}", "tool_call", "arguments")
-    ):
+    if tool_calls or (isinstance(content, str) and looks_like_tool_call(content)):
         return "toolcall_checker"
     else:
+        toolcall_stats.record(ANSWER)
         return END
 
 
 def valid_toolcall(state: State):
-    """Validate tool calls and handle malformed ones."""
+    """Route to the tools if the checker produced tool calls, else back to the model."""
 
-    if state["messages"]:
-        ai_message = state["messages"][-1]
-        content = ai_message.content
-        tool_calls = ai_message.tool_calls
-    else:
+    if not state["messages"]:
         raise ValueError("No messages found in input state to check for tool calls.")
 
-    # Check for malformed tool calls
-    if not tool_calls and any(
-        substr in content for substr in ("{", "}", "tool_call", "arguments", "<tool")
-    ):
-        error_message = ToolMessage(
-            tool_call_id="retry",
-            content="Error: Your tool call was malformed or non-JSON. Please fix and retry.",
-            invalid=True,
-        )
-
-        if "messages" not in state:
-            state["messages"] = []
-        state["messages"].append(error_message)
-
-        return "llm"
-    else:
+    ai_message = state["messages"][-1]
+    if isinstance(ai_message, AIMessage) and ai_message.tool_calls:
         return "tools"
+    return "llm"
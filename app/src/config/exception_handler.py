@@ -1,10 +1,20 @@
 from app.src.config.permissions import PermissionDeniedException
+from app.src.config.llm_cache import ReplayMissError
 from app.src.config.ui import AgentUI
-from typing import Callable, Any
-import langgraph
+from typing import Callable, Awaitable, Any
+import langgraph.errors
+import asyncio
 import openai
 
 
+# failures after which the interrupted run can continue from its last checkpoint
+RESUMABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,  # includes openai.APITimeoutError
+    TimeoutError,
+)
+
+
 class AgentExceptionHandler:
     """Centralized exception handling for agent operations."""
 
@@ -18,33 +28,92 @@ class AgentExceptionHandler:
 
         try:
             return operation(), False
+        except Exception as e:
+            return AgentExceptionHandler._handle_exception(
+                e, ui, propagate, continue_prompt
+            )
 
-        except PermissionDeniedException:
+    @staticmethod
+    async def ahandle_agent_exceptions(
+        operation: Callable[[], Awaitable],
+        ui: AgentUI,
+        propagate: bool = False,
+        continue_prompt: str = "Continue where you left. Don't repeat anything already done.",
+    ) -> tuple[Any, bool]:
+        """Async variant of handle_agent_exceptions for coroutine operations."""
+
+        try:
+            return await operation(), False
+        except Exception as e:
             if propagate:
                 raise
+            # reporting may prompt the user, keep it off the event loop
+            return await asyncio.to_thread(
+                AgentExceptionHandler._handle_exception,
+                e,
+                ui,
+                propagate,
+                continue_prompt,
+            )
+
+    @staticmethod
+    def handle_exception(
+        e: Exception,
+        ui: AgentUI,
+        propagate: bool = False,
+        continue_prompt: str = "Continue where you left. Don't repeat anything already done.",
+    ) -> tuple[Any, bool]:
+        """Report an exception that was already caught.
+
+        Returns the same (result, should_continue) pair as
+        handle_agent_exceptions; should_continue means the user chose to
+        resume the interrupted run.
+        """
+        return AgentExceptionHandler._handle_exception(
+            e, ui, propagate, continue_prompt
+        )
+
+    @staticmethod
+    def _handle_exception(
+        e: Exception, ui: AgentUI, propagate: bool, continue_prompt: str
+    ) -> tuple[Any, bool]:
+
+        if isinstance(e, PermissionDeniedException):
+            if propagate:
+                raise e
             ui.error("Permission denied")
             return None, False
 
-        except langgraph.errors.GraphRecursionError:
+        if isinstance(e, langgraph.errors.GraphRecursionError):
             if propagate:
-                raise
+                raise e
             ui.warning("Agent processing took longer than expected")
             if ui.confirm("Continue from where left off?", default=True):
                 return continue_prompt, True
             return None, False
 
-        except openai.RateLimitError:
+        if isinstance(e, RESUMABLE_ERRORS):
             if propagate:
-                raise
-            ui.error("Rate limit exceeded. Please try again later")
+                raise e
+            if isinstance(e, openai.RateLimitError):
+                ui.error("Rate limit exceeded")
+            else:
+                ui.error(f"The model request failed: {e}")
+            if ui.confirm("Resume from the last completed step?", default=True):
+                return continue_prompt, True
             return None, False
 
-        except Exception as e:
+        if isinstance(e, ReplayMissError):
             if propagate:
-                raise
-            ui.error(f"An unexpected error occurred: {e}")
+                raise e
+            ui.error(f"Replay failed: {e}")
             return None, False
 
+        if propagate:
+            raise e
+        ui.error(f"An unexpected error occurred: {e}")
+        return None, False
+
     @staticmethod
     def with_retry(
         operation: Callable,
@@ -0,0 +1,536 @@
+from app.src.config.workspace_cache import workspace_cache
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import tempfile
+import difflib
+import codecs
+import mmap
+import os
+
+
+READ_MAX_BYTES = 64 * 1024  # default cap on the text returned by one read
+READ_HARD_LIMIT = 1024 * 1024  # no single read returns more than this
+MMAP_THRESHOLD = 1024 * 1024  # files at least this big are memory-mapped
+SNIFF_BYTES = 8 * 1024
+SCAN_CHUNK = 1024 * 1024  # bytes examined at a time when counting lines
+MAX_WRITE_WORKERS = 8
+
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# start of the notice read_file returns instead of content the model already has
+UNCHANGED_NOTICE = "[Unchanged since your last read"
+# encodings whose newline is not a single byte; read by decoding the whole file
+WIDE_ENCODINGS = ("utf-16", "utf-32")
+# bytes that never appear in text files (everything below 0x20 but \b \t \n \f \r and ESC)
+CONTROL_BYTES = bytes(set(range(32)) - {8, 9, 10, 12, 13, 27})
+
+# the umask can only be read by setting it, so it is read once, before any thread
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+# mode of a file created with open(), which mkstemp's 0600 replaces
+DEFAULT_FILE_MODE = 0o666 & ~_UMASK
+
+
+def sniff_encoding(sample: bytes) -> str | None:
+    """Guess the encoding of a file from its first bytes.
+
+    Returns None for binary content. Files with a byte order mark use the
+    matching codec, valid UTF-8 is UTF-8 and anything else falls back to
+    latin-1, which decodes every byte.
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if b"\0" in sample:
+        return None
+    if sample and len(sample.translate(None, CONTROL_BYTES)) < len(sample) * 0.9:
+        return None
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # a multi-byte character cut off by the end of the sample is fine
+        if e.reason != "unexpected end of data":
+            return "latin-1"
+    return "utf-8"
+
+
+def _count_lines(buffer, start: int, end: int) -> int:
+    count = 0
+    for position in range(start, end, SCAN_CHUNK):
+        count += buffer[position : min(position + SCAN_CHUNK, end)].count(b"\n")
+    return count
+
+
+def _line_offset(buffer, line: int, size: int) -> int:
+    """Byte offset at which a 1-based line starts, or size past the end."""
+    remaining = line - 1
+    position = 0
+    while remaining > 0 and position < size:
+        chunk = buffer[position : position + SCAN_CHUNK]
+        newlines = chunk.count(b"\n")
+        if newlines < remaining:
+            remaining -= newlines
+            position += len(chunk)
+            continue
+        index = -1
+        for _ in range(remaining):
+            index = chunk.find(b"\n", index + 1)
+        return position + index + 1
+    return position if remaining == 0 else size
+
+
+def _past_end(file_path: str, described: str, requested: str) -> str:
+    return (
+        f"[File: {file_path} | {described} | "
+        f"{requested} is past the end of the file, nothing to show]"
+    )
+
+
+def _read_wide_text(
+    file_path: str,
+    text: str,
+    size: int,
+    encoding: str,
+    start_line: int | None,
+    end_line: int | None,
+    max_bytes: int,
+) -> str:
+    lines = text.splitlines(keepends=True)
+    first_line = max(start_line or 1, 1)
+    if first_line > len(lines):
+        described = f"{len(lines)} lines, {size} bytes | {encoding}"
+        return _past_end(file_path, described, f"start_line={first_line}")
+    selected = lines[first_line - 1 : end_line]
+
+    width = 2 if encoding == "utf-16" else 4  # bytes per character, near enough
+    shown, used = [], 0
+    for line in selected:
+        used += len(line) * width
+        if used > max_bytes and shown:
+            break
+        shown.append(line)
+    last_line = first_line + max(len(shown), 1) - 1
+
+    header = f"[File: {file_path} | {len(lines)} lines, {size} bytes | {encoding}"
+    if len(shown) == len(lines):
+        header += "]"
+    else:
+        header += f" | showing lines {first_line}-{last_line}]"
+    result = f"{header}\n{''.join(shown)}"
+    if len(shown) < len(selected):
+        result += (
+            f"\n[... truncated, {len(selected) - len(shown)} more lines in the requested "
+            f"range. Continue with start_line={last_line + 1} ...]"
+        )
+    return result
+
+
+def read_text_range(
+    file_path: str,
+    start_line: int | None = None,
+    end_line: int | None = None,
+    start_byte: int | None = None,
+    end_byte: int | None = None,
+    max_bytes: int = READ_MAX_BYTES,
+) -> str:
+    """Read part of a text file, prefixed with a header describing the file.
+
+    Line numbers are 1-based and inclusive; byte offsets are 0-based with an
+    exclusive end. Files of MMAP_THRESHOLD bytes or more are memory-mapped,
+    so only the requested slice (and a bounded scan window) is ever copied
+    into memory; smaller ones come from the workspace cache.
+
+    Raises:
+        ValueError: If both a line and a byte range are given, or a range
+            that is inverted or empty
+        OSError: If the file cannot be opened
+    """
+    if (start_line or end_line) and (start_byte is not None or end_byte is not None):
+        raise ValueError("Use either a line range or a byte range, not both")
+    if end_line is not None and end_line < 1:
+        raise ValueError(f"end_line={end_line} is not a line, lines are numbered from 1")
+    if end_line is not None and end_line < (start_line or 1):
+        raise ValueError(f"end_line={end_line} is before start_line={start_line}, nothing to read")
+    if end_byte is not None and end_byte <= (start_byte or 0):
+        raise ValueError(
+            f"end_byte={end_byte} is not after start_byte={start_byte or 0}, nothing to read"
+        )
+    max_bytes = max(1, min(max_bytes or READ_MAX_BYTES, READ_HARD_LIMIT))
+
+    if os.path.getsize(file_path) >= MMAP_THRESHOLD:
+        with open(file_path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    else:
+        buffer = workspace_cache.read_bytes(file_path)
+    size = len(buffer)
+
+    try:
+        encoding = sniff_encoding(buffer[:SNIFF_BYTES])
+        if encoding is None:
+            return f"[File: {file_path} | {size} bytes | binary file, content not shown]"
+        if size == 0:
+            return f"[File: {file_path} | 0 lines, 0 bytes | empty file]"
+        if encoding in WIDE_ENCODINGS:
+            if start_byte is not None or end_byte is not None:
+                raise ValueError(f"Byte ranges are not supported for {encoding} files")
+            return _read_wide_text(
+                file_path, buffer[:].decode(encoding, errors="replace"),
+                size, encoding, start_line, end_line, max_bytes,
+            )
+
+        total_lines = _count_lines(buffer, 0, size)
+        if buffer[size - 1 : size] != b"\n":
+            total_lines += 1
+        described = f"{total_lines} lines, {size} bytes"
+        if encoding not in ("utf-8", "utf-8-sig"):
+            described += f" | {encoding}"
+
+        if start_byte is not None or end_byte is not None:
+            if (start_byte or 0) >= size:
+                return _past_end(file_path, described, f"start_byte={start_byte}")
+            start = min(max(start_byte or 0, 0), size)
+            end = size if end_byte is None else min(max(end_byte, start), size)
+            first_line = _count_lines(buffer, 0, start) + 1
+        else:
+            first_line = max(start_line or 1, 1)
+            if first_line > total_lines:
+                return _past_end(file_path, described, f"start_line={first_line}")
+            start = _line_offset(buffer, first_line, size)
+            end = size if end_line is None else _line_offset(buffer, end_line + 1, size)
+            end = max(end, start)
+
+        truncated = end - start > max_bytes
+        if truncated:
+            cut = start + max_bytes
+            # stop at a line boundary when the cut leaves at least one line
+            newline = buffer.rfind(b"\n", start, cut)
+            stop = newline + 1 if newline != -1 else cut
+        else:
+            stop = end
+
+        text = buffer[start:stop].decode(encoding, errors="replace")
+        shown_lines = _count_lines(buffer, start, stop)
+        if stop > start and buffer[stop - 1 : stop] != b"\n":
+            shown_lines += 1
+    finally:
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+
+    last_line = first_line + max(shown_lines, 1) - 1
+    header = f"[File: {file_path} | {total_lines} lines, {size} bytes"
+    if encoding not in ("utf-8", "utf-8-sig"):
+        header += f" | {encoding}"
+    if start == 0 and stop == size:
+        header += "]"
+    else:
+        header += f" | showing lines {first_line}-{last_line}, bytes {start}-{stop}]"
+
+    result = f"{header}\n{text}"
+    if truncated:
+        result += (
+            f"\n[... truncated after {stop - start} bytes, {end - stop} more bytes in the "
+            f"requested range. Continue with start_line={last_line + 1} "
+            f"or start_byte={stop} ...]"
+        )
+    return result
+
+
+def atomic_write(
+    file_path: str, content: str, encoding: str = "utf-8", mode: int | None = None
+):
+    """Write a file through a temporary sibling and an atomic rename.
+
+    Readers (and a crash midway) see either the old or the new content,
+    never a partially written file. The file gets ``mode`` if given, else
+    the mode of the file it replaces, else the mode open() would give a
+    new file.
+    """
+    atomic_write_bytes(file_path, content.encode(encoding), mode)
+
+
+def atomic_write_bytes(file_path: str, data: bytes, mode: int | None = None):
+    """Binary variant of atomic_write."""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(file_path)}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is None:
+            try:
+                mode = os.stat(file_path).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = DEFAULT_FILE_MODE
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+@dataclass
+class EditResult:
+    """Outcome of one edit of a batch."""
+
+    file_path: str
+    ok: bool
+    message: str
+
+
+def _line_number(content: str, index: int) -> int:
+    return content.count("\n", 0, index) + 1
+
+
+def diff_stat(before: str, after: str) -> tuple[int, int]:
+    added = removed = 0
+    for line in difflib.unified_diff(before.splitlines(), after.splitlines(), lineterm="", n=0):
+        if line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            removed += 1
+    return added, removed
+
+
+def apply_edits(edits: list[dict]) -> tuple[list[EditResult], list[str]]:
+    """Validate and apply a batch of exact-match replacements.
+
+    Edits apply in order, so a later edit of the same file sees the result
+    of the earlier ones. Every edit is checked before anything is written:
+    if one fails, no file changes. Otherwise each changed file is written
+    once, atomically; should a write fail, the files already written are
+    restored.
+
+    Args:
+        edits: Dicts with file_path, old_content, new_content and an
+            optional replace_all flag
+
+    Returns:
+        Tuple of (one result per edit, one diff summary line per changed file)
+    """
+    originals: dict[str, str] = {}
+    updated: dict[str, str] = {}
+    results: list[EditResult] = []
+
+    for edit in edits:
+        file_path = edit.get("file_path", "")
+        old, new = edit.get("old_content", ""), edit.get("new_content", "")
+        path = os.path.abspath(file_path)
+
+        if path not in updated:
+            try:
+                originals[path] = updated[path] = workspace_cache.read_text(path)
+            except (OSError, UnicodeDecodeError) as e:
+                results.append(EditResult(file_path, False, f"cannot read file: {e}"))
+                continue
+
+        content = updated[path]
+        count = content.count(old) if old else 0
+        if count == 0:
+            results.append(EditResult(file_path, False, "old_content not found"))
+            continue
+        if count > 1 and not edit.get("replace_all"):
+            lines = []
+            start = content.find(old)
+            while start != -1 and len(lines) < 5:
+                lines.append(str(_line_number(content, start)))
+                start = content.find(old, start + 1)
+            results.append(
+                EditResult(
+                    file_path,
+                    False,
+                    f"old_content matches {count} times (lines {', '.join(lines)}); "
+                    "add surrounding context or set replace_all",
+                )
+            )
+            continue
+
+        line = _line_number(content, content.find(old))
+        updated[path] = content.replace(old, new)
+        replaced = f"{count} occurrences" if count > 1 else "1 occurrence"
+        results.append(EditResult(file_path, True, f"replaced {replaced} at line {line}"))
+
+    if not all(result.ok for result in results):
+        return results, []
+
+    written = write_changes(originals, updated)
+    summary = []
+    for path in written:
+        added, removed = diff_stat(originals[path], updated[path])
+        summary.append(f"{path}: +{added} -{removed} lines")
+    return results, summary
+
+
+def write_changes(originals: dict[str, str | None], updated: dict[str, str | None]) -> list[str]:
+    """Write the files of a validated batch whose content changed.
+
+    A content of None stands for a file that does not exist: None in
+    ``originals`` creates the file, None in ``updated`` deletes it. Each
+    file is written atomically; should a write fail, the files already
+    written get their original content and mode back.
+
+    Returns:
+        Paths written, in batch order
+
+    Raises:
+        OSError: If a file could not be written or deleted
+    """
+    written: list[str] = []
+    modes: dict[str, int] = {}
+    try:
+        for path, content in updated.items():
+            if content == originals[path]:
+                continue
+            if originals[path] is not None:
+                modes[path] = os.stat(path).st_mode & 0o7777
+            if content is None:
+                os.remove(path)
+                written.append(path)
+                workspace_cache.invalidate(path)
+                continue
+            if originals[path] is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, content)
+            written.append(path)
+            workspace_cache.store(path, content.encode("utf-8"))
+    except OSError:
+        for path in written:
+            if originals[path] is None:
+                os.remove(path)
+            else:
+                atomic_write(path, originals[path], mode=modes[path])
+            workspace_cache.invalidate(path)
+        raise
+    return written
+
+
+@dataclass
+class WrittenFile:
+    file_path: str
+    lines: int
+    size: int
+    overwritten: bool
+
+
+def validate_new_files(
+    files: list[dict], directories: list[str], overwrite: bool
+) -> list[str]:
+    """Problems that would stop a batch of files from being created."""
+    problems, seen = [], {}
+    for spec in files:
+        file_path = spec.get("file_path") or ""
+        path = os.path.abspath(file_path)
+        if not file_path.strip():
+            problems.append("a file has an empty path")
+        elif path in seen:
+            problems.append(f"{file_path}: listed more than once")
+        elif os.path.isdir(path):
+            problems.append(f"{file_path}: is an existing directory")
+        elif os.path.exists(path) and not overwrite:
+            problems.append(f"{file_path}: already exists (set overwrite to replace it)")
+        else:
+            seen[path] = file_path
+
+    for path, file_path in seen.items():
+        # a parent must not be an existing file, nor another file of the batch
+        parent = os.path.dirname(path)
+        while parent and parent != os.path.dirname(parent):
+            if parent in seen or os.path.isfile(parent):
+                problems.append(f"{file_path}: parent {parent} is a file")
+                break
+            parent = os.path.dirname(parent)
+    for directory in directories:
+        if os.path.abspath(directory) in seen or os.path.isfile(directory):
+            problems.append(f"{directory}: is a file, cannot create a directory")
+    return problems
+
+
+def write_files(files: list[dict], directories: list[str] = ()) -> tuple[list[WrittenFile], list[str]]:
+    """Create directories and write a batch of files concurrently.
+
+    Each file is written atomically. If any write fails, the batch is
+    undone: new files are removed, overwritten ones get their previous
+    content and mode back and the new directories that are left empty are
+    removed. New files get the mode open() would give them; overwritten
+    ones keep theirs, so an executable script stays executable.
+
+    Returns:
+        Tuple of (written files in manifest order, directories created)
+
+    Raises:
+        OSError: If a directory or file could not be created
+    """
+    previous: dict[str, bytes | None] = {}
+    modes: dict[str, int] = {}
+    created_dirs = []
+
+    def write(spec: dict) -> WrittenFile:
+        path = os.path.abspath(spec["file_path"])
+        content = spec.get("content") or ""
+        atomic_write(path, content)
+        data = content.encode("utf-8")
+        workspace_cache.store(path, data)
+        return WrittenFile(
+            spec["file_path"],
+            content.count("\n") + (0 if content.endswith("\n") or not content else 1),
+            len(data),
+            previous[path] is not None,
+        )
+
+    try:
+        wanted = {os.path.abspath(d) for d in directories}
+        wanted |= {os.path.dirname(os.path.abspath(spec["file_path"])) for spec in files}
+        for directory in sorted(wanted):
+            missing = []
+            while directory and not os.path.isdir(directory):
+                missing.append(directory)
+                directory = os.path.dirname(directory)
+            for directory in reversed(missing):
+                os.mkdir(directory)
+                created_dirs.append(directory)
+
+        for spec in files:
+            path = os.path.abspath(spec["file_path"])
+            try:
+                with open(path, "rb") as f:
+                    previous[path] = f.read()
+                    modes[path] = os.fstat(f.fileno()).st_mode & 0o7777
+            except FileNotFoundError:
+                previous[path] = None
+
+        with ThreadPoolExecutor(max_workers=MAX_WRITE_WORKERS) as pool:
+            futures = [pool.submit(write, spec) for spec in files]
+        return [future.result() for future in futures], created_dirs
+    except BaseException:
+        _undo_writes(previous, modes, created_dirs)
+        raise
+
+
+def _undo_writes(
+    previous: dict[str, bytes | None], modes: dict[str, int], created_dirs: list[str]
+):
+    for path, data in previous.items():
+        try:
+            if data is None:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                atomic_write_bytes(path, data, mode=modes[path])
+        except OSError:
+            pass
+        workspace_cache.invalidate(path)
+    for directory in reversed(created_dirs):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
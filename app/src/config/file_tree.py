@@ -0,0 +1,323 @@
+from app.src.config.workspace_cache import workspace_cache, DirItem
+from dataclasses import dataclass, field
+import fnmatch
+import json
+import os
+import re
+
+
+DEFAULT_MAX_DEPTH = 4
+DEFAULT_MAX_ENTRIES = 500
+DIR_ENTRY_LIMIT = 50  # files (and, separately, directories) shown per directory
+
+# never expanded: dependency, cache and build output directories
+IGNORED_DIRS = {
+    ".git",
+    ".hg",
+    ".svn",
+    "node_modules",
+    "__pycache__",
+    ".venv",
+    "venv",
+    ".tox",
+    ".nox",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+    ".idea",
+    ".vscode",
+    "dist",
+    "build",
+    ".next",
+    "target",
+}
+IGNORED_FILES = ("*.pyc", "*.pyo", "*.so", "*.o", ".DS_Store", "*.egg-info")
+
+
+@dataclass
+class IgnoreRule:
+    """One pattern of a .gitignore file, relative to the directory holding it."""
+
+    base: str
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return False
+            rel_path = rel_path[len(self.base) + 1 :]
+        return self.regex.fullmatch(rel_path) is not None
+
+
+def _glob_to_regex(pattern: str, anchored: bool) -> re.Pattern:
+    parts, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1 :]:
+            end = pattern.index("]", i + 1)
+            parts.append("[" + pattern[i + 1 : end].replace("!", "^", 1) + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    # a matched directory also covers everything inside it
+    return re.compile(prefix + "".join(parts) + "(?:/.*)?")
+
+
+def parse_gitignore(text: str, base: str = "") -> list[IgnoreRule]:
+    """Parse .gitignore content into rules relative to ``base``.
+
+    Supports comments, negation, directory-only patterns, anchoring by a
+    slash and ``**``; character escapes are not supported.
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        # a leading or inner slash anchors the pattern, a trailing one does not
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if line:
+            rules.append(IgnoreRule(base, _glob_to_regex(line, anchored), negate, dir_only))
+    return rules
+
+
+def load_gitignore(directory: str, base: str) -> list[IgnoreRule]:
+    """Rules of the .gitignore in a directory, if it has one."""
+    try:
+        with open(os.path.join(directory, ".gitignore"), "r", encoding="utf-8") as f:
+            return parse_gitignore(f.read(), base)
+    except (OSError, UnicodeDecodeError):
+        return []
+
+
+def is_ignored(name: str, rel_path: str, is_dir: bool, rules: list[IgnoreRule]) -> bool:
+    """Whether an entry is excluded by the built-in list or .gitignore rules."""
+    if is_dir and name in IGNORED_DIRS:
+        return True
+    if not is_dir and any(fnmatch.fnmatch(name, pattern) for pattern in IGNORED_FILES):
+        return True
+    ignored = False
+    for rule in rules:
+        if rule.negate == ignored and rule.matches(rel_path, is_dir):
+            ignored = not rule.negate
+    return ignored
+
+
+@dataclass
+class TreeEntry:
+    """One line of a listing.
+
+    ``kind`` is "file", "dir" or "more" (a collapsed count of siblings);
+    ``note`` says why a directory was not expanded.
+    """
+
+    path: str
+    name: str
+    kind: str
+    depth: int
+    last: bool
+    size: int | None = None
+    note: str | None = None
+
+
+@dataclass
+class TreeListing:
+    root: str
+    entries: list[TreeEntry] = field(default_factory=list)
+    truncated: bool = False
+
+
+def _scan(path: str) -> tuple[list[DirItem], list[DirItem]]:
+    files, dirs = [], []
+    for item in workspace_cache.scan_dir(path):
+        (dirs if item.is_dir else files).append(item)
+    files.sort(key=lambda item: item.name)
+    dirs.sort(key=lambda item: item.name)
+    return files, dirs
+
+
+def walk_tree(
+    path: str,
+    max_depth: int = DEFAULT_MAX_DEPTH,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    show_ignored: bool = False,
+    with_sizes: bool = False,
+) -> TreeListing:
+    """List a directory tree breadth-limited, depth-limited and ignore-aware.
+
+    Walks iteratively over ``os.scandir`` listings, served from the
+    workspace cache while a directory is unchanged, with no extra stat calls
+    unless sizes are requested. Ignored and too
+    deep directories are listed but not expanded; directories with more
+    than DIR_ENTRY_LIMIT files or subdirectories are collapsed into a
+    "more" entry. The walk stops after ``max_entries`` lines.
+
+    Raises:
+        OSError: If the root directory cannot be read
+    """
+    listing = TreeListing(os.path.abspath(path))
+    max_depth = max(max_depth, 1)
+    root_rules = [] if show_ignored else load_gitignore(path, "")
+    # frames of (directory path, relative path, depth, rules, pending entries)
+    stack = [(path, "", 0, root_rules, None)]
+
+    while stack:
+        directory, rel_dir, depth, rules, pending = stack.pop()
+        if pending is None:
+            try:
+                files, dirs = _scan(directory)
+            except OSError as e:
+                if depth == 0:
+                    raise
+                listing.entries.append(
+                    TreeEntry(rel_dir, "", "more", depth, True, note=f"❌ {e.strerror or e}")
+                )
+                continue
+            pending = _visible(files, dirs, rel_dir, depth, rules, show_ignored)
+            if not pending:
+                continue
+            pending.reverse()
+
+        while pending:
+            if len(listing.entries) >= max_entries:
+                listing.truncated = True
+                return listing
+            entry = pending.pop()
+            if isinstance(entry, TreeEntry):
+                entry.last = not pending
+                listing.entries.append(entry)
+                continue
+
+            item, rel_path, is_dir, note = entry
+            line = TreeEntry(
+                rel_path,
+                item.name,
+                "dir" if is_dir else "file",
+                depth,
+                not pending,
+                note=note,
+            )
+            if with_sizes and not is_dir:
+                try:
+                    line.size = os.stat(item.path, follow_symlinks=False).st_size
+                except OSError:
+                    pass
+            listing.entries.append(line)
+
+            if is_dir and note is None:
+                if depth + 1 >= max_depth:
+                    line.note = "depth limit"
+                    continue
+                child_rules = rules
+                if not show_ignored:
+                    child_rules = rules + load_gitignore(item.path, rel_path)
+                # resume this directory after its child
+                stack.append((directory, rel_dir, depth, rules, pending))
+                stack.append((item.path, rel_path, depth + 1, child_rules, None))
+                break
+    return listing
+
+
+def _visible(files, dirs, rel_dir, depth, rules, show_ignored) -> list:
+    """Entries of one directory to list, in display order."""
+    visible = []
+    for group, is_dir in ((files, False), (dirs, True)):
+        shown = 0
+        for item in group:
+            rel_path = f"{rel_dir}/{item.name}" if rel_dir else item.name
+            note = None
+            if not show_ignored and is_ignored(item.name, rel_path, is_dir, rules):
+                if not is_dir:
+                    continue
+                note = "ignored"
+            elif is_dir and item.is_symlink:
+                note = "symlink"
+            if shown == DIR_ENTRY_LIMIT:
+                hidden = len(group) - group.index(item)
+                label = "directories" if is_dir else "files"
+                visible.append(
+                    TreeEntry(rel_dir, f"... {hidden} more {label}", "more", depth, False)
+                )
+                break
+            visible.append((item, rel_path, is_dir, note))
+            shown += 1
+    return visible
+
+
+def render_tree(listing: TreeListing) -> str:
+    """ASCII tree in the format list_directory has always produced."""
+    lines = [f"{listing.root}/", "│"]
+    # child prefix of the open directory at each depth
+    prefixes = [""]
+    previous = None
+    for entry in listing.entries:
+        del prefixes[entry.depth + 1 :]
+        # connector line after the contents of a directory that has siblings below
+        if previous is not None and previous.depth > entry.depth:
+            lines.append(prefixes[entry.depth] + "│")
+        parent_prefix = prefixes[entry.depth]
+        if entry.depth == 0:
+            prefix = ""
+        else:
+            prefix = parent_prefix + ("└── " if entry.last else "├── ")
+
+        name = entry.name + "/" if entry.kind == "dir" else entry.name
+        if entry.note:
+            name += f" ({entry.note})" if entry.kind == "dir" else entry.note
+        lines.append(prefix + name)
+
+        if entry.kind == "dir":
+            if entry.depth == 0:
+                prefixes.append("│   ")
+            else:
+                prefixes.append(parent_prefix + ("    " if entry.last else "│   "))
+        previous = entry
+
+    if listing.truncated:
+        lines.append(
+            f"[... listing stopped after {len(listing.entries)} entries; pass a "
+            "subdirectory, a smaller max_depth or a larger max_entries ...]"
+        )
+    return "\n".join(lines)
+
+
+def render_json(listing: TreeListing) -> str:
+    """Flat machine-readable listing with paths relative to the root."""
+    entries = []
+    for entry in listing.entries:
+        if entry.kind == "more":
+            entries.append({"path": entry.path, "type": "more", "summary": entry.name})
+            continue
+        item = {"path": entry.path, "type": entry.kind}
+        if entry.size is not None:
+            item["size"] = entry.size
+        if entry.note:
+            item["expanded"] = False
+            item["reason"] = entry.note
+        entries.append(item)
+    return json.dumps(
+        {"root": listing.root, "entries": entries, "truncated": listing.truncated}
+    )
@@ -0,0 +1,113 @@
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from contextlib import contextmanager
+import contextvars
+import requests
+import atexit
+import time
+
+
+POOL_CONNECTIONS = 32  # hosts whose connections are kept
+POOL_MAXSIZE = 4  # idle connections kept per host
+RETRIES = 3  # for transient server errors
+RETRY_BACKOFF = 0.3  # seconds, doubled after each retry
+RETRY_STATUSES = (500, 502, 503, 504)
+MAX_RETRY_WAIT = 2  # seconds, caps Retry-After and backoff
+ACCEPT_ENCODING = "gzip, deflate"
+
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "http_deadline", default=None
+)
+
+
+@contextmanager
+def request_deadline(deadline: float | None):
+    """Stop retrying requests made in this context once time.monotonic() passes ``deadline``."""
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class BoundedRetry(Retry):
+    """Retry that never waits longer than MAX_RETRY_WAIT, nor past the caller's deadline.
+
+    Servers can ask for any Retry-After; honouring it unbounded would let
+    one overloaded host stall a tool call for minutes.
+    """
+
+    def _remaining(self) -> float | None:
+        deadline = _deadline.get()
+        return None if deadline is None else deadline - time.monotonic()
+
+    def is_exhausted(self) -> bool:
+        remaining = self._remaining()
+        if remaining is not None and remaining <= 0:
+            return True
+        return super().is_exhausted()
+
+    def sleep(self, response=None):
+        wait = self.get_retry_after(response) if response is not None else None
+        if wait is None or not self.respect_retry_after_header:
+            wait = self.get_backoff_time()
+        wait = min(wait, MAX_RETRY_WAIT)
+        remaining = self._remaining()
+        if remaining is not None:
+            wait = min(wait, max(remaining, 0))
+        if wait > 0:
+            time.sleep(wait)
+
+
+def create_session(
+    pool_connections: int = POOL_CONNECTIONS,
+    pool_maxsize: int = POOL_MAXSIZE,
+    retries: int = RETRIES,
+    backoff: float = RETRY_BACKOFF,
+) -> requests.Session:
+    """HTTP session that keeps connections alive and retries transient errors.
+
+    Connections (with their DNS lookup and TLS handshake) are reused for
+    later requests to the same host. GET and HEAD requests answered with a
+    5xx status in RETRY_STATUSES are retried with exponential backoff,
+    honouring Retry-After up to MAX_RETRY_WAIT; after the last retry the
+    response is returned, so ``raise_for_status`` reports it. A connection
+    that fails to open is retried once, which also covers pooled
+    connections the server closed. Read timeouts are not retried, and
+    inside ``request_deadline`` no retry starts after the deadline.
+
+    The session is configured here and not changed afterwards, so one
+    instance can be shared by threads: its connection pools are thread-safe.
+
+    Args:
+        pool_connections: Number of hosts to keep connections for
+        pool_maxsize: Idle connections kept per host
+        retries: Retries for responses with a status in RETRY_STATUSES
+        backoff: Backoff factor between retries, in seconds
+    """
+    retry = BoundedRetry(
+        total=retries + 1,
+        connect=1,
+        read=0,
+        other=0,
+        status=retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        backoff_factor=backoff,
+        backoff_max=MAX_RETRY_WAIT,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return session
+
+
+http_session = create_session()
+atexit.register(http_session.close)
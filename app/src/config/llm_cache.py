@@ -0,0 +1,271 @@
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.outputs import ChatGeneration
+from langchain_core.messages import AIMessage
+from langchain_core.load import dumps, loads
+from app.utils.constants import DATA_DIR
+from typing import Any
+import threading
+import warnings
+import hashlib
+import asyncio
+import sqlite3
+import atexit
+import json
+import time
+import os
+
+
+DEFAULT_CACHE_PATH = os.path.join(DATA_DIR, "llm_cache.sqlite")
+DEFAULT_CACHE_BUDGET = 512 * 1024 * 1024  # bytes
+
+# cache modes
+OFF = "off"
+CACHE = "cache"  # serve hits, store misses
+RECORD = "record"  # always call the provider and store every response
+REPLAY = "replay"  # never call the provider; a miss is an error
+MODES = (OFF, CACHE, RECORD, REPLAY)
+
+# message fields that differ between runs without changing the request
+VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    generations TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+"""
+
+
+class ReplayMissError(Exception): ...
+
+
+def _canonical_prompt(prompt: str) -> str:
+    """Serialized messages without the fields that change on every run.
+
+    Message ids are dropped and tool call ids are renumbered in order of
+    appearance, so a replayed conversation hashes like the recorded one.
+    """
+    try:
+        messages = json.loads(prompt)
+    except json.JSONDecodeError:
+        return prompt
+    if not isinstance(messages, list):
+        return prompt
+
+    call_ids: dict[str, str] = {}
+
+    def call_id(value: str) -> str:
+        return call_ids.setdefault(value, f"call_{len(call_ids)}")
+
+    for message in messages:
+        kwargs = message.get("kwargs") if isinstance(message, dict) else None
+        if not isinstance(kwargs, dict):
+            continue
+        for field in VOLATILE_MESSAGE_FIELDS:
+            kwargs.pop(field, None)
+        # provider-format duplicates of tool_calls, with their own ids
+        if isinstance(kwargs.get("additional_kwargs"), dict):
+            kwargs["additional_kwargs"].pop("tool_calls", None)
+        if kwargs.get("tool_call_id"):
+            kwargs["tool_call_id"] = call_id(kwargs["tool_call_id"])
+        for field in ("tool_calls", "invalid_tool_calls"):
+            for tool_call in kwargs.get(field) or []:
+                if tool_call.get("id"):
+                    tool_call["id"] = call_id(tool_call["id"])
+
+    return json.dumps(messages, sort_keys=True)
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Stable hash of a chat request.
+
+    ``llm_string`` carries the model, temperature and bound tool schemas;
+    ``prompt`` is the serialized message history.
+    """
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(_canonical_prompt(prompt).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class LLMResponseCache(BaseCache):
+    """Content-addressed, size-bounded disk cache of chat model responses.
+
+    Plugged into the chat models as their ``cache``, so every model call is
+    looked up by a hash of (model, temperature, tool schemas, messages)
+    before going to the provider. Least recently used entries are evicted
+    once the store exceeds ``max_bytes``.
+
+    Args:
+        path: Database file, or ":memory:" for an in-process cache
+        mode: "cache", "record" or "replay" (see the module constants)
+        max_bytes: Byte budget for stored responses, or None for no limit
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        mode: str = CACHE,
+        max_bytes: int | None = DEFAULT_CACHE_BUDGET,
+    ):
+        if mode not in (CACHE, RECORD, REPLAY):
+            raise ValueError(f"Unknown LLM cache mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        atexit.register(self.close)
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        if self.mode == RECORD:
+            return None
+
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generations FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if row is None:
+            if self.mode == REPLAY:
+                raise ReplayMissError(
+                    f"No recorded response for this request (key {key[:12]}) in {self.path}"
+                )
+            return None
+        with warnings.catch_warnings():
+            # loads() is flagged as beta; the format is stable for our two types
+            warnings.simplefilter("ignore")
+            return loads(row[0], allowed_objects=[ChatGeneration, AIMessage])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.mode == REPLAY:
+            return
+
+        key = cache_key(prompt, llm_string)
+        value = dumps(return_val)
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._size += size - (previous[0] if previous else 0)
+            self._evict_locked()
+
+    def _evict_locked(self):
+        if not self.max_bytes or self._size <= self.max_bytes:
+            return
+        # drop the least recently used entries until under 90% of the budget
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._size = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "entries": entries,
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+
+    async def alookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        return await asyncio.to_thread(self.lookup, prompt, llm_string)
+
+    async def aupdate(
+        self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE
+    ) -> None:
+        return await asyncio.to_thread(self.update, prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any) -> None:
+        return await asyncio.to_thread(self.clear)
+
+
+def create_llm_cache(
+    mode: str = OFF,
+    path: str | None = None,
+    max_bytes: int | None = DEFAULT_CACHE_BUDGET,
+) -> LLMResponseCache | None:
+    """Create the response cache for a mode, or None when caching is off.
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown LLM cache mode: {mode}")
+    if mode == OFF:
+        return None
+    return LLMResponseCache(path=path or DEFAULT_CACHE_PATH, mode=mode, max_bytes=max_bytes)
+
+
+_default_cache: LLMResponseCache | None = None
+_default_lock = threading.Lock()
+
+
+def configure_llm_cache(**kwargs) -> LLMResponseCache | None:
+    """Replace the process-wide response cache used by newly created models."""
+    global _default_cache
+    with _default_lock:
+        previous = _default_cache
+        _default_cache = create_llm_cache(**kwargs)
+    if previous is not None:
+        previous.close()
+    return _default_cache
+
+
+def get_llm_cache() -> LLMResponseCache | None:
+    """Return the process-wide response cache, or None when caching is off."""
+    return _default_cache
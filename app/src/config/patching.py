@@ -0,0 +1,382 @@
+from app.src.config.workspace_cache import workspace_cache
+from app.src.config.file_io import write_changes, diff_stat
+from dataclasses import dataclass, field
+import os
+import re
+
+
+DEFAULT_FUZZ = 2  # context lines a hunk may ignore at each end when it does not match
+MAX_FUZZ = 5
+DEV_NULL = "/dev/null"
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """A patch that cannot be parsed."""
+
+
+@dataclass
+class Hunk:
+    """One ``@@`` section of a file patch.
+
+    ``lines`` holds (tag, text) pairs where tag is " ", "-" or "+" and text
+    keeps its line break, unless the patch marked it "No newline at end of
+    file". ``old_start`` is None for bare ``@@`` headers, which models often
+    write without line numbers.
+    """
+
+    header: str
+    old_start: int | None
+    lines: list[tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def old_lines(self) -> list[str]:
+        return [text for tag, text in self.lines if tag != "+"]
+
+
+@dataclass
+class FilePatch:
+    old_path: str
+    new_path: str
+    hunks: list[Hunk] = field(default_factory=list)
+
+    @property
+    def path(self) -> str:
+        return self.old_path if self.new_path == DEV_NULL else self.new_path
+
+    @property
+    def creates(self) -> bool:
+        return self.old_path == DEV_NULL
+
+    @property
+    def deletes(self) -> bool:
+        return self.new_path == DEV_NULL
+
+
+@dataclass
+class HunkResult:
+    """Where a hunk applied, or why it was rejected."""
+
+    file_path: str
+    number: int
+    header: str
+    ok: bool
+    message: str
+
+
+def _header_path(line: str) -> str:
+    # "--- a/src/app.py<TAB>2024-01-01 ..." -> "a/src/app.py"
+    path = line[4:].split("\t")[0].strip()
+    if path.startswith('"') and path.endswith('"') and len(path) > 1:
+        path = path[1:-1]
+    return path
+
+
+def _strip_prefixes(old_path: str, new_path: str) -> tuple[str, str]:
+    """Drop the a/ and b/ prefixes of git style diffs."""
+    if (old_path == DEV_NULL or old_path.startswith("a/")) and (
+        new_path == DEV_NULL or new_path.startswith("b/")
+    ):
+        old_path = old_path[2:] if old_path != DEV_NULL else old_path
+        new_path = new_path[2:] if new_path != DEV_NULL else new_path
+    return old_path, new_path
+
+
+def parse_patch(text: str) -> list[FilePatch]:
+    """Parse a unified diff (plain or git style) into per-file patches.
+
+    Lines outside file sections (``diff --git``, ``index``, commentary) are
+    skipped. The line counts of hunk headers are not trusted, models often
+    get them wrong: a hunk runs until the next header or the first line
+    that is not part of a diff.
+
+    Raises:
+        PatchError: If the text holds no file patch or is malformed
+    """
+    lines = text.splitlines(keepends=True)
+    patches: list[FilePatch] = []
+    current: FilePatch | None = None
+    i = 0
+
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("GIT binary patch") or line.startswith("Binary files "):
+            raise PatchError("binary patches are not supported")
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            old_path, new_path = _strip_prefixes(
+                _header_path(line), _header_path(lines[i + 1])
+            )
+            if old_path == DEV_NULL and new_path == DEV_NULL:
+                raise PatchError(f"line {i + 1}: both sides of the file header are {DEV_NULL}")
+            current = FilePatch(old_path, new_path)
+            patches.append(current)
+            i += 2
+            continue
+        if not line.startswith("@@"):
+            i += 1
+            continue
+        if current is None:
+            raise PatchError(f"line {i + 1}: hunk before any ---/+++ file header")
+
+        match = HUNK_HEADER.match(line)
+        hunk = Hunk(line.rstrip("\r\n"), int(match.group(1)) if match else None)
+        blank_tail = 0
+        i += 1
+        while i < len(lines):
+            line = lines[i]
+            if line.startswith("\\"):
+                # "\ No newline at end of file" applies to the line before it
+                if hunk.lines:
+                    tag, previous = hunk.lines[-1]
+                    hunk.lines[-1] = (tag, previous.rstrip("\n"))
+                i += 1
+                continue
+            if line.startswith("@@") or (
+                line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ")
+            ):
+                break
+            line = line.replace("\r\n", "\n")
+            if line.strip("\r\n") == "":
+                # editors and models strip the space of empty context lines
+                line = " \n"
+                blank_tail += 1
+            else:
+                blank_tail = 0
+            if line[0] not in (" ", "-", "+"):
+                break
+            body = line[1:] if line.endswith("\n") else line[1:] + "\n"
+            hunk.lines.append((line[0], body))
+            i += 1
+        # blank lines separating the hunk from whatever follows are not context
+        del hunk.lines[len(hunk.lines) - blank_tail :]
+
+        if not any(tag != " " for tag, _ in hunk.lines):
+            raise PatchError(f"{hunk.header} of {current.path} changes nothing")
+        current.hunks.append(hunk)
+
+    patches = [patch for patch in patches if patch.hunks or patch.deletes]
+    if not patches:
+        raise PatchError("no file patch found (expected ---/+++ headers followed by @@ hunks)")
+    return patches
+
+
+def patch_paths(text: str) -> list[str]:
+    """Paths a patch touches, or none if it cannot be parsed."""
+    try:
+        return [patch.path for patch in parse_patch(text)]
+    except PatchError:
+        return []
+
+
+def _loose(line: str) -> str:
+    return " ".join(line.split())
+
+
+def _find(
+    lines: list[str], wanted: list[str], start: int, expected: int | None, loose: bool
+) -> list[int]:
+    """Positions at or after ``start`` where ``wanted`` matches, nearest to ``expected`` first."""
+    if not wanted:
+        return [min(max(expected or 0, start), len(lines))]
+    if loose:
+        lines = [_loose(line) for line in lines]
+        wanted = [_loose(line) for line in wanted]
+    first, size = wanted[0], len(wanted)
+    found = [
+        pos
+        for pos in range(start, len(lines) - size + 1)
+        if lines[pos] == first and lines[pos : pos + size] == wanted
+    ]
+    if expected is not None:
+        found.sort(key=lambda pos: abs(pos - expected))
+    return found
+
+
+def _locate(lines: list[str], hunk: Hunk, start: int, expected: int | None, fuzz: int):
+    """Find where a hunk applies.
+
+    Tries an exact match first, then one ignoring whitespace differences,
+    then drops up to ``fuzz`` context lines from the ends of the hunk, the
+    way patch(1) does.
+
+    Returns:
+        Tuple of (position, hunk lines to apply, context lines dropped at
+        the start, description of any fuzz used, number of other matches) or
+        None when the hunk does not match
+    """
+    leading = next((n for n, (tag, _) in enumerate(hunk.lines) if tag != " "), 0)
+    trailing = next((n for n, (tag, _) in enumerate(reversed(hunk.lines)) if tag != " "), 0)
+
+    for level in range(fuzz + 1):
+        drop_head, drop_tail = min(level, leading), min(level, trailing)
+        if level and not (drop_head or drop_tail):
+            break
+        trimmed = hunk.lines[drop_head : len(hunk.lines) - drop_tail]
+        wanted = [text for tag, text in trimmed if tag != "+"]
+        shifted = None if expected is None else expected + drop_head
+        for loose in (False, True):
+            found = _find(lines, wanted, start, shifted, loose)
+            if not found:
+                continue
+            notes = []
+            if loose:
+                notes.append("whitespace differences ignored")
+            if level:
+                notes.append(f"fuzz {level}")
+            return found[0], trimmed, drop_head, notes, len(found) - 1
+    return None
+
+
+def _closest(lines: list[str], wanted: list[str], start: int) -> str:
+    """Describe the position that best matches a rejected hunk."""
+    if not wanted:
+        return ""
+    loose_lines = [_loose(line) for line in lines]
+    loose_wanted = [_loose(line) for line in wanted]
+    best, best_score = None, 0
+    for pos in range(start, max(start, len(lines) - len(wanted)) + 1):
+        window = loose_lines[pos : pos + len(wanted)]
+        score = sum(a == b for a, b in zip(window, loose_wanted))
+        if score > best_score:
+            best, best_score = pos, score
+    if best is None:
+        first = wanted[0].rstrip("\n")
+        return f"; no line of the hunk's context or removals was found (first line: {first!r})"
+    for offset, line in enumerate(loose_wanted):
+        actual = loose_lines[best + offset] if best + offset < len(lines) else None
+        if actual != line:
+            found = "end of file" if actual is None else repr(lines[best + offset].rstrip("\n"))
+            return (
+                f"; closest match at line {best + 1} ({best_score} of {len(wanted)} lines "
+                f"agree), first difference at line {best + offset + 1}: expected "
+                f"{wanted[offset].rstrip(chr(10))!r}, found {found}"
+            )
+    return ""
+
+
+def _apply_file(
+    lines: list[str], patch: FilePatch, fuzz: int
+) -> tuple[list[str], list[HunkResult]]:
+    results = []
+    start, offset = 0, 0
+    for number, hunk in enumerate(patch.hunks, 1):
+        expected = None
+        if hunk.old_start is not None:
+            # an empty old range of "-0,0" or "-N,0" inserts after line N
+            old_start = hunk.old_start - (1 if hunk.old_lines else 0)
+            expected = max(old_start, 0) + offset
+
+        located = _locate(lines, hunk, start, expected, fuzz)
+        if located is None:
+            message = "context not found" + _closest(lines, hunk.old_lines, start)
+            results.append(HunkResult(patch.path, number, hunk.header, False, message))
+            continue
+
+        pos, applied, dropped, notes, others = located
+        if expected is None and others:
+            results.append(
+                HunkResult(
+                    patch.path,
+                    number,
+                    hunk.header,
+                    False,
+                    f"context matches {others + 1} places (first at line {pos + 1}); "
+                    "add line numbers to the @@ header or more context",
+                )
+            )
+            continue
+
+        replaced = sum(tag != "+" for tag, _ in applied)
+        new_lines, cursor = [], pos
+        for tag, text in applied:
+            if tag == " ":
+                # keep the file's own version of context lines
+                new_lines.append(lines[cursor])
+                cursor += 1
+            elif tag == "-":
+                cursor += 1
+            else:
+                new_lines.append(text)
+        lines[pos : pos + replaced] = new_lines
+
+        # later hunks have most likely moved by as much as this one
+        drift = 0 if expected is None else pos - dropped - expected
+        message = f"applied at line {pos + 1}"
+        if drift:
+            notes.insert(0, f"offset {drift:+d} lines")
+        if notes:
+            message += f" ({', '.join(notes)})"
+        results.append(HunkResult(patch.path, number, hunk.header, True, message))
+        offset += len(new_lines) - replaced + drift
+        start = pos + len(new_lines)
+    return lines, results
+
+
+def apply_patch_text(text: str, fuzz: int = DEFAULT_FUZZ) -> tuple[list[HunkResult], list[str]]:
+    """Validate and apply a unified diff to the workspace.
+
+    Every hunk of every file is located before anything is written: if any
+    hunk is rejected, no file changes. Otherwise each file is written once,
+    atomically, and the files already written are restored should a later
+    write fail.
+
+    Args:
+        text: Unified diff, possibly covering several files
+        fuzz: Context lines a hunk may ignore at each end
+
+    Returns:
+        Tuple of (one result per hunk, one diff summary line per changed file)
+
+    Raises:
+        PatchError: If the patch cannot be parsed
+        OSError: If a file cannot be written
+    """
+    fuzz = max(0, min(fuzz, MAX_FUZZ))
+    originals: dict[str, str | None] = {}
+    updated: dict[str, str | None] = {}
+    results: list[HunkResult] = []
+
+    for patch in parse_patch(text):
+        path = os.path.abspath(patch.path)
+        if path not in updated:
+            if patch.creates and not os.path.exists(path):
+                originals[path] = updated[path] = None
+            else:
+                try:
+                    originals[path] = updated[path] = workspace_cache.read_text(path)
+                except (OSError, UnicodeDecodeError) as e:
+                    results.append(HunkResult(patch.path, 0, "", False, f"cannot read file: {e}"))
+                    continue
+        if patch.creates and updated[path] is not None:
+            results.append(HunkResult(patch.path, 0, "", False, "file to create already exists"))
+            continue
+
+        content = updated[path] or ""
+        lines, hunk_results = _apply_file(content.splitlines(keepends=True), patch, fuzz)
+        results.extend(hunk_results)
+        if patch.deletes:
+            if "".join(lines).strip():
+                results.append(
+                    HunkResult(patch.path, 0, "", False, "file to delete has content the patch does not remove")
+                )
+                continue
+            updated[path] = None
+            if not patch.hunks:
+                results.append(HunkResult(patch.path, 0, "", True, "deleted"))
+        else:
+            updated[path] = "".join(lines)
+
+    if not all(result.ok for result in results):
+        return results, []
+
+    written = write_changes(originals, updated)
+    summary = []
+    for path in written:
+        if updated[path] is None:
+            summary.append(f"{path}: deleted")
+            continue
+        added, removed = diff_stat(originals[path] or "", updated[path])
+        created = " (new file)" if originals[path] is None else ""
+        summary.append(f"{path}: +{added} -{removed} lines{created}")
+    return results, summary
@@ -1,6 +1,8 @@
 from app.src.config.ui import AgentUI
 from app.utils.constants import CONSOLE_WIDTH
 from rich.console import Console
+import threading
+import asyncio
 
 
 class PermissionManager:
@@ -9,6 +11,8 @@ class PermissionManager:
         self.ui = AgentUI(Console(width=CONSOLE_WIDTH))
         self.always_allow = False
         self.always_allowed_tools = set()
+        # tools may run concurrently, but only one prompt can own the terminal
+        self._prompt_lock = threading.Lock()
 
     def get_permission(self, tool_name: str = None, **kwargs) -> bool:
         if self.always_allow:
@@ -16,6 +20,20 @@ class PermissionManager:
         if tool_name in self.always_allowed_tools:
             return True
 
+        with self._prompt_lock:
+            return self._ask_permission(tool_name)
+
+    async def aget_permission(self, tool_name: str = None, **kwargs) -> bool:
+        """Async variant of get_permission; the prompt runs off the event loop."""
+        if self.always_allow or tool_name in self.always_allowed_tools:
+            return True
+        return await asyncio.to_thread(self.get_permission, tool_name, **kwargs)
+
+    def _ask_permission(self, tool_name: str) -> bool:
+        # an earlier prompt may have granted blanket access while we waited
+        if self.always_allow or tool_name in self.always_allowed_tools:
+            return True
+
         message = f"\n[{self.ui._style("primary")}]Attempting to call [/{self.ui._style("primary")}]'{tool_name}'"
         self.ui.console.print(message)
 
@@ -0,0 +1,310 @@
+from dataclasses import dataclass, field
+from app.src.config.command_runner import signal_group
+from app.src.config.sandbox import sandbox
+import subprocess
+import threading
+import itertools
+import socket
+import atexit
+import signal
+import time
+import os
+import re
+
+
+MAX_RUNNING = 8  # background processes alive at the same time
+LOG_BUFFER_BYTES = 4 * 1024 * 1024  # most recent output kept per process
+DEFAULT_READ_BYTES = 12 * 1024
+MAX_READ_BYTES = 64 * 1024
+STOP_GRACE = 5  # seconds between SIGTERM and SIGKILL
+POLL_INTERVAL = 0.2  # seconds between checks while waiting
+STOP_POLL_INTERVAL = 0.05  # seconds between checks while a process group stops
+KILL_WAIT = 1  # seconds a killed process group may take to disappear
+READ_CHUNK = 64 * 1024
+
+
+class ProcessError(RuntimeError):
+    """A background process cannot be started or found."""
+
+
+class LogBuffer:
+    """Output of a process addressed by absolute byte offsets.
+
+    Only the last ``limit`` bytes are kept; offsets keep counting from the
+    very first byte, so a reader can tell how much it missed.
+    """
+
+    def __init__(self, limit: int = LOG_BUFFER_BYTES):
+        self.limit = limit
+        self.data = bytearray()
+        self.start = 0  # offset of data[0]
+        self._lock = threading.Lock()
+
+    @property
+    def end(self) -> int:
+        with self._lock:
+            return self.start + len(self.data)
+
+    def append(self, chunk: bytes):
+        with self._lock:
+            self.data += chunk
+            excess = len(self.data) - self.limit
+            if excess > 0:
+                del self.data[:excess]
+                self.start += excess
+
+    def read(self, offset: int, max_bytes: int) -> tuple[bytes, int, int]:
+        """Bytes from ``offset`` on, as (data, offset of data, bytes no longer kept)."""
+        with self._lock:
+            end = self.start + len(self.data)
+            offset = min(max(offset, 0), end)
+            dropped = max(self.start - offset, 0)
+            offset = max(offset, self.start)
+            chunk = bytes(self.data[offset - self.start : offset - self.start + max_bytes])
+        return chunk, offset, dropped
+
+    def find(self, pattern: re.Pattern, offset: int) -> tuple[int, str] | None:
+        """Offset and text of the first line at or after ``offset`` matching a regex."""
+        with self._lock:
+            begin = max(offset - self.start, 0)
+            text = bytes(self.data[begin:]).decode("utf-8", errors="replace")
+            base = self.start + begin
+        for match in pattern.finditer(text):
+            line_start = text.rfind("\n", 0, match.start()) + 1
+            line_end = text.find("\n", match.end())
+            line = text[line_start : line_end if line_end != -1 else len(text)]
+            return base + len(text[: match.start()].encode("utf-8")), line.strip()
+        return None
+
+
+@dataclass
+class ManagedProcess:
+    process_id: str
+    command: str
+    cwd: str
+    process: subprocess.Popen
+    started: float = field(default_factory=time.monotonic)
+    log: LogBuffer = field(default_factory=LogBuffer)
+    ended: float | None = None
+    stopped: bool = False
+
+    @property
+    def running(self) -> bool:
+        if self.process.poll() is None:
+            return True
+        if self.ended is None:
+            self.ended = time.monotonic()
+        return False
+
+    @property
+    def alive(self) -> bool:
+        """Whether the shell, or anything it started in its process group, still runs."""
+        if self.running:
+            return True
+        return _group_running(self.process.pid)
+
+    def status(self) -> str:
+        if self.running:
+            return f"running for {time.monotonic() - self.started:.0f}s (pid {self.process.pid})"
+        how = "stopped" if self.stopped else "exited"
+        status = f"{how} with code {self.process.returncode} after {self.ended - self.started:.0f}s"
+        if self.alive:
+            status += ", processes it started in the background are still running"
+        return status
+
+
+def _group_running(pgid: int) -> bool:
+    """Whether a process group has members that are not zombies."""
+    if os.name != "posix":
+        return False
+    try:
+        os.killpg(pgid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    if not os.path.isdir("/proc"):
+        return True
+    # killed orphans linger as zombies until init reaps them
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(os.path.join(entry.path, "stat"), "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # "pid (comm) state ppid pgrp ...", comm may contain spaces and parentheses
+        fields = stat[stat.rfind(b")") + 2 :].split()
+        if len(fields) > 2 and int(fields[2]) == pgid and fields[0] != b"Z":
+            return True
+    return False
+
+
+def _port_open(port: int, host: str) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=POLL_INTERVAL):
+            return True
+    except OSError:
+        return False
+
+
+class ProcessManager:
+    """Long-running commands (dev servers, watchers) started in the background.
+
+    Each command runs in its own process group with stdout and stderr
+    merged into a bounded in-memory log, so an agent can start a server,
+    wait for it to come up, read what it logged and stop it, without a
+    tool call blocking for the command's lifetime. Everything still running
+    is stopped at the end of the session and when the program exits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._processes: dict[str, ManagedProcess] = {}
+        self._ids = itertools.count(1)
+        atexit.register(self.stop_all)
+
+    def start(self, command: str, cwd: str) -> ManagedProcess:
+        """Start a command in the background.
+
+        Raises:
+            ProcessError: If too many processes are running
+            OSError: If the shell cannot be started
+        """
+        with self._lock:
+            running = [p for p in self._processes.values() if p.running]
+            if len(running) >= MAX_RUNNING:
+                raise ProcessError(
+                    f"{len(running)} background processes are already running; "
+                    f"stop one of {', '.join(p.process_id for p in running)} first"
+                )
+            process = subprocess.Popen(
+                command,
+                shell=True,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                cwd=cwd,
+                start_new_session=os.name == "posix",
+                **sandbox.popen_kwargs(),
+            )
+            # servers run indefinitely, so no lifetime CPU limit
+            sandbox.confine(process, limit_cpu=False)
+            managed = ManagedProcess(f"p{next(self._ids)}", command, cwd, process)
+            self._processes[managed.process_id] = managed
+        threading.Thread(target=self._collect, args=(managed,), daemon=True).start()
+        return managed
+
+    def _collect(self, managed: ManagedProcess):
+        fd = managed.process.stdout.fileno()
+        while True:
+            try:
+                data = os.read(fd, READ_CHUNK)
+            except OSError:
+                break
+            if not data:
+                break
+            managed.log.append(data)
+        managed.process.stdout.close()
+
+    def get(self, process_id: str) -> ManagedProcess:
+        """Raises ProcessError for an unknown id."""
+        with self._lock:
+            managed = self._processes.get(process_id.strip())
+        if managed is None:
+            known = ", ".join(self._processes) or "none"
+            raise ProcessError(f"No background process {process_id} (known: {known})")
+        return managed
+
+    def list(self) -> list[ManagedProcess]:
+        with self._lock:
+            return list(self._processes.values())
+
+    def wait(
+        self,
+        process_id: str,
+        timeout: float,
+        port: int | None = None,
+        pattern: str | None = None,
+        offset: int = 0,
+        host: str = "127.0.0.1",
+    ) -> tuple[bool, str]:
+        """Wait until a port accepts connections, the log matches, or the process exits.
+
+        Without a port or pattern, waits for the process to exit.
+
+        Returns:
+            Tuple of (whether the condition was met, what happened)
+
+        Raises:
+            ProcessError: If the process is unknown
+            re.error: If the pattern is invalid
+        """
+        managed = self.get(process_id)
+        regex = re.compile(pattern) if pattern else None
+        deadline = time.monotonic() + timeout
+        while True:
+            if regex is not None:
+                found = managed.log.find(regex, offset)
+                if found is not None:
+                    return True, f"log matched at offset {found[0]}: {found[1][:300]}"
+            if port is not None and _port_open(port, host):
+                return True, f"port {port} is accepting connections"
+            if not managed.running:
+                # output written just before the exit may still be arriving
+                if regex is not None and managed.log.find(regex, offset) is None:
+                    time.sleep(POLL_INTERVAL)
+                    found = managed.log.find(regex, offset)
+                    if found is not None:
+                        return True, f"log matched at offset {found[0]}: {found[1][:300]}"
+                done = regex is None and port is None
+                return done, f"process {managed.status()}"
+            if time.monotonic() >= deadline:
+                return False, f"timed out after {timeout:.0f}s, process {managed.status()}"
+            time.sleep(POLL_INTERVAL)
+
+    def stop(self, process_id: str, grace: float = STOP_GRACE) -> ManagedProcess:
+        """Stop a process and everything it started: SIGTERM, then SIGKILL.
+
+        The whole process group is signalled, even when the shell already
+        exited and left background children behind.
+
+        Raises:
+            ProcessError: If the process is unknown
+        """
+        managed = self.get(process_id)
+        if not managed.alive:
+            return managed
+        managed.stopped = managed.stopped or managed.running
+        signal_group(managed.process, signal.SIGTERM)
+        deadline = time.monotonic() + grace
+        while managed.alive and time.monotonic() < deadline:
+            time.sleep(STOP_POLL_INTERVAL)
+        # children that ignored SIGTERM would otherwise outlive the shell
+        signal_group(managed.process, signal.SIGKILL)
+        managed.process.wait()
+        # SIGKILL is delivered asynchronously
+        deadline = time.monotonic() + KILL_WAIT
+        while managed.alive and time.monotonic() < deadline:
+            time.sleep(STOP_POLL_INTERVAL)
+        if managed.ended is None:
+            managed.ended = time.monotonic()
+        return managed
+
+    def stop_all(self) -> int:
+        """Stop every process group that still runs; returns how many were stopped."""
+        stopped = 0
+        for managed in self.list():
+            if managed.alive:
+                self.stop(managed.process_id)
+                stopped += 1
+        return stopped
+
+    def report(self) -> str:
+        processes = self.list()
+        running = sum(p.alive for p in processes)
+        return f"{running} running, {len(processes) - running} finished"
+
+
+process_manager = ProcessManager()
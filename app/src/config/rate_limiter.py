@@ -0,0 +1,313 @@
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_core.messages import BaseMessage
+from typing import Awaitable, Callable, TypeVar
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+import itertools
+import threading
+import hashlib
+import asyncio
+import openai
+import heapq
+import time
+
+
+DEFAULT_RPM = 30  # requests per minute, per API key and model
+DEFAULT_TPM = 60_000  # tokens per minute, per API key and model
+COMPLETION_RESERVE = 1_024  # tokens reserved for the answer until usage is known
+MAX_RATE_LIMIT_RETRIES = 3
+MAX_BACKOFF = 60.0  # seconds
+RETRY_AFTER_HEADERS = (
+    "retry-after",
+    "x-ratelimit-reset-requests-minute",
+    "x-ratelimit-reset-tokens-minute",
+)
+
+# lower runs first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+T = TypeVar("T")
+
+
+@dataclass
+class Reservation:
+    """What the current model request took from its limiter.
+
+    A mutable holder so the limiter can fill it in from inside the chat model
+    even though langchain runs each step in a copied context.
+    """
+
+    prompt_tokens: int
+    limiter: "ModelLimiter | None" = None
+    tokens: int = 0
+
+
+request_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+_reservation: ContextVar[Reservation | None] = ContextVar("_reservation", default=None)
+
+
+@contextmanager
+def priority(level: int):
+    """Run model requests made inside the block at the given priority."""
+    token = request_priority.set(level)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class TokenBucket:
+    """Refills continuously up to ``per_minute``; the level may go negative
+    when actual usage turns out higher than reserved."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        rate = self.per_minute / 60
+        self.level = min(self.per_minute, self.level + (now - self._updated) * rate)
+        self._updated = now
+
+    def wait_time(self, amount: int, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.per_minute)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / (self.per_minute / 60)
+
+    def take(self, amount: int, now: float):
+        self._refill(now)
+        self.level -= amount
+
+
+@dataclass
+class LimiterStats:
+    requests: int = 0
+    rate_limited: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class ModelLimiter(BaseRateLimiter):
+    """Requests-per-minute and tokens-per-minute limits for one key and model.
+
+    Waiting requests are served strictly by priority, then arrival order;
+    only the head of the queue may take from the buckets, so a background
+    request can never starve an interactive one.
+
+    Args:
+        name: Label used in reports
+        rpm: Requests per minute, or None for no request limit
+        tpm: Tokens per minute, or None for no token limit
+    """
+
+    def __init__(self, name: str, rpm: int | None = DEFAULT_RPM, tpm: int | None = DEFAULT_TPM):
+        self.name = name
+        self.stats = LimiterStats()
+        self._cond = threading.Condition()
+        self._queue: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._blocked_until = 0.0
+        self.configure(rpm, tpm)
+
+    def configure(self, rpm: int | None, tpm: int | None):
+        with self._cond:
+            self._requests = TokenBucket(rpm) if rpm else None
+            self._tokens = TokenBucket(tpm) if tpm else None
+            self._cond.notify_all()
+
+    @property
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        wait = max(self._blocked_until - now, 0.0)
+        if self._requests:
+            wait = max(wait, self._requests.wait_time(1, now))
+        if self._tokens and tokens:
+            wait = max(wait, self._tokens.wait_time(tokens, now))
+        return wait
+
+    def _acquire(self, tokens: int, level: int, blocking: bool) -> bool:
+        ticket = (level, next(self._sequence))
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(tokens, now) if self._queue[0] == ticket else None
+                    if wait == 0.0:
+                        heapq.heappop(self._queue)
+                        if self._requests:
+                            self._requests.take(1, now)
+                        if self._tokens and tokens:
+                            self._tokens.take(tokens, now)
+                        break
+                    if not blocking:
+                        self._queue.remove(ticket)
+                        heapq.heapify(self._queue)
+                        return False
+                    self._cond.wait(wait)
+            finally:
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            self.stats.requests += 1
+            self.stats.total_wait += waited
+            self.stats.max_wait = max(self.stats.max_wait, waited)
+        return True
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        reservation = _reservation.get()
+        tokens = reservation.prompt_tokens + COMPLETION_RESERVE if reservation else 0
+        if not self._acquire(tokens, request_priority.get(), blocking):
+            return False
+        if reservation:
+            reservation.limiter, reservation.tokens = self, tokens
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        # the wait happens on a worker thread; contextvars are copied along
+        return await asyncio.to_thread(self.acquire, blocking=blocking)
+
+    def settle(self, reserved: int, used: int):
+        """Correct the token bucket once the actual usage of a request is known."""
+        with self._cond:
+            if self._tokens:
+                self._tokens.take(used - reserved, time.monotonic())
+            self._cond.notify_all()
+
+    def back_off(self, seconds: float):
+        """Hold every request of this limiter for the given time after a 429."""
+        with self._cond:
+            self.stats.rate_limited += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def report(self) -> str:
+        stats = self.stats
+        average = stats.total_wait / stats.requests if stats.requests else 0.0
+        return (
+            f"{self.name}: {stats.requests} requests, queue depth {self.queue_depth}, "
+            f"avg wait {average:.2f}s, max wait {stats.max_wait:.2f}s, "
+            f"{stats.rate_limited} rate limited"
+        )
+
+
+class RequestScheduler:
+    """Process-wide registry of rate limiters, one per API key and model."""
+
+    def __init__(self, rpm: int | None = DEFAULT_RPM, tpm: int | None = DEFAULT_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._lock = threading.Lock()
+        self._limiters: dict[tuple[str, str], ModelLimiter] = {}
+
+    def limiter(self, api_key: str, model_name: str) -> ModelLimiter:
+        """Return the shared limiter for an API key and model."""
+        key = (hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16], model_name)
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = ModelLimiter(model_name, self.rpm, self.tpm)
+            return self._limiters[key]
+
+    def configure(self, rpm: int | None = DEFAULT_RPM, tpm: int | None = DEFAULT_TPM):
+        """Change the limits of existing and future limiters."""
+        with self._lock:
+            self.rpm, self.tpm = rpm, tpm
+            for limiter in self._limiters.values():
+                limiter.configure(rpm, tpm)
+
+    def metrics(self) -> dict[str, dict]:
+        """Queue depth and wait time figures per model."""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {
+            limiter.name: {
+                "queue_depth": limiter.queue_depth,
+                "requests": limiter.stats.requests,
+                "total_wait": limiter.stats.total_wait,
+                "max_wait": limiter.stats.max_wait,
+                "rate_limited": limiter.stats.rate_limited,
+            }
+            for limiter in limiters
+        }
+
+    def report(self) -> str:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return "\n".join(l.report() for l in limiters) if limiters else "No requests yet."
+
+
+request_scheduler = RequestScheduler()
+
+
+def _retry_after(error: openai.RateLimitError, attempt: int) -> float:
+    """Seconds to wait after a 429, from the response headers if present."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header in RETRY_AFTER_HEADERS:
+        try:
+            return min(float(headers[header]), MAX_BACKOFF)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return min(2.0 ** attempt, MAX_BACKOFF)
+
+
+def _settle(reservation: Reservation, response):
+    usage = getattr(response, "usage_metadata", None) if isinstance(response, BaseMessage) else None
+    if reservation.limiter and usage and usage.get("total_tokens"):
+        reservation.limiter.settle(reservation.tokens, usage["total_tokens"])
+
+
+def invoke_with_backoff(
+    call: Callable[[], T],
+    prompt_tokens: int,
+    max_retries: int = MAX_RATE_LIMIT_RETRIES,
+) -> T:
+    """Run a model call through its rate limiter, backing off on 429s.
+
+    A 429 holds the whole limiter (every agent sharing the key and model)
+    for the retry-after time before the request is queued again.
+    """
+    for attempt in range(max_retries + 1):
+        reservation = Reservation(prompt_tokens)
+        token = _reservation.set(reservation)
+        try:
+            response = call()
+        except openai.RateLimitError as e:
+            if reservation.limiter is None or attempt == max_retries:
+                raise
+            reservation.limiter.back_off(_retry_after(e, attempt))
+            continue
+        finally:
+            _reservation.reset(token)
+        _settle(reservation, response)
+        return response
+
+
+async def ainvoke_with_backoff(
+    call: Callable[[], Awaitable[T]],
+    prompt_tokens: int,
+    max_retries: int = MAX_RATE_LIMIT_RETRIES,
+) -> T:
+    """Async variant of invoke_with_backoff."""
+    for attempt in range(max_retries + 1):
+        reservation = Reservation(prompt_tokens)
+        token = _reservation.set(reservation)
+        try:
+            response = await call()
+        except openai.RateLimitError as e:
+            if reservation.limiter is None or attempt == max_retries:
+                raise
+            reservation.limiter.back_off(_retry_after(e, attempt))
+            continue
+        finally:
+            _reservation.reset(token)
+        _settle(reservation, response)
+        return response
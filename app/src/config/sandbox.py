@@ -0,0 +1,260 @@
+from dataclasses import dataclass
+import subprocess
+import threading
+import tempfile
+import atexit
+import shutil
+import time
+import os
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+CPU_SECONDS = 600  # per process; the threads of a process add up
+CPU_GRACE = 5  # seconds between SIGXCPU and SIGKILL
+MEMORY_MB = 4096  # writable memory per process
+OPEN_FILES = 1024
+PROCESSES = 4096  # per user, see Limits
+
+# a delegated cgroup v2 directory; a child of it bounds the whole session
+CGROUP_ENV = "PROJECTGEN_CGROUP"
+CGROUP_MEMORY_MB = 8192
+CGROUP_PIDS = 1024
+CGROUP_CPUS = 2.0  # cores
+CGROUP_PERIOD_US = 100_000
+CGROUP_REMOVE_TIMEOUT = 2  # seconds
+
+SCRATCH_ROOT = "/dev/shm"  # tmpfs on Linux; the system temp directory elsewhere
+SCRATCH_ENV = ("TMPDIR", "TEMP", "TMP")
+
+
+@dataclass(frozen=True)
+class Limits:
+    """Resource limits of every process the execution tools start.
+
+    ``None`` keeps the inherited limit. ``memory_mb`` is applied as
+    RLIMIT_DATA rather than RLIMIT_AS: it bounds what a process can
+    allocate without breaking runtimes that reserve large address ranges
+    up front (V8, Go, the JVM). ``processes`` is RLIMIT_NPROC, which the
+    kernel counts per user, so it only stops fork bombs; a cgroup's
+    pids.max bounds a session precisely.
+    """
+
+    cpu_seconds: int | None = CPU_SECONDS
+    memory_mb: int | None = MEMORY_MB
+    open_files: int | None = OPEN_FILES
+    processes: int | None = PROCESSES
+
+
+def _set_limit(pid: int, kind: int, value: int | None, grace: int = 0):
+    """Lower the soft and hard limit of a process, so it cannot raise them again."""
+    if value is None:
+        return
+    try:
+        _, hard = resource.prlimit(pid, kind)
+        limit = (value, value + grace)
+        if hard != resource.RLIM_INFINITY:
+            limit = (min(limit[0], hard), min(limit[1], hard))
+        resource.prlimit(pid, kind, limit)
+    except (ValueError, OSError):
+        pass
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _write(path: str, value: str):
+    with open(path, "w") as f:
+        f.write(value)
+
+
+class Sandbox:
+    """Linux resource isolation for code and commands run by the agent.
+
+    Every process started with ``popen_kwargs`` and passed to ``confine``
+    gets rlimits on CPU time, memory, open files and processes, a private
+    scratch directory on tmpfs as its temporary directory and, when
+    ``PROJECTGEN_CGROUP`` names a cgroup v2 directory delegated to this
+    user, joins a cgroup of this session whose memory, pids and cpu limits
+    bound everything the agent runs together. A runaway snippet then fails on its own instead of
+    starving the other sessions of the host.
+
+    Args:
+        limits: Limits of each process
+        cgroup_parent: Delegated cgroup v2 directory to create the session cgroup in
+    """
+
+    def __init__(self, limits: Limits = Limits(), cgroup_parent: str | None = None):
+        self.limits = limits
+        self.cgroup_parent = cgroup_parent
+        self.cgroup: str | None = None
+        self.cgroup_error: str | None = None
+        self._scratch: str | None = None
+        self._ready = False
+        self._lock = threading.Lock()
+        atexit.register(self.cleanup)
+
+    def _setup_locked(self):
+        if self._ready:
+            return
+        self._ready = True
+        root = SCRATCH_ROOT if os.path.isdir(SCRATCH_ROOT) else tempfile.gettempdir()
+        try:
+            self._scratch = tempfile.mkdtemp(prefix="projectgen-", dir=root)
+        except OSError:
+            self._scratch = tempfile.mkdtemp(prefix="projectgen-")
+        if self.cgroup_parent:
+            self._create_cgroup()
+
+    def _create_cgroup(self):
+        path = os.path.join(self.cgroup_parent, f"projectgen-{os.getpid()}")
+        limits = {
+            "memory": ("memory.max", str(CGROUP_MEMORY_MB * 1024 * 1024)),
+            "pids": ("pids.max", str(CGROUP_PIDS)),
+            "cpu": ("cpu.max", f"{int(CGROUP_CPUS * CGROUP_PERIOD_US)} {CGROUP_PERIOD_US}"),
+        }
+        try:
+            os.makedirs(path, exist_ok=True)
+            if not os.path.exists(os.path.join(path, "cgroup.procs")):
+                os.rmdir(path)
+                self.cgroup_error = f"{self.cgroup_parent} is not a cgroup v2 directory"
+                return
+            enabled = (_read(os.path.join(path, "cgroup.controllers")) or "").split()
+            for controller, (name, value) in limits.items():
+                if controller in enabled:
+                    _write(os.path.join(path, name), value)
+            self.cgroup = path
+        except OSError as e:
+            self.cgroup_error = f"{path}: {e.strerror or e}"
+
+    @property
+    def scratch(self) -> str:
+        """Temporary directory of the session, created on first use."""
+        with self._lock:
+            self._setup_locked()
+        return self._scratch
+
+    def popen_kwargs(self) -> dict:
+        """Arguments of subprocess.Popen for a process that runs in the sandbox.
+
+        Pass the process to ``confine`` right after it started.
+        """
+        with self._lock:
+            self._setup_locked()
+        env = dict(os.environ)
+        env.update({name: self._scratch for name in SCRATCH_ENV})
+        return {"env": env}
+
+    def confine(self, process: subprocess.Popen, limit_cpu: bool = True):
+        """Apply the limits to a process started with ``popen_kwargs``.
+
+        The limits are set from here with prlimit and the process is moved
+        into the session cgroup by its pid, rather than from a preexec_fn:
+        code running between fork and exec is unsafe in a threaded program
+        and keeps subprocess from using posix_spawn or vfork. Whatever the
+        process forks from then on inherits both. A child it forks in the
+        microseconds before that escapes them, which the commands run here
+        (a shell parsing its script, an interpreter starting up) do not do.
+
+        Long-lived processes (background servers, warm workers) pass
+        ``limit_cpu=False``: a lifetime CPU limit would eventually kill
+        them however idle they are.
+        """
+        if self.cgroup:
+            try:
+                _write(os.path.join(self.cgroup, "cgroup.procs"), str(process.pid))
+            except OSError:
+                pass
+        # prlimit is Linux only
+        if not hasattr(resource, "prlimit"):
+            return
+        limits, pid = self.limits, process.pid
+        if limit_cpu:
+            # the soft limit sends SIGXCPU, so the cause shows in the exit status
+            _set_limit(pid, resource.RLIMIT_CPU, limits.cpu_seconds, CPU_GRACE)
+        if limits.memory_mb is not None:
+            _set_limit(pid, resource.RLIMIT_DATA, limits.memory_mb * 1024 * 1024)
+        _set_limit(pid, resource.RLIMIT_NOFILE, limits.open_files)
+        if hasattr(resource, "RLIMIT_NPROC"):
+            _set_limit(pid, resource.RLIMIT_NPROC, limits.processes)
+
+    def scratch_bytes(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self._scratch or ""):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def cgroup_usage(self) -> dict:
+        """Usage the session cgroup accounted, for the counters the kernel exposes."""
+        if self.cgroup is None:
+            return {}
+        usage = {}
+        peak = _read(os.path.join(self.cgroup, "memory.peak"))
+        if peak and peak.isdigit():
+            usage["memory_peak_mb"] = int(peak) / 1024 / 1024
+        for line in (_read(os.path.join(self.cgroup, "cpu.stat")) or "").splitlines():
+            name, _, value = line.partition(" ")
+            if name == "usage_usec":
+                usage["cpu_seconds"] = int(value) / 1_000_000
+        for line in (_read(os.path.join(self.cgroup, "memory.events")) or "").splitlines():
+            name, _, value = line.partition(" ")
+            if name == "oom_kill":
+                usage["oom_kills"] = int(value)
+        pids = _read(os.path.join(self.cgroup, "pids.current"))
+        if pids and pids.isdigit():
+            usage["processes"] = int(pids)
+        return usage
+
+    def report(self) -> str:
+        limits = self.limits
+        parts = [
+            f"per process CPU {limits.cpu_seconds or 'unlimited'}s, "
+            f"memory {limits.memory_mb or 'unlimited'} MiB, "
+            f"{limits.open_files or 'unlimited'} open files"
+        ]
+        if self._scratch:
+            parts.append(f"scratch {self._scratch} ({self.scratch_bytes() / 1024 / 1024:.1f} MiB)")
+        if self.cgroup:
+            usage = self.cgroup_usage()
+            cgroup = f"cgroup {self.cgroup}"
+            if "memory_peak_mb" in usage:
+                cgroup += f", peak memory {usage['memory_peak_mb']:.0f} of {CGROUP_MEMORY_MB} MiB"
+            if "cpu_seconds" in usage:
+                cgroup += f", CPU {usage['cpu_seconds']:.1f}s"
+            if usage.get("oom_kills"):
+                cgroup += f", {usage['oom_kills']} processes killed out of memory"
+            parts.append(cgroup)
+        elif self.cgroup_error:
+            parts.append(f"no cgroup ({self.cgroup_error})")
+        return "; ".join(parts)
+
+    def cleanup(self):
+        if self._scratch:
+            shutil.rmtree(self._scratch, ignore_errors=True)
+        if not self.cgroup:
+            return
+        # workers that were just told to exit keep it busy for a moment
+        deadline = time.monotonic() + CGROUP_REMOVE_TIMEOUT
+        while True:
+            try:
+                os.rmdir(self.cgroup)
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    return
+                time.sleep(0.1)
+
+
+sandbox = Sandbox(cgroup_parent=os.getenv(CGROUP_ENV))
@@ -0,0 +1,540 @@
+from app.src.config.file_tree import is_ignored, load_gitignore
+from app.src.config.workspace_cache import workspace_cache
+from app.src.config.file_io import atomic_write_bytes
+from app.utils.constants import DATA_DIR
+from dataclasses import dataclass
+import threading
+import hashlib
+import sqlite3
+import shutil
+import atexit
+import errno
+import time
+import os
+
+
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+MAX_SNAPSHOTS = 500  # older snapshots are folded away by gc()
+HASH_CHUNK = 1024 * 1024
+
+# tools that replace or remove files instead of writing into them, so the
+# old inode can be hard linked into the store instead of copied
+LINK_SAFE_TOOLS = {
+    "delete_file",
+    "delete_directory",
+    "modify_file",
+    "edit_files",
+    "apply_patch",
+    "create_files",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    label TEXT NOT NULL
+);
+-- state of a path as of a snapshot: a blob hash and permission bits, or
+-- NULL for "absent"
+CREATE TABLE IF NOT EXISTS changes (
+    snapshot INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    hash TEXT,
+    mode INTEGER,
+    PRIMARY KEY (snapshot, path)
+);
+CREATE INDEX IF NOT EXISTS changes_path ON changes (path, snapshot);
+-- last recorded state of every tracked file, with the stat it was hashed at
+CREATE TABLE IF NOT EXISTS manifest (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    mode INTEGER
+);
+"""
+# journals created before modes were recorded lack these columns; their
+# rows have a NULL mode, which is left as it is on rollback
+MODE_COLUMNS = ("manifest", "changes")
+
+
+@dataclass
+class Snapshot:
+    id: int
+    created: float
+    label: str
+    changed: int
+
+
+def _stat_key(st: os.stat_result) -> tuple[int, int, int]:
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class SnapshotJournal:
+    """Content-addressed journal of the workspace around every mutating tool call.
+
+    Each snapshot records, for the paths that changed since the previous
+    one, the state they had at that moment: a SHA-256 blob hash and the
+    permission bits, or absent. A chmod alone is a change too.
+    A call gets a snapshot before it runs and, if it changed anything, one
+    after it.
+    Blobs are stored once, however many snapshots refer to them. The full
+    state at a snapshot is the latest recorded state of every path at or
+    before it, so rolling back only touches the files that differ.
+
+    Calls with known paths only capture those paths; other mutating tools
+    (shell commands, code execution) capture the whole workspace, skipping
+    the same ignored folders as list_directory. Unchanged files are
+    recognized by their stat and not read again.
+
+    Args:
+        root: Workspace directory to journal
+        store: Directory holding the database and blobs for this workspace
+    """
+
+    def __init__(self, root: str, store: str | None = None):
+        self.root = os.path.realpath(root)
+        digest = hashlib.sha256(self.root.encode("utf-8")).hexdigest()[:16]
+        self.store = store or os.path.join(SNAPSHOT_DIR, digest)
+        self.blob_dir = os.path.join(self.store, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.store, "journal.sqlite"),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        for table in MODE_COLUMNS:
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if "mode" not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN mode INTEGER")
+        self.session_start: int | None = None
+        self.failures = 0
+        self.last_error: str | None = None
+        atexit.register(self.close)
+
+    # blobs
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _hash_file(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _capture(self, path: str, link: bool) -> tuple[str, tuple] | None:
+        """Store the content of a file; returns (hash, stat key) or None if it vanished."""
+        try:
+            st = os.stat(path)
+            digest = self._hash_file(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        blob = self._blob_path(digest)
+        if os.path.exists(blob):
+            return digest, _stat_key(st)
+
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp = f"{blob}.{threading.get_ident()}.tmp"
+        try:
+            if not link:
+                raise OSError(errno.EPERM, "copy requested")
+            os.link(path, tmp)
+        except OSError:
+            # other filesystem, no hard link support, or a tool that writes in place
+            shutil.copyfile(path, tmp)
+        os.replace(tmp, blob)
+        return digest, _stat_key(st)
+
+    def _unlink_from_workspace(self, digest: str, path: str):
+        """Give a blob its own inode if it is still hard linked to a live file."""
+        blob = self._blob_path(digest)
+        try:
+            if os.stat(blob).st_ino != os.stat(path).st_ino:
+                return
+        except OSError:
+            return
+        tmp = f"{blob}.{threading.get_ident()}.tmp"
+        shutil.copyfile(blob, tmp)
+        os.replace(tmp, blob)
+
+    # manifest
+
+    def _tracked(self, path: str) -> bool:
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def _walk(self, directory: str) -> list[str]:
+        """Files under a directory of the workspace, minus ignored ones."""
+        rel_dir = os.path.relpath(directory, self.root)
+        rel_dir = "" if rel_dir == "." else rel_dir.replace(os.sep, "/")
+        rules = load_gitignore(self.root, "")
+        files, stack = [], [(directory, rel_dir, rules)]
+        while stack:
+            current, rel, rules = stack.pop()
+            try:
+                entries = list(os.scandir(current))
+            except OSError:
+                continue
+            for entry in entries:
+                rel_path = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if is_ignored(entry.name, rel_path, is_dir, rules):
+                    continue
+                if is_dir:
+                    stack.append((entry.path, rel_path, rules + load_gitignore(entry.path, rel_path)))
+                elif entry.is_file(follow_symlinks=False):
+                    files.append(entry.path)
+        return files
+
+    def _sync_locked(
+        self, paths: list[str] | None, link: bool
+    ) -> dict[str, tuple[str, int] | None]:
+        """Bring the manifest up to date for some paths (None: the whole workspace).
+
+        Returns the paths whose state changed, mapped to their new
+        (hash, mode), or None for removed files.
+        """
+        if paths is None:
+            scopes = [self.root]
+        else:
+            scopes = [p for p in (os.path.realpath(p) for p in paths) if self._tracked(p)]
+
+        candidates: set[str] = set()
+        for scope in scopes:
+            if os.path.isdir(scope):
+                candidates.update(self._walk(scope))
+            else:
+                candidates.add(scope)
+            # files we knew about that may be gone now
+            rows = self._conn.execute(
+                "SELECT path FROM manifest WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                (scope, _like_prefix(scope)),
+            ).fetchall()
+            candidates.update(row[0] for row in rows)
+
+        changes = {}
+        for path in candidates:
+            row = self._conn.execute(
+                "SELECT hash, mtime_ns, size, inode, mode FROM manifest WHERE path = ?", (path,)
+            ).fetchone()
+            try:
+                st = os.stat(path, follow_symlinks=False)
+                present = os.path.isfile(path) and not os.path.islink(path)
+            except OSError:
+                present = False
+            if not present:
+                if row is not None:
+                    self._conn.execute("DELETE FROM manifest WHERE path = ?", (path,))
+                    changes[path] = None
+                continue
+            mode = st.st_mode & 0o7777
+            if row is not None and tuple(row[1:4]) == _stat_key(st):
+                if row[4] == mode:
+                    continue
+                # a chmod leaves the mtime alone; NULL is a mode never recorded
+                self._conn.execute("UPDATE manifest SET mode = ? WHERE path = ?", (mode, path))
+                if row[4] is not None:
+                    changes[path] = (row[0], mode)
+                continue
+            captured = self._capture(path, link)
+            if captured is None:
+                continue
+            digest, key = captured
+            self._conn.execute(
+                "INSERT OR REPLACE INTO manifest (path, hash, mtime_ns, size, inode, mode) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, digest, *key, mode),
+            )
+            if row is None or row[0] != digest or row[4] not in (None, mode):
+                changes[path] = (digest, mode)
+        return changes
+
+    def _record_locked(self, label: str, changes: dict[str, tuple[str, int] | None]) -> int:
+        cursor = self._conn.execute(
+            "INSERT INTO snapshots (created, label) VALUES (?, ?)", (time.time(), label)
+        )
+        snapshot = cursor.lastrowid
+        self._conn.executemany(
+            "INSERT INTO changes (snapshot, path, hash, mode) VALUES (?, ?, ?, ?)",
+            [(snapshot, path, *(state or (None, None))) for path, state in changes.items()],
+        )
+        return snapshot
+
+    # public API
+
+    def start_session(self) -> int:
+        """Capture the whole workspace as the session start snapshot."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                changes = self._sync_locked(None, link=False)
+                self.session_start = self._record_locked("session start", changes)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.gc()
+        return self.session_start
+
+    def begin(self, tool_name: str, paths: list[str] | None, label: str) -> tuple:
+        """Snapshot the workspace before a tool call.
+
+        Returns a token for end(), which records the state the call left
+        behind and undoes hard links to files the tool did not end up
+        replacing.
+        """
+        link = tool_name in LINK_SAFE_TOOLS
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                changes = self._sync_locked(paths, link)
+                snapshot = self._record_locked(label, changes)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        linked = [(path, state[0]) for path, state in changes.items() if state] if link else []
+        return snapshot, linked, paths, label
+
+    def try_begin(self, tool_name: str, paths: list[str] | None, label: str) -> tuple | None:
+        """begin(), but a failure to snapshot never stops the tool call.
+
+        Failures are counted and the last one is kept for /snapshots.
+        """
+        try:
+            return self.begin(tool_name, paths, label)
+        except (OSError, sqlite3.Error) as e:
+            self.failures += 1
+            self.last_error = f"{label}: {e}"
+            return None
+
+    def end(self, token: tuple):
+        """Record the state a tool call left behind, as an "after" snapshot.
+
+        The next call only captures its own paths, so without this the
+        files a call created or changed would be missing from the state of
+        every later snapshot, and rolling back to one would remove them.
+        Nothing is recorded when the call changed nothing. Failures are
+        counted, like those of try_begin.
+        """
+        _, linked, paths, label = token
+        for path, digest in linked:
+            try:
+                self._unlink_from_workspace(digest, path)
+            except OSError as e:
+                self.failures += 1
+                self.last_error = f"{path}: {e}"
+        after = "after " + label.removeprefix("before ")
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    # the files stay in the workspace and may be written in place
+                    changes = self._sync_locked(paths, link=False)
+                    if changes:
+                        self._record_locked(after, changes)
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except (OSError, sqlite3.Error) as e:
+            self.failures += 1
+            self.last_error = f"{after}: {e}"
+
+    def recent(self, limit: int = 20) -> list[Snapshot]:
+        """The most recent snapshots, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT s.id, s.created, s.label, COUNT(c.path)
+                FROM snapshots s LEFT JOIN changes c ON c.snapshot = s.id
+                GROUP BY s.id ORDER BY s.id DESC LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+        return [Snapshot(*row) for row in rows]
+
+    def _state_at_locked(self, snapshot: int) -> dict[str, tuple[str, int | None] | None]:
+        """(hash, mode) of every path as of a snapshot, None for absent ones."""
+        rows = self._conn.execute(
+            """
+            SELECT c.path, c.hash, c.mode FROM changes c
+            JOIN (
+                SELECT path, MAX(snapshot) AS snapshot FROM changes
+                WHERE snapshot <= ? GROUP BY path
+            ) latest ON latest.path = c.path AND latest.snapshot = c.snapshot
+            """,
+            (snapshot,),
+        ).fetchall()
+        return {path: (digest, mode) if digest else None for path, digest, mode in rows}
+
+    def rollback(self, snapshot: int) -> list[str]:
+        """Restore the workspace to its state at a snapshot.
+
+        The current state is captured first, so a rollback can itself be
+        rolled back. Only files that differ are written or removed; files
+        whose content matches but whose mode does not are only chmodded.
+
+        Returns:
+            The paths that were restored or removed
+
+        Raises:
+            ValueError: If the snapshot does not exist
+        """
+        with self._lock:
+            if not self._conn.execute(
+                "SELECT 1 FROM snapshots WHERE id = ?", (snapshot,)
+            ).fetchone():
+                raise ValueError(f"No snapshot #{snapshot}")
+
+            self._conn.execute("BEGIN")
+            try:
+                changes = self._sync_locked(None, link=False)
+                self._record_locked(f"before rollback to #{snapshot}", changes)
+                target = self._state_at_locked(snapshot)
+                current = {
+                    path: (digest, mode)
+                    for path, digest, mode in self._conn.execute(
+                        "SELECT path, hash, mode FROM manifest"
+                    )
+                }
+
+                restored = {}
+                for path in set(target) | set(current):
+                    wanted, have = target.get(path), current.get(path)
+                    if wanted == have:
+                        continue
+                    if wanted is None:
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass
+                        self._remove_empty_parents(path)
+                        self._conn.execute("DELETE FROM manifest WHERE path = ?", (path,))
+                        restored[path] = None
+                        continue
+
+                    digest, mode = wanted
+                    same_content = have is not None and have[0] == digest
+                    if same_content and mode is None:
+                        # recorded before modes were, nothing to restore
+                        continue
+                    if same_content:
+                        os.chmod(path, mode)
+                    else:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        with open(self._blob_path(digest), "rb") as f:
+                            atomic_write_bytes(path, f.read(), mode)
+                    st = os.stat(path)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO manifest (path, hash, mtime_ns, size, inode, mode) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (path, digest, *_stat_key(st), st.st_mode & 0o7777),
+                    )
+                    restored[path] = (digest, st.st_mode & 0o7777)
+                self._record_locked(f"rolled back to #{snapshot}", restored)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        for path in restored:
+            workspace_cache.invalidate(path)
+        return sorted(restored)
+
+    def _remove_empty_parents(self, path: str):
+        parent = os.path.dirname(path)
+        while self._tracked(parent) and parent != self.root:
+            try:
+                os.rmdir(parent)
+            except OSError:
+                return
+            parent = os.path.dirname(parent)
+
+    def gc(self, keep: int = MAX_SNAPSHOTS) -> int:
+        """Drop all but the latest ``keep`` snapshots and the blobs only they used.
+
+        The oldest kept snapshot absorbs the full state of the dropped ones,
+        so it can still be restored. Returns the number of blobs removed.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM snapshots ORDER BY id DESC LIMIT 1 OFFSET ?", (keep - 1,)
+            ).fetchone()
+            if row is not None:
+                oldest = row[0]
+                self._conn.execute("BEGIN")
+                try:
+                    state = self._state_at_locked(oldest)
+                    self._conn.execute("DELETE FROM changes WHERE snapshot <= ?", (oldest,))
+                    self._conn.executemany(
+                        "INSERT INTO changes (snapshot, path, hash, mode) VALUES (?, ?, ?, ?)",
+                        [(oldest, path, *entry) for path, entry in state.items() if entry],
+                    )
+                    self._conn.execute("DELETE FROM snapshots WHERE id < ?", (oldest,))
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                if self.session_start is not None and self.session_start < oldest:
+                    self.session_start = oldest
+
+            used = {
+                digest
+                for (digest,) in self._conn.execute(
+                    "SELECT hash FROM changes WHERE hash IS NOT NULL "
+                    "UNION SELECT hash FROM manifest"
+                )
+            }
+
+        removed = 0
+        for prefix in os.listdir(self.blob_dir):
+            directory = os.path.join(self.blob_dir, prefix)
+            for name in os.listdir(directory):
+                if name not in used and not name.endswith(".tmp"):
+                    os.remove(os.path.join(directory, name))
+                    removed += 1
+        return removed
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+
+
+def _like_prefix(path: str) -> str:
+    escaped = path.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + os.sep + "%"
+
+
+_journal: SnapshotJournal | None = None
+_journal_lock = threading.Lock()
+
+
+def start_journal(root: str) -> SnapshotJournal:
+    """Journal a workspace from now on, replacing any previous journal."""
+    global _journal
+    journal = SnapshotJournal(root)
+    journal.start_session()
+    with _journal_lock:
+        previous, _journal = _journal, journal
+    if previous is not None:
+        previous.close()
+    return journal
+
+
+def get_journal() -> SnapshotJournal | None:
+    """The active snapshot journal, or None when no workspace is journaled."""
+    return _journal
@@ -0,0 +1,259 @@
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from collections import defaultdict
+from app.src.config.snapshots import get_journal
+from app.src.config.patching import patch_paths
+from app.src.config.tool_output import tool_outputs
+from contextlib import ExitStack, contextmanager
+import threading
+import asyncio
+import os
+
+
+MAX_WORKERS = 8
+
+# How each tool touches the workspace. Tools that are not listed are treated
+# as exclusive: they run alone, after everything before them has finished.
+READ = "read"
+WRITE = "write"
+INDEPENDENT = "independent"  # no workspace access, e.g. web search
+EXCLUSIVE = "exclusive"
+
+TOOL_ACCESS = {
+    "read_file": READ,
+    "list_directory": READ,
+    "search_workspace": READ,
+    "create_wd": WRITE,
+    "create_file": WRITE,
+    "create_files": WRITE,
+    "modify_file": WRITE,
+    "edit_files": WRITE,
+    "apply_patch": WRITE,
+    "append_file": WRITE,
+    "delete_file": WRITE,
+    "delete_directory": WRITE,
+    "read_tool_output": INDEPENDENT,
+    "read_process_output": INDEPENDENT,
+    "wait_for_process": INDEPENDENT,
+    "stop_process": INDEPENDENT,
+    "list_processes": INDEPENDENT,
+    "search_and_scrape": INDEPENDENT,
+    "call_searcher": INDEPENDENT,
+}
+
+PATH_ARGS = ("file_path", "path")
+
+
+class PathLocks:
+    """Process-wide locks serializing writes to the same path."""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks: dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+    def lock(self, paths: list[str]) -> ExitStack:
+        """Acquire the locks of all paths, in sorted order to avoid deadlocks."""
+        stack = ExitStack()
+        for path in sorted(set(paths)):
+            with self._guard:
+                lock = self._locks[path]
+            stack.enter_context(lock)
+        return stack
+
+
+path_locks = PathLocks()
+
+
+def _normalize(path: str) -> str:
+    return os.path.realpath(os.path.abspath(path))
+
+
+def call_paths(args: dict) -> list[str]:
+    """Collect the workspace paths referenced by a tool call's arguments."""
+    paths = []
+    for key, value in args.items():
+        if key in PATH_ARGS and isinstance(value, str):
+            paths.append(_normalize(value))
+        elif key == "patch" and isinstance(value, str):
+            paths.extend(_normalize(path) for path in patch_paths(value))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    paths.extend(call_paths(item))
+    return paths
+
+
+def _overlaps(a: str, b: str) -> bool:
+    """True if the paths are equal or one contains the other."""
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+def _label(planned: "_PlannedCall") -> str:
+    paths = ", ".join(os.path.basename(path) for path in planned.paths[:3])
+    if len(planned.paths) > 3:
+        paths += f" and {len(planned.paths) - 3} more"
+    return f"before {planned.call['name']}({paths})"
+
+
+@contextmanager
+def _journaled(planned: "_PlannedCall"):
+    """Snapshot the workspace around a mutating call, if a journal is active."""
+    journal = get_journal()
+    token = None
+    if journal is not None and planned.access in (WRITE, EXCLUSIVE):
+        # exclusive tools can touch anything, so the whole workspace is captured
+        paths = planned.paths if planned.access == WRITE else None
+        token = journal.try_begin(planned.call["name"], paths, _label(planned))
+    try:
+        yield
+    finally:
+        if token is not None:
+            journal.end(token)
+
+
+class _PlannedCall:
+    def __init__(self, index: int, call: dict):
+        self.index = index
+        self.call = call
+        self.access = TOOL_ACCESS.get(call["name"], EXCLUSIVE)
+        self.paths = call_paths(call.get("args") or {})
+
+    def conflicts_with(self, other: "_PlannedCall") -> bool:
+        if EXCLUSIVE in (self.access, other.access):
+            return True
+        if INDEPENDENT in (self.access, other.access):
+            return False
+        if self.access == READ and other.access == READ:
+            return False
+        return any(_overlaps(a, b) for a in self.paths for b in other.paths)
+
+
+def plan_batches(tool_calls: list[dict]) -> list[list[_PlannedCall]]:
+    """Split tool calls into ordered batches of mutually independent calls.
+
+    A call joins the current batch unless it conflicts with a call already
+    in it (a write overlapping another read or write, or an exclusive tool),
+    in which case a new batch starts. Batches run one after another, so any
+    two conflicting calls still execute in the order the model emitted them.
+    """
+    batches: list[list[_PlannedCall]] = []
+    for index, call in enumerate(tool_calls):
+        planned = _PlannedCall(index, call)
+        if batches and not any(planned.conflicts_with(p) for p in batches[-1]):
+            batches[-1].append(planned)
+        else:
+            batches.append([planned])
+    return batches
+
+
+class ToolExecutor:
+    """Graph node that runs the tool calls of one model turn concurrently.
+
+    Independent calls (reads, web searches, writes to unrelated files) run
+    in a bounded thread pool, or as bounded asyncio tasks when the graph runs
+    asynchronously; conflicting calls keep their original order. Results are
+    always returned in the order the calls were made, with oversized outputs
+    replaced by a preview of the copy kept in the tool output store.
+
+    Args:
+        tools: Tools available to the agent
+        max_workers: Maximum number of tools running at the same time
+    """
+
+    def __init__(self, tools: list[BaseTool], max_workers: int = MAX_WORKERS):
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.max_workers = max_workers
+
+    def __call__(self, state: dict, config: RunnableConfig) -> dict:
+        message = state["messages"][-1]
+        if not isinstance(message, AIMessage) or not message.tool_calls:
+            return {"messages": []}
+
+        results: dict[int, ToolMessage] = {}
+        with ContextThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for batch in plan_batches(message.tool_calls):
+                if len(batch) == 1:
+                    results[batch[0].index] = self._run(batch[0], config)
+                    continue
+
+                futures = [
+                    (planned.index, pool.submit(self._run, planned, config))
+                    for planned in batch
+                ]
+                errors = []
+                for index, future in futures:
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                if errors:
+                    raise errors[0]
+
+        return {"messages": [results[i] for i in sorted(results)]}
+
+    async def acall(self, state: dict, config: RunnableConfig) -> dict:
+        message = state["messages"][-1]
+        if not isinstance(message, AIMessage) or not message.tool_calls:
+            return {"messages": []}
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def run(planned: _PlannedCall) -> ToolMessage:
+            async with semaphore:
+                return await self._arun(planned, config)
+
+        results: list[ToolMessage] = []
+        for batch in plan_batches(message.tool_calls):
+            outcomes = await asyncio.gather(
+                *(run(planned) for planned in batch), return_exceptions=True
+            )
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    raise outcome
+            results.extend(outcomes)
+
+        return {"messages": results}
+
+    def _missing_tool(self, call: dict) -> ToolMessage:
+        return ToolMessage(
+            content=f"Error: {call['name']} is not a valid tool, try one of "
+            f"[{', '.join(self.tools_by_name)}].",
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    def _run(self, planned: _PlannedCall, config: RunnableConfig) -> ToolMessage:
+        call = planned.call
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            return self._missing_tool(call)
+
+        locked = planned.paths if planned.access == WRITE else []
+        with path_locks.lock(locked), _journaled(planned):
+            message = tool.invoke({**call, "type": "tool_call"}, config)
+        return tool_outputs.budget(message)
+
+    async def _arun(self, planned: _PlannedCall, config: RunnableConfig) -> ToolMessage:
+        call = planned.call
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            return self._missing_tool(call)
+
+        if planned.access == WRITE:
+            # path locks are thread locks; keep the blocking part off the event loop
+            return await asyncio.to_thread(self._run, planned, config)
+        journal = get_journal()
+        token = None
+        if planned.access == EXCLUSIVE and journal is not None:
+            token = await asyncio.to_thread(journal.try_begin, call["name"], None, _label(planned))
+        try:
+            message = await tool.ainvoke({**call, "type": "tool_call"}, config)
+        finally:
+            if token is not None:
+                # capturing the state after the call may walk the whole workspace
+                await asyncio.to_thread(journal.end, token)
+        # spilling a large output writes to disk, keep it off the event loop
+        return await asyncio.to_thread(tool_outputs.budget, message)
@@ -0,0 +1,218 @@
+from langchain_core.messages import ToolMessage
+from app.src.config.file_io import READ_MAX_BYTES
+from app.utils.constants import DATA_DIR
+import threading
+import hashlib
+import os
+import re
+
+
+OUTPUT_DIR = os.path.join(DATA_DIR, "tool_outputs")
+MAX_OUTPUT_CHARS = 16_000  # tool results longer than this are spilled to disk
+# tools that bound their own output get a larger allowance
+OUTPUT_LIMITS = {"read_file": READ_MAX_BYTES, "read_tool_output": None}
+PREVIEW_HEAD_CHARS = 3_000
+PREVIEW_TAIL_CHARS = 3_000
+PAGE_MAX_LINES = 200
+PAGE_MAX_CHARS = 12_000
+MAX_PAGE_LINE_CHARS = 2_000
+MAX_STORE_BYTES = 256 * 1024 * 1024  # oldest outputs are pruned beyond this
+
+OUTPUT_ID = re.compile(r"^out-[0-9a-f]{16}$")
+
+
+class ToolOutputStore:
+    """Full tool outputs kept on disk while the message history holds a preview.
+
+    Outputs are stored once per content, as ``<id>.txt`` in ``directory``,
+    and survive restarts so that resumed conversations can still page
+    through them. The least recently written outputs are removed once the
+    store exceeds ``max_bytes``.
+
+    Args:
+        directory: Where outputs are stored
+        max_bytes: Size budget of the store
+    """
+
+    def __init__(self, directory: str = OUTPUT_DIR, max_bytes: int = MAX_STORE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.spilled = 0
+        self.spilled_chars = 0
+        self._lock = threading.Lock()
+
+    def _path(self, output_id: str) -> str:
+        return os.path.join(self.directory, f"{output_id}.txt")
+
+    def put(self, text: str) -> str:
+        """Store an output and return its id.
+
+        Raises:
+            OSError: If the output cannot be written
+        """
+        data = text.encode("utf-8", errors="replace")
+        output_id = "out-" + hashlib.sha256(data).hexdigest()[:16]
+        path = self._path(output_id)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if os.path.exists(path):
+                # bump it so pruning keeps the outputs still referenced
+                os.utime(path)
+                return output_id
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._prune_locked()
+        return output_id
+
+    def get(self, output_id: str) -> str:
+        """Full text of a stored output.
+
+        Raises:
+            KeyError: If no output has this id, or it was pruned
+        """
+        if not OUTPUT_ID.match(output_id):
+            raise KeyError(output_id)
+        try:
+            with open(self._path(output_id), "rb") as f:
+                return f.read().decode("utf-8", errors="replace")
+        except FileNotFoundError:
+            raise KeyError(output_id) from None
+
+    def _prune_locked(self):
+        try:
+            entries = [
+                entry for entry in os.scandir(self.directory) if entry.name.endswith(".txt")
+            ]
+        except OSError:
+            return
+        stats = []
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            stats.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in sorted(stats):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def budget(self, message: ToolMessage) -> ToolMessage:
+        """Cap the content of a tool result kept in the conversation.
+
+        Content over the tool's limit is stored in full and replaced by a
+        head and tail preview with a reference read_tool_output can page
+        through. If the store cannot be written, the preview says so and the
+        rest of the output is dropped.
+        """
+        limit = OUTPUT_LIMITS.get(message.name, MAX_OUTPUT_CHARS)
+        content = message.content
+        if limit is None or not isinstance(content, str) or len(content) <= limit:
+            return message
+
+        try:
+            reference = self.put(content)
+        except OSError as e:
+            reference = None
+            error = e.strerror or str(e)
+        with self._lock:
+            self.spilled += 1
+            self.spilled_chars += len(content)
+
+        head, tail = _preview(content)
+        total_lines = content.count("\n") + (not content.endswith("\n"))
+        first_tail_line = content.count("\n", 0, len(content) - len(tail)) + 1
+        omitted_lines = first_tail_line - 1 - (head.count("\n") + 1)
+        omitted_chars = len(content) - len(head) - len(tail)
+
+        if reference is None:
+            header = (
+                f"[{message.name} output: {total_lines} lines, {len(content):,} characters. "
+                f"Only the start and end are kept, the full output could not be saved: {error}]"
+            )
+        else:
+            header = (
+                f"[{message.name} output: {total_lines} lines, {len(content):,} characters, "
+                f"saved as {reference}. Only the start and end are shown; use "
+                f'read_tool_output(output_id="{reference}", start_line=N) to page through it '
+                f'or read_tool_output(output_id="{reference}", pattern="...") to search it]'
+            )
+        marker = (
+            f"[... {omitted_lines} lines ({omitted_chars:,} characters) omitted, "
+            f"output continues at line {first_tail_line} ...]"
+        )
+        return message.model_copy(
+            update={"content": "\n".join(part for part in (header, head, marker, tail) if part)}
+        )
+
+    def page(
+        self,
+        output_id: str,
+        start_line: int = 1,
+        max_lines: int = PAGE_MAX_LINES,
+        pattern: str | None = None,
+    ) -> str:
+        """Numbered lines of a stored output, or the lines matching a regex.
+
+        Raises:
+            KeyError: If the output does not exist
+            re.error: If the pattern is invalid
+        """
+        lines = self.get(output_id).splitlines()
+        start = max(start_line, 1)
+        max_lines = max(1, min(max_lines, PAGE_MAX_LINES))
+        regex = re.compile(pattern) if pattern else None
+
+        shown, size, number = [], 0, start
+        for number in range(start, len(lines) + 1):
+            line = lines[number - 1]
+            if regex is not None and not regex.search(line):
+                continue
+            if len(shown) == max_lines or size >= PAGE_MAX_CHARS:
+                break
+            if len(line) > MAX_PAGE_LINE_CHARS:
+                hidden = len(line) - MAX_PAGE_LINE_CHARS
+                line = line[:MAX_PAGE_LINE_CHARS] + f"... [{hidden} more characters]"
+            shown.append(f"{number:>6}| {line}")
+            size += len(shown[-1]) + 1
+        else:
+            number = len(lines) + 1
+
+        what = f"matches of {pattern!r} from line {start}" if regex else f"from line {start}"
+        header = f"[{output_id} | {len(lines)} lines | {len(shown)} {what}]"
+        result = "\n".join([header] + shown)
+        if number <= len(lines):
+            result += f"\n[... more lines follow, continue with start_line={number} ...]"
+        elif not shown:
+            result += "\n(no lines)"
+        return result
+
+    def report(self) -> str:
+        with self._lock:
+            return (
+                f"{self.spilled} outputs ({self.spilled_chars / 1024 / 1024:.1f} MiB) "
+                f"moved out of the conversation into {self.directory}"
+            )
+
+
+def _preview(text: str) -> tuple[str, str]:
+    """Head and tail of a long text, cut at line boundaries when possible."""
+    head = text[:PREVIEW_HEAD_CHARS]
+    newline = head.rfind("\n")
+    if newline > PREVIEW_HEAD_CHARS // 2:
+        head = head[:newline]
+    tail = text[-PREVIEW_TAIL_CHARS:]
+    newline = tail.find("\n")
+    if -1 < newline < PREVIEW_TAIL_CHARS // 2:
+        tail = tail[newline + 1 :]
+    return head, tail
+
+
+tool_outputs = ToolOutputStore()
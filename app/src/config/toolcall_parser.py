@@ -0,0 +1,238 @@
+from langchain_core.tools import BaseTool
+from pydantic import ValidationError
+from collections import Counter
+import threading
+import json
+import uuid
+import ast
+import re
+
+
+# markup some models use for tool calls they write into the content
+TAGGED_CALL = re.compile(r"<tool_call>\s*(.*?)\s*(?:</tool_call>|$)", re.DOTALL)
+FUNCTION_CALL = re.compile(
+    r"<function=([\w.-]+)>\s*(.*?)\s*(?:</function>|$)", re.DOTALL
+)
+# a JSON object that names something and passes it arguments
+CALL_SHAPE = re.compile(
+    r"""["']?(?:name|tool|function)["']?\s*:.*?["']?(?:arguments|parameters|args)["']?\s*:""",
+    re.DOTALL,
+)
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+NAME_KEYS = ("name", "tool", "tool_name")
+ARGS_KEYS = ("arguments", "parameters", "args", "input")
+
+# paths counted by ToolCallStats
+NATIVE = "native"
+SALVAGED = "salvaged"
+RETRY = "retry"
+ANSWER = "answer"
+
+
+class ToolCallStats:
+    """Thread-safe counters of how model turns were routed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, path: str):
+        with self._lock:
+            self._counts[path] += 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {path: self._counts[path] for path in (NATIVE, SALVAGED, RETRY, ANSWER)}
+
+    def report(self) -> str:
+        """Human readable summary of the routing counters."""
+        counts = self.snapshot()
+        return (
+            f"{counts[NATIVE]} native tool calls, {counts[SALVAGED]} salvaged locally, "
+            f"{counts[RETRY]} sent back to the model, {counts[ANSWER]} plain answers"
+        )
+
+
+toolcall_stats = ToolCallStats()
+
+
+def looks_like_tool_call(content: str) -> bool:
+    """Whether plain message content seems to contain an attempted tool call.
+
+    Braces alone are not enough (code answers are full of them): the content
+    must use tool call markup or contain an object with a name and arguments.
+    """
+    if not content:
+        return False
+    if "<tool_call>" in content or "<function=" in content:
+        return True
+    return "{" in content and CALL_SHAPE.search(content) is not None
+
+
+def _json_spans(text: str) -> list[tuple[int, int]]:
+    """Spans of the top-level brace-balanced segments of text.
+
+    A segment left open at the end of the text runs to the end.
+    """
+    spans = []
+    depth, start, in_string, escaped, quote = 0, None, False, False, ""
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                in_string = False
+        elif char in "\"'" and depth:
+            in_string, quote = True, char
+        elif char == "{":
+            if depth == 0:
+                start = index
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                spans.append((start, index + 1))
+    if depth and start is not None:
+        spans.append((start, len(text)))
+    return spans
+
+
+def _close_brackets(text: str) -> str:
+    """Append the closing brackets missing from truncated JSON."""
+    stack, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    return text + ('"' if in_string else "") + "".join(reversed(stack))
+
+
+def loads_lenient(text: str):
+    """Parse JSON the way models tend to get it wrong.
+
+    Tries strict JSON first, then tolerates trailing commas, missing closing
+    brackets and Python literals (single quotes, True/False/None).
+
+    Raises:
+        ValueError: If the text cannot be parsed at all
+    """
+    text = text.strip()
+    candidates = [text, TRAILING_COMMA.sub(r"\1", text)]
+    candidates.append(_close_brackets(candidates[-1]))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+
+    python_like = re.sub(r"\btrue\b", "True", candidates[-1])
+    python_like = re.sub(r"\bfalse\b", "False", python_like)
+    python_like = re.sub(r"\bnull\b", "None", python_like)
+    try:
+        return ast.literal_eval(python_like)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        raise ValueError("Not a JSON object") from None
+
+
+def _as_call(payload, name: str | None = None) -> tuple[str, dict] | None:
+    """Normalize the call shapes models produce to (name, args)."""
+    if not isinstance(payload, dict):
+        return None
+    if name is not None:
+        return name, payload
+    if isinstance(payload.get("function"), dict):
+        payload = payload["function"]
+
+    name = next((payload[key] for key in NAME_KEYS if isinstance(payload.get(key), str)), None)
+    if name is None:
+        return None
+    args = next((payload[key] for key in ARGS_KEYS if key in payload), {})
+    if isinstance(args, str):
+        try:
+            args = loads_lenient(args) if args.strip() else {}
+        except ValueError:
+            return None
+    if not isinstance(args, dict):
+        return None
+    return name, args
+
+
+def _valid(tool: BaseTool, args: dict) -> bool:
+    schema = tool.tool_call_schema
+    if not isinstance(schema, type):
+        # tools described by a plain JSON schema are checked when they run
+        return True
+    try:
+        schema.model_validate(args)
+    except ValidationError:
+        return False
+    return True
+
+
+def salvage_tool_calls(
+    content: str, tools_by_name: dict[str, BaseTool]
+) -> tuple[list[dict], str]:
+    """Recover tool calls written into message content.
+
+    Looks for ``<tool_call>`` and ``<function=...>`` blocks first and for bare
+    JSON objects otherwise. A candidate only counts when it names a bound
+    tool and its arguments pass that tool's schema.
+
+    Args:
+        content: The message content
+        tools_by_name: Tools bound to the agent
+
+    Returns:
+        Tuple of (tool calls, content with the recovered payloads removed)
+    """
+    candidates = []  # (span, name or None, payload text)
+    for match in FUNCTION_CALL.finditer(content):
+        candidates.append((match.span(), match.group(1), match.group(2) or "{}"))
+    if not candidates:
+        for match in TAGGED_CALL.finditer(content):
+            candidates.append((match.span(), None, match.group(1)))
+    if not candidates:
+        for start, end in _json_spans(content):
+            candidates.append(((start, end), None, content[start:end]))
+
+    calls, spans = [], []
+    for span, name, payload_text in candidates:
+        try:
+            call = _as_call(loads_lenient(payload_text), name)
+        except ValueError:
+            continue
+        if call is None:
+            continue
+        name, args = call
+        tool = tools_by_name.get(name)
+        if tool is None or not _valid(tool, args):
+            continue
+        calls.append(
+            {
+                "name": name,
+                "args": args,
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "tool_call",
+            }
+        )
+        spans.append(span)
+
+    remaining = content
+    for start, end in sorted(spans, reverse=True):
+        remaining = remaining[:start] + remaining[end:]
+    # drop code fences left empty by the removed payloads
+    remaining = re.sub(r"```(?:json)?\s*```", "", remaining)
+    return calls, remaining.strip()
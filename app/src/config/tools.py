@@ -1,7 +1,46 @@
 from app.src.config.permissions import permission_manager, PermissionDeniedException
+from app.src.config.file_io import (
+    read_text_range,
+    atomic_write,
+    apply_edits,
+    write_files,
+    validate_new_files,
+    READ_MAX_BYTES,
+    UNCHANGED_NOTICE,
+)
+from app.src.config.patching import apply_patch_text, PatchError, DEFAULT_FUZZ
+from app.src.config.code_search import search, DEFAULT_MAX_RESULTS
+from app.src.config.tool_output import tool_outputs, PAGE_MAX_LINES
+from app.src.config.workspace_cache import workspace_cache
+from app.src.config.file_tree import (
+    walk_tree,
+    render_tree,
+    render_json,
+    DEFAULT_MAX_DEPTH,
+    DEFAULT_MAX_ENTRIES,
+)
+from typing import TypedDict, NotRequired
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
-import os
 import shutil
+import os
+import re
+
+
+class FileEdit(TypedDict):
+    """One exact-match replacement of an edit_files batch."""
+
+    file_path: str
+    old_content: str
+    new_content: str
+    replace_all: NotRequired[bool]
+
+
+class NewFile(TypedDict):
+    """One file of a create_files manifest."""
+
+    file_path: str
+    content: str
 
 
 @tool
@@ -93,11 +132,80 @@ def create_file(file_path: str, content: str) -> str:
 
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(content)
+        workspace_cache.store(file_path, content.encode("utf-8"))
         return f"File created at {file_path}"
     except Exception as e:
         return f"[ERROR] Failed to create file: {str(e)}"
 
 
+@tool
+def create_files(
+    files: list[NewFile], directories: list[str] = None, overwrite: bool = True
+) -> str:
+    """
+    **PRIMARY PURPOSE**: Creates many files (and directories) in a single call, e.g. a whole project scaffold.
+
+    **WHEN TO USE**:
+    - Scaffolding a new project or module with several files at once
+    - Generating a set of related files (package + tests + config)
+    - Any time you would otherwise call create_file() several times in a row
+
+    **BEHAVIOR**:
+    - Validates the whole manifest first; if anything is wrong, nothing is
+      created and every problem is reported
+    - Creates ALL necessary parent directories automatically
+    - Writes the files concurrently, each one atomically; if a write fails,
+      the whole batch is undone
+    - OVERWRITES existing files unless overwrite is False
+
+    **PARAMETERS**:
+        files (list): Files to create, each with:
+                      - file_path (str): Where to create the file
+                      - content (str): Exact text content for the file
+        directories (list, optional): Extra (empty) directories to create
+        overwrite (bool): Replace files that already exist (default True)
+
+    **RETURNS**:
+        str: Summary with one line per created file, or the list of problems
+
+    **EXAMPLES**:
+        create_files([
+            {"file_path": "app/__init__.py", "content": ""},
+            {"file_path": "app/main.py", "content": "print('hello')\n"},
+            {"file_path": "README.md", "content": "# My Project\n"},
+        ], directories=["tests", "docs"])
+    """
+    directories = directories or []
+    if not permission_manager.get_permission(
+        tool_name="create_files", files=files, directories=directories
+    ):
+        raise PermissionDeniedException()
+    if not files and not directories:
+        return "[ERROR] No files or directories given"
+
+    problems = validate_new_files(files, directories, overwrite)
+    if problems:
+        count = f"{len(problems)} problems" if len(problems) > 1 else "1 problem"
+        return "\n".join(
+            [f"[ERROR] {count}, nothing was created:"]
+            + [f"- {problem}" for problem in problems]
+        )
+    try:
+        written, created_dirs = write_files([dict(spec) for spec in files], directories)
+    except Exception as e:
+        return f"[ERROR] Failed to create files, the batch was undone: {str(e)}"
+
+    total = sum(item.size for item in written)
+    file_count = "1 file" if len(written) == 1 else f"{len(written)} files"
+    dir_count = "1 directory" if len(created_dirs) == 1 else f"{len(created_dirs)} directories"
+    lines = [f"Created {file_count} ({total} bytes) and {dir_count}:"]
+    for item in written:
+        note = ", overwritten" if item.overwritten else ""
+        line_count = "1 line" if item.lines == 1 else f"{item.lines} lines"
+        lines.append(f"+ {item.file_path} ({line_count}{note})")
+    return "\n".join(lines)
+
+
 @tool
 def modify_file(file_path: str, old_content: str, new_content: str) -> str:
     """
@@ -142,21 +250,154 @@ def modify_file(file_path: str, old_content: str, new_content: str) -> str:
         raise PermissionDeniedException()
     try:
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            contents = f.read()
+        contents = workspace_cache.read_text(file_path)
 
         if old_content not in contents:
             return f"Content not found in {file_path}"
 
         contents = contents.replace(old_content, new_content, 1)
 
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(contents)
+        atomic_write(file_path, contents)
+        workspace_cache.store(file_path, contents.encode("utf-8"))
         return f"File modified at {file_path}"
     except Exception as e:
         return f"Error modifying file: {str(e)}"
 
 
+@tool
+def edit_files(edits: list[FileEdit]) -> str:
+    """
+    **PRIMARY PURPOSE**: Applies a batch of exact-match replacements, across one or more files, in a single call.
+
+    **WHEN TO USE**:
+    - Refactors that touch several places in a file or several files
+    - Renaming a function, variable or import everywhere it is used
+    - Any change that would otherwise need repeated modify_file() calls
+
+    **BEHAVIOR**:
+    - Edits are applied in order; later edits of a file see earlier ones
+    - EVERY edit is validated before anything is written: if one edit fails,
+      NO file is changed and the failing edits are reported
+    - old_content must match exactly once, unless replace_all is true
+    - Each changed file is written once, atomically (temp file + rename),
+      so a file is never left half written
+    - Files must already exist (use create_file() for new files)
+
+    **PARAMETERS**:
+        edits (list): Edits to apply, each with:
+                      - file_path (str): Path to an existing file
+                      - old_content (str): EXACT text to replace (whitespace,
+                        indentation and line breaks must match)
+                      - new_content (str): Replacement text
+                      - replace_all (bool, optional): Replace every occurrence
+                        instead of requiring a unique match
+
+    **RETURNS**:
+        str: One result line per edit, then a "+added -removed lines" summary
+             per changed file, or the reasons the batch was rejected
+
+    **EXAMPLES**:
+        edit_files([
+            {"file_path": "app.py", "old_content": "def load(", "new_content": "def load_config("},
+            {"file_path": "main.py", "old_content": "load(path)", "new_content": "load_config(path)"},
+        ])
+        edit_files([{"file_path": "utils.py", "old_content": "DEBUG", "new_content": "VERBOSE", "replace_all": True}])
+    """
+    if not permission_manager.get_permission(tool_name="edit_files", edits=edits):
+        raise PermissionDeniedException()
+    if not edits:
+        return "[ERROR] No edits given"
+    try:
+        results, summary = apply_edits([dict(edit) for edit in edits])
+    except Exception as e:
+        return f"[ERROR] Failed to apply edits, no file was changed: {str(e)}"
+
+    lines = [
+        f"{i}. {'✓' if result.ok else '✗'} {result.file_path}: {result.message}"
+        for i, result in enumerate(results, 1)
+    ]
+    count = "1 edit" if len(results) == 1 else f"{len(results)} edits"
+    if not all(result.ok for result in results):
+        failed = sum(not result.ok for result in results)
+        return "\n".join(
+            [f"[ERROR] {failed} of {count} failed, no file was changed:"] + lines
+        )
+    return "\n".join(
+        [f"Applied {count}:"] + lines + ["", "Changed files:"]
+        + (summary or ["(no changes)"])
+    )
+
+
+@tool
+def apply_patch(patch: str, fuzz: int = DEFAULT_FUZZ) -> str:
+    """
+    **PRIMARY PURPOSE**: Applies a unified diff, across one or more files, in a single call.
+
+    **WHEN TO USE**:
+    - Surgical edits inside large files, where reproducing the exact
+      old_content for modify_file() would be long or error prone
+    - Several related hunks in one or more files
+    - Creating (--- /dev/null) or deleting (+++ /dev/null) files as part of a change
+
+    **BEHAVIOR**:
+    - Accepts standard unified diffs, plain or git style (a/ and b/ prefixes are stripped)
+    - Each hunk is matched against its context and removed lines: exactly first,
+      then ignoring whitespace differences, then ignoring up to `fuzz` context lines
+      at each end of the hunk
+    - Line numbers in @@ headers are hints: a hunk that moved is found nearby and
+      reported with its offset; bare "@@" headers are accepted when the context
+      is unique in the file
+    - EVERY hunk is located before anything is written: if one hunk is rejected,
+      NO file is changed and the rejected hunks are reported with the closest
+      match found and the first line that differs
+    - Each changed file is written once, atomically (temp file + rename)
+
+    **PARAMETERS**:
+        patch (str): The unified diff, with ---/+++ file headers and @@ hunks.
+                     Context lines start with a space, removed lines with "-",
+                     added lines with "+"
+        fuzz (int, optional): Context lines a hunk may ignore at each end when it
+                              does not match exactly (default 2, 0 for strict matching)
+
+    **RETURNS**:
+        str: One result line per hunk, then a "+added -removed lines" summary per
+             changed file, or the rejected hunks and why no file was changed
+
+    **EXAMPLES**:
+        apply_patch('''--- a/app.py
++++ b/app.py
+@@ -10,2 +10,3 @@ def load(path):
+     with open(path) as f:
+-        return f.read()
++        data = f.read()
++    return data.strip()
+''')
+    """
+    if not permission_manager.get_permission(tool_name="apply_patch", patch=patch, fuzz=fuzz):
+        raise PermissionDeniedException()
+    try:
+        results, summary = apply_patch_text(patch, fuzz)
+    except PatchError as e:
+        return f"[ERROR] Invalid patch, no file was changed: {str(e)}"
+    except Exception as e:
+        return f"[ERROR] Failed to apply patch, no file was changed: {str(e)}"
+
+    lines = []
+    for result in results:
+        hunk = f" hunk #{result.number} {result.header}" if result.number else ""
+        lines.append(f"{'✓' if result.ok else '✗'} {result.file_path}{hunk}: {result.message}")
+    count = "1 hunk" if len(results) == 1 else f"{len(results)} hunks"
+    if not all(result.ok for result in results):
+        rejected = sum(not result.ok for result in results)
+        return "\n".join(
+            [f"[ERROR] {rejected} of {count} rejected, no file was changed:"] + lines
+        )
+    return "\n".join(
+        [f"Applied {count}:"] + lines + ["", "Changed files:"]
+        + (summary or ["(no changes)"])
+    )
+
+
 @tool
 def append_file(file_path: str, content: str) -> str:
     """
@@ -203,8 +444,10 @@ def append_file(file_path: str, content: str) -> str:
         if directory:
             os.makedirs(directory, exist_ok=True)
 
+        before = workspace_cache.version(file_path)
         with open(file_path, "a", encoding="utf-8") as f:
             f.write(content)
+        workspace_cache.appended(file_path, before, content.encode("utf-8"))
         return f"Content appended to {file_path}"
     except Exception as e:
         return f"Error appending file: {str(e)}"
@@ -255,6 +498,7 @@ def delete_file(file_path: str) -> str:
     try:
 
         os.remove(file_path)
+        workspace_cache.invalidate(file_path)
         return f"File deleted at {file_path}"
     except Exception as e:
         return f"Error deleting file: {str(e)}"
@@ -302,6 +546,7 @@ def delete_directory(path: str) -> str:
     try:
         if os.path.exists(path):
             shutil.rmtree(path)
+            workspace_cache.invalidate(path)
             return f"Directory deleted at {path}"
         else:
             return f"Directory does not exist: {path}"
@@ -310,21 +555,33 @@ def delete_directory(path: str) -> str:
 
 
 @tool
-def read_file(file_path: str) -> str:
+def read_file(
+    file_path: str,
+    start_line: int = None,
+    end_line: int = None,
+    start_byte: int = None,
+    end_byte: int = None,
+    max_bytes: int = READ_MAX_BYTES,
+    only_if_changed: bool = False,
+    config: RunnableConfig = None,
+) -> str:
     """
-    **PRIMARY PURPOSE**: Reads and returns the complete content of any text file.
+    **PRIMARY PURPOSE**: Reads the content of a text file, whole or in part.
 
     **WHEN TO USE**:
     - Examining existing files before making changes
     - Reading configuration files to understand settings
     - Reviewing documents or notes
     - Checking file contents to determine what modifications are needed
-    - Understanding file structure and existing content
+    - Reading only the relevant part of a large file (logs, lockfiles, data)
 
     **BEHAVIOR**:
-    - Returns the ENTIRE file content as a single string
+    - Starts with a header line: [File: path | N lines, M bytes | ...]
+    - Returns the whole file, or only the requested line or byte range
+    - Output is capped at max_bytes; longer content ends with a truncation
+      marker telling you where to continue (start_line=... or start_byte=...)
     - Preserves all formatting, indentation, and line breaks
-    - Works with any text-based file format
+    - Binary files are detected and not dumped; other encodings are decoded
     - Will fail if file doesn't exist or isn't readable
 
     **PARAMETERS**:
@@ -333,34 +590,65 @@ def read_file(file_path: str) -> str:
                         - "config/settings.json"
                         - "documents/README.md"
                         - "/etc/config/file.txt"
+        start_line (int, optional): First line to read, 1-based
+        end_line (int, optional): Last line to read, inclusive
+        start_byte (int, optional): First byte to read, 0-based
+                                   (do not combine with a line range)
+        end_byte (int, optional): Byte offset to stop at, exclusive
+        max_bytes (int, optional): Maximum bytes of content to return
+                                  (default 65536, never more than 1 MiB)
+        only_if_changed (bool, optional): Return a short "unchanged" notice
+                                  instead of the content when the file has not
+                                  changed since you last read this same range.
+                                  Only use it while that earlier output is
+                                  still visible to you.
 
     **RETURNS**:
-        str: Complete file contents, or error message if file cannot be read
+        str: Header line followed by the file content, or error message if
+             the file cannot be read
 
     **USE BEFORE**: Making changes to understand current file state
+    (do not copy the header line into modify_file arguments)
 
     **EXAMPLES**:
-        read_file("settings.json")           # Check configuration
-        read_file("documents/notes.txt")     # Review document content
-        read_file("/var/data/report.csv")    # Read data file
+        read_file("settings.json")                          # Whole file
+        read_file("app.log", start_line=1000, end_line=1200)  # Lines 1000-1200
+        read_file("data/dump.csv", start_byte=0, end_byte=4096)  # First 4 KiB
+        read_file("KNOWLEDGE_BASE.md", only_if_changed=True)  # Re-check a file
     """
     if not permission_manager.get_permission(
         tool_name="read_file", file_path=file_path
     ):
         raise PermissionDeniedException()
+    scope = ((config or {}).get("configurable") or {}).get("thread_id", "")
+    view = (start_line, end_line, start_byte, end_byte, max_bytes)
     try:
-
-        with open(file_path, "r", encoding="utf-8") as f:
-            contents = f.read()
-        return contents
+        if only_if_changed and workspace_cache.unchanged_since_seen(scope, file_path, view):
+            return f"{UNCHANGED_NOTICE}: {file_path} has not changed, content not repeated]"
+        content = read_text_range(
+            file_path,
+            start_line=start_line,
+            end_line=end_line,
+            start_byte=start_byte,
+            end_byte=end_byte,
+            max_bytes=max_bytes,
+        )
+        workspace_cache.mark_seen(scope, file_path, view)
+        return content
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
 
 @tool
-def list_directory(path: str = ".") -> str:
+def list_directory(
+    path: str = ".",
+    max_depth: int = DEFAULT_MAX_DEPTH,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    show_ignored: bool = False,
+    output_format: str = "tree",
+) -> str:
     """
-    **PRIMARY PURPOSE**: Shows all files and folders in a professional ASCII tree structure.
+    **PRIMARY PURPOSE**: Shows the files and folders under a directory in a professional ASCII tree structure.
 
     **WHEN TO USE**:
     - Exploring an unknown directory structure
@@ -370,13 +658,17 @@ def list_directory(path: str = ".") -> str:
     - Discovering what files exist in nested folders
 
     **BEHAVIOR**:
-    - Recursively explores all subdirectories
-    - Shows hierarchical structure with ASCII tree characters (├── └── │)
+    - Explores subdirectories down to max_depth levels
+    - Skips dependency, cache and build folders (node_modules/, .venv/,
+      __pycache__/, .git/, dist/, ...) and anything matched by .gitignore
+      files; ignored and too-deep folders are shown but not expanded
+    - Directories holding more than 50 files collapse the rest into a
+      "... N more files" line
+    - Stops after max_entries lines and says how to narrow the listing
+    - Files are listed before directories, each sorted alphabetically
     - Directories are marked with trailing "/"
-    - Files and directories are sorted alphabetically within each level
-    - Displays absolute path as header
 
-    **OUTPUT FORMAT**:
+    **OUTPUT FORMAT** ("tree"):
         /absolute/path/to/directory/
         │
         ├── file1.txt
@@ -384,118 +676,177 @@ def list_directory(path: str = ".") -> str:
         ├── subdirectory/
         │   ├── nested_file.md
         │   └── another_file.json
+        ├── node_modules/ (ignored)
         └── last_file.txt
 
     **PARAMETERS**:
         path (str): Directory to explore. Defaults to current directory (".")
                    Examples: ".", "documents", "/home/user/projects"
+        max_depth (int): How many directory levels to expand (default 4)
+        max_entries (int): Maximum number of lines to list (default 500)
+        show_ignored (bool): Also expand ignored folders and list ignored files
+        output_format (str): "tree" (default) or "json" for a flat list of
+                   {"path", "type", "size"} entries relative to the root
 
     **RETURNS**:
-        str: Professional ASCII tree view of all files and directories
+        str: ASCII tree view (or JSON) of the files and directories
 
     **USEFUL FOR**: Getting bearings in unfamiliar directory structures
 
     **EXAMPLES**:
         list_directory(".")                      # Show current directory structure
-        list_directory("documents")              # Explore documents/
-        list_directory("/var/log")               # Show system log directory contents
+        list_directory("src", max_depth=2)       # Only two levels of src/
+        list_directory(".", output_format="json")  # Paths and sizes as JSON
     """
     if not permission_manager.get_permission(tool_name="list_directory", path=path):
         raise PermissionDeniedException()
+    if output_format not in ("tree", "json"):
+        return f"Error listing directory: unknown output_format {output_format!r}"
+    try:
+        listing = walk_tree(
+            path,
+            max_depth=max_depth,
+            max_entries=max_entries,
+            show_ignored=show_ignored,
+            with_sizes=output_format == "json",
+        )
+    except PermissionError:
+        return f"{os.path.abspath(path)}/\n│\n❌ Permission denied"
+    except Exception as e:
+        return f"Error listing directory: {str(e)}"
+    return render_json(listing) if output_format == "json" else render_tree(listing)
 
-    def _list_directory_recursive(
-        current_path: str,
-        current_depth: int = 0,
-        is_last: bool = True,
-        parent_prefix: str = "",
-    ) -> list:
-        """Helper function to recursively build directory tree"""
-        items = []
-
-        try:
-            all_items = os.listdir(current_path)
-            dirs = []
-            files = []
-
-            for item in all_items:
-                item_path = os.path.join(current_path, item)
-                if os.path.isdir(item_path):
-                    dirs.append(item)
-                else:
-                    files.append(item)
-
-            # Sort files and directories
-            all_sorted = sorted(files) + sorted(dirs)
-            total_items = len(all_sorted)
-
-            for i, item_name in enumerate(all_sorted):
-                is_last_item = i == total_items - 1
-                item_path = os.path.join(current_path, item_name)
-
-                # Determine the prefix for this item
-                if current_depth == 0:
-                    prefix = ""
-                else:
-                    if is_last_item:
-                        prefix = parent_prefix + "└── "
-                    else:
-                        prefix = parent_prefix + "├── "
-
-                # Add the item
-                if os.path.isdir(item_path):
-                    items.append(f"{prefix}{item_name}/")
-
-                    # Recursively process subdirectory
-                    if current_depth == 0:
-                        new_parent_prefix = "│   "
-                    else:
-                        if is_last_item:
-                            new_parent_prefix = parent_prefix + "    "
-                        else:
-                            new_parent_prefix = parent_prefix + "│   "
-
-                    sub_items = _list_directory_recursive(
-                        item_path, current_depth + 1, is_last_item, new_parent_prefix
-                    )
-                    items.extend(sub_items)
-
-                    # Add empty line after directory contents if not the last item
-                    if not is_last_item and sub_items:
-                        items.append(parent_prefix + "│")
-                else:
-                    items.append(f"{prefix}{item_name}")
-
-        except PermissionError:
-            if current_depth == 0:
-                items.append("❌ Permission denied")
-            else:
-                items.append(f"{parent_prefix}❌ Permission denied")
-        except Exception as e:
-            if current_depth == 0:
-                items.append(f"❌ Error: {str(e)}")
-            else:
-                items.append(f"{parent_prefix}❌ Error: {str(e)}")
-
-        return items
 
-    try:
-        result = [f"{os.path.abspath(path)}/", "│"]
+@tool
+def search_workspace(
+    query: str,
+    path: str = ".",
+    regex: bool = False,
+    case_sensitive: bool = True,
+    include: str = None,
+    context_lines: int = 0,
+    max_results: int = DEFAULT_MAX_RESULTS,
+) -> str:
+    """
+    **PRIMARY PURPOSE**: Finds text or code in the files under a directory, like grep, using a fast index.
+
+    **WHEN TO USE**:
+    - Finding where a function, class or variable is defined or used
+    - Locating configuration keys, error messages or TODOs
+    - Checking which files import a module before refactoring
+    - INSTEAD of reading many files or running grep through a shell command
+
+    **BEHAVIOR**:
+    - Searches text files recursively; binary files, files over 1 MiB,
+      dependency/cache folders (node_modules/, .venv/, ...) and .gitignore'd
+      files are skipped
+    - One result line per matching line: "path:line: text" (paths relative
+      to the searched directory); context lines use "path-line- text"
+    - Stops after max_results matching lines and says so
+    - The index follows file changes automatically
+
+    **PARAMETERS**:
+        query (str): Text to find, or a Python regular expression if regex=True
+        path (str): Directory to search. Defaults to current directory (".")
+        regex (bool): Treat query as a regular expression (default False)
+        case_sensitive (bool): Match case exactly (default True)
+        include (str, optional): Comma-separated glob filter on file paths,
+                                 e.g. "*.py" or "src/**/*.ts,*.tsx"
+        context_lines (int): Lines of context around each match (0-10)
+        max_results (int): Maximum number of matching lines (default 50)
 
-        items = _list_directory_recursive(path)
-        result.extend(items)
+    **RETURNS**:
+        str: Matching lines grouped by file, "No matches", or an error message
 
-        return "\n".join(result)
+    **EXAMPLES**:
+        search_workspace("def load_config")
+        search_workspace("TODO", include="*.py", context_lines=2)
+        search_workspace("class [A-Za-z]+Error", regex=True, path="src")
+    """
+    if not permission_manager.get_permission(
+        tool_name="search_workspace", query=query, path=path
+    ):
+        raise PermissionDeniedException()
+    if not query:
+        return "[ERROR] Empty search query"
+    try:
+        result = search(
+            path,
+            query,
+            regex=regex,
+            case_sensitive=case_sensitive,
+            include=include,
+            context_lines=context_lines,
+            max_results=max_results,
+        )
+    except re.error as e:
+        return f"[ERROR] Invalid regular expression: {str(e)}"
     except Exception as e:
-        return f"Error listing directory: {str(e)}"
+        return f"[ERROR] Search failed: {str(e)}"
+
+    if not result.matches:
+        return f"No matches for {query!r} in {os.path.abspath(path)}"
+    summary = f"{result.matches} matching lines in {result.files} files"
+    if result.truncated:
+        summary += f" (stopped at max_results={max_results}; narrow the query or use include)"
+    return f"{summary}\n\n{result.text}"
+
+
+@tool
+def read_tool_output(
+    output_id: str,
+    start_line: int = 1,
+    max_lines: int = PAGE_MAX_LINES,
+    pattern: str = None,
+) -> str:
+    """
+    **PRIMARY PURPOSE**: Pages through the full text of a tool output that was too long to keep in the conversation.
+
+    **WHEN TO USE**:
+    - A tool result says "saved as out-..." and the part you need was omitted
+      (e.g. the middle of a long build or install log, a long scraped page)
+    - To find specific lines (errors, warnings, a name) in a long output
+
+    **BEHAVIOR**:
+    - Long tool outputs are kept in full on disk; the conversation only holds
+      their first and last lines plus the output id
+    - Returns numbered lines starting at start_line, at most max_lines of them
+    - With a pattern, returns only the lines matching that regular expression
+    - Says where to continue when more lines follow
+
+    **PARAMETERS**:
+        output_id (str): The id from the tool result, like "out-3f2a9c0d1b7e4a56"
+        start_line (int, optional): First line to return, 1-based (default 1)
+        max_lines (int, optional): Maximum lines to return (default and maximum 200)
+        pattern (str, optional): Regular expression; only matching lines are returned
+
+    **RETURNS**:
+        str: A header with the line count, then the requested lines prefixed with
+             their line numbers, or an error message
+
+    **EXAMPLES**:
+        read_tool_output("out-3f2a9c0d1b7e4a56", start_line=400)
+        read_tool_output("out-3f2a9c0d1b7e4a56", pattern="(?i)error|failed")
+    """
+    try:
+        return tool_outputs.page(output_id.strip(), start_line, max_lines, pattern)
+    except KeyError:
+        return f"[ERROR] No saved tool output {output_id}; it may have been pruned"
+    except re.error as e:
+        return f"[ERROR] Invalid pattern: {str(e)}"
 
 
 FILE_TOOLS = [
     create_wd,
     create_file,
+    create_files,
     modify_file,
+    edit_files,
+    apply_patch,
     append_file,
     delete_file,
     delete_directory,
     read_file,
     list_directory,
+    search_workspace,
 ]
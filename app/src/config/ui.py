@@ -1,11 +1,17 @@
 import os
-from rich.console import Console
+from rich.console import Console, Group
 from rich.markdown import Markdown
+from rich.spinner import Spinner
+from rich.live import Live
 from rich.prompt import Prompt, Confirm
 from rich.panel import Panel
 from rich.text import Text
 from typing import Dict, Any, Optional, List
 from app.utils.constants import THEME
+from contextlib import contextmanager
+from collections import deque
+import contextvars
+import threading
 import time
 import sys
 
@@ -15,6 +21,268 @@ else:
     import tty
     import termios
 
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+LIVE_REFRESH_PER_SECOND = 12
+LIVE_TOOL_ARGS_CHARS = 300
+LIVE_COMMAND_LINES = 8
+
+# UI of the agent whose run is being shown; None while it runs quietly
+_rendering_ui: contextvars.ContextVar["AgentUI | None"] = contextvars.ContextVar(
+    "rendering_ui", default=None
+)
+
+
+def _partial_tag_length(text: str, tag: str) -> int:
+    """Length of the longest suffix of text that is a prefix of tag."""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+
+class ThinkFilter:
+    """Strips <think> blocks from text that arrives in pieces.
+
+    Tags split across chunks are held back until they can be recognized.
+    Reasoning models that omit the opening tag are handled with
+    ``assume_thinking``: everything up to the first ``</think>`` is treated
+    as thinking, unless no closing tag ever arrives, in which case the text
+    is released on flush.
+
+    Args:
+        assume_thinking: Whether the stream starts inside a thinking block
+    """
+
+    def __init__(self, assume_thinking: bool = False):
+        self.in_think = assume_thinking
+        self.thinking_chars = 0
+        self._assumed = assume_thinking
+        self._held_thought: list[str] = []
+        self._pending = ""
+        self._started = False
+
+    def feed(self, text: str) -> str:
+        """Consume a piece of text and return the part that should be shown."""
+        text = self._pending + text
+        self._pending = ""
+        visible = []
+
+        while text:
+            tag = THINK_CLOSE if self.in_think else THINK_OPEN
+            index = text.find(tag)
+            if index == -1:
+                keep = _partial_tag_length(text, tag)
+                self._consume(text[: len(text) - keep], visible)
+                self._pending = text[len(text) - keep :]
+                break
+            self._consume(text[:index], visible)
+            text = text[index + len(tag) :]
+            self.in_think = not self.in_think
+            self._assumed = False
+            self._held_thought.clear()
+
+        return self._visible("".join(visible))
+
+    def flush(self) -> str:
+        """Return whatever is still held back once the stream has ended."""
+        rest, self._pending = self._pending, ""
+        if self._assumed:
+            # no closing tag ever came: it was an answer, not a thought
+            rest = "".join(self._held_thought) + rest
+            self._held_thought.clear()
+            self._assumed = False
+        elif self.in_think:
+            return ""
+        return self._visible(rest)
+
+    def _consume(self, text: str, visible: list[str]):
+        if not self.in_think:
+            visible.append(text)
+            return
+        self.thinking_chars += len(text)
+        if self._assumed:
+            self._held_thought.append(text)
+
+    def _visible(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+
+class TokenStreamView:
+    """Live, incrementally rendered view of one streamed model turn.
+
+    Shows a spinner until the first token, then the answer as it is typed
+    (thinking blocks filtered out) followed by the tool calls being written.
+    The view is transient: once the turn ends it is replaced by the regular
+    panels.
+    """
+
+    def __init__(self, ui: "AgentUI", status: str, assume_thinking: bool = False):
+        self.ui = ui
+        self.status = status
+        self.assume_thinking = assume_thinking
+        self._live: Live | None = None
+        self._reset()
+
+    def _reset(self):
+        self.filter = ThinkFilter(self.assume_thinking)
+        self.text = ""
+        self.received = False
+        self.tool_calls: dict[int, dict] = {}
+
+    def start(self):
+        """Begin a new turn and show the spinner."""
+        self.stop()
+        self._reset()
+        self._live = Live(
+            self,
+            console=self.ui.console,
+            refresh_per_second=LIVE_REFRESH_PER_SECOND,
+            transient=True,
+        )
+        self._live.start()
+
+    def feed(self, message):
+        """Add a streamed message chunk (or a complete message) to the view."""
+        if self._live is None:
+            self.start()
+        self.received = True
+
+        content = message.content
+        if isinstance(content, list):
+            content = "".join(
+                block.get("text", "") if isinstance(block, dict) else str(block)
+                for block in content
+            )
+        if content:
+            self.text += self.filter.feed(content)
+
+        for chunk in getattr(message, "tool_call_chunks", None) or []:
+            index = chunk.get("index")
+            if index is None:
+                index = len(self.tool_calls)
+            call = self.tool_calls.setdefault(index, {"name": "", "args": ""})
+            call["name"] += chunk.get("name") or ""
+            call["args"] += chunk.get("args") or ""
+
+    def finish(self) -> str | None:
+        """End the turn and return the visible answer, or None if nothing streamed."""
+        self.stop()
+        if not self.received:
+            return None
+        self.text += self.filter.flush()
+        return self.text.strip()
+
+    def stop(self):
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+
+    def __rich__(self):
+        parts = []
+        if self.text.strip():
+            parts.append(
+                Panel(
+                    Markdown(self.text),
+                    title="[bold]Assistant[/bold]",
+                    border_style=self.ui._style("primary"),
+                    padding=(1, 2),
+                )
+            )
+        for call in self.tool_calls.values():
+            args = call["args"]
+            if len(args) > LIVE_TOOL_ARGS_CHARS:
+                args = "..." + args[-LIVE_TOOL_ARGS_CHARS:]
+            parts.append(
+                Text(f"🔧 {call['name'] or '...'} {args}", style=self.ui._style("accent"))
+            )
+
+        if self.filter.in_think:
+            parts.append(
+                Spinner("dots", text=f"Thinking... ({self.filter.thinking_chars} chars)")
+            )
+        elif not parts:
+            parts.append(Spinner("dots", text=self.status))
+        return Group(*parts)
+
+
+class CommandProgressView:
+    """Live view of a running shell command: elapsed time, output size and last lines.
+
+    Transient like TokenStreamView, the tool output panel replaces it once
+    the command ends. ``feed`` is called from the threads reading the
+    command's output. Without a UI nothing is drawn.
+    """
+
+    def __init__(self, ui: "AgentUI | None", command: str):
+        self.ui = ui
+        self.command = " ".join(command.split())
+        self.started = time.monotonic()
+        self.received = 0
+        self.lines: deque[str] = deque(maxlen=LIVE_COMMAND_LINES)
+        self.partial = ""
+        self._lock = threading.Lock()
+        self._live: Live | None = None
+
+    def __enter__(self) -> "CommandProgressView":
+        if self.ui is not None and self.ui.console.is_terminal:
+            self._live = Live(
+                self,
+                console=self.ui.console,
+                refresh_per_second=LIVE_REFRESH_PER_SECOND,
+                transient=True,
+            )
+            self._live.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+
+    def feed(self, stream: str, text: str):
+        with self._lock:
+            self.received += len(text)
+            # progress bars redraw their line with carriage returns
+            text = self.partial + text.replace("\r\n", "\n").replace("\r", "\n")
+            *complete, self.partial = text.split("\n")
+            self.lines.extend(line for line in complete if line.strip())
+
+    def __rich__(self):
+        with self._lock:
+            lines = list(self.lines) + ([self.partial] if self.partial.strip() else [])
+            received = self.received
+        elapsed = time.monotonic() - self.started
+        width = max(self.ui.console.width - 4, 20)
+        command = self.command if len(self.command) <= 60 else self.command[:57] + "..."
+        if received < 1024 * 1024:
+            size = f"{received / 1024:.1f} KB"
+        else:
+            size = f"{received / 1024 / 1024:.1f} MB"
+        parts = [Spinner("dots", text=f"Running {command} · {elapsed:.0f}s · {size} of output")]
+        if lines:
+            tail = "\n".join(line[:width] for line in lines[-LIVE_COMMAND_LINES:])
+            parts.append(Text(tail, style=self.ui._style("muted")))
+        return Group(*parts)
+
+
+@contextmanager
+def rendering(ui: "AgentUI | None"):
+    """Show the progress of tools called in this context on ``ui``, or nowhere if None."""
+    token = _rendering_ui.set(ui)
+    try:
+        yield
+    finally:
+        _rendering_ui.reset(token)
+
+
+def command_progress(command: str) -> CommandProgressView:
+    """Progress view of a command, on the UI of the agent whose run is shown."""
+    return CommandProgressView(_rendering_ui.get(), command)
+
 
 class AgentUI:
 
@@ -46,6 +314,9 @@ class AgentUI:
         help_content.append("  /quit, /exit, /q  → Exit")
         help_content.append("  /clear            → Clear history*")
         help_content.append("  /cls              → Clear screen")
+        help_content.append("  /stats            → Cache and request statistics")
+        help_content.append("  /snapshots        → List workspace snapshots")
+        help_content.append("  /rollback <id>    → Undo tool changes back to a snapshot")
 
         if model_name:
             help_content.append("")
@@ -309,6 +580,14 @@ class AgentUI:
             style="error",
         )
 
+    def token_stream(
+        self, status: str = "Working on the task...", assume_thinking: bool = False
+    ) -> TokenStreamView:
+        return TokenStreamView(self, status, assume_thinking=assume_thinking)
+
+    def command_progress(self, command: str) -> CommandProgressView:
+        return CommandProgressView(self, command)
+
     def tmp_msg(self, message: str, duration: int = 2):
         with self.console.status(message):
             time.sleep(duration)
@@ -0,0 +1,354 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from app.src.config.sandbox import sandbox
+import subprocess
+import threading
+import atexit
+import signal
+import queue
+import json
+import time
+import os
+
+
+PYTHON = "python"
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker_process.py")
+DEFAULT_TIMEOUT = 300  # seconds
+MAX_OUTPUT_BYTES = 256 * 1024  # per stream and run
+MAX_WORKER_RSS_MB = 1024  # workers whose peak memory passes this are recycled
+MAX_WORKER_AGE = 30 * 60  # seconds
+MAX_WORKER_RUNS = 200
+SESSION_IDLE_TIMEOUT = 15 * 60  # idle sessions are closed after this long
+MAX_SPARE_WORKSPACES = 4  # workspaces that keep a warm spare worker
+MAX_WARM_MODULES = 64
+READY_TIMEOUT = 60  # seconds a new worker may take to preload its modules
+INTERRUPT_GRACE = 2  # seconds a timed out snippet gets to unwind after SIGINT
+
+
+class WorkerError(RuntimeError):
+    """A worker died or broke the protocol."""
+
+
+@dataclass
+class RunResult:
+    """Output of one snippet.
+
+    ``returncode`` is None when the run timed out. ``note`` reports what
+    happened to a session around the run (started, reset, recycled).
+    """
+
+    stdout: str
+    stderr: str
+    returncode: int | None
+    duration: float
+    timed_out: bool = False
+    note: str | None = None
+    imported: list[str] = field(default_factory=list)
+    cpu_seconds: float | None = None
+    peak_rss_kb: int | None = None
+
+
+class PythonWorker:
+    """One warm interpreter running worker_process.py.
+
+    Preloading starts as soon as the process does; the first run waits for
+    it to finish. Timed out snippets are interrupted with SIGINT, which
+    keeps the worker (and a session's variables) alive when the snippet
+    unwinds in time, and killed along with their process group otherwise.
+    """
+
+    def __init__(self, cwd: str, modules: list[str] = ()):
+        self.cwd = cwd
+        self.started = self.last_used = time.monotonic()
+        self.runs = 0
+        self.rss_kb = 0
+        self.lock = threading.Lock()
+        self.process = subprocess.Popen(
+            [PYTHON, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=cwd,
+            # its own process group, so a timeout also stops what the snippet started
+            start_new_session=os.name == "posix",
+            **sandbox.popen_kwargs(),
+        )
+        # CPU time is limited per run by the worker itself
+        sandbox.confine(self.process, limit_cpu=False)
+        self._replies: queue.Queue = queue.Queue()
+        self._pending = 0
+        threading.Thread(target=self._read, daemon=True).start()
+        self.warm(modules)
+
+    def _read(self):
+        for line in self.process.stdout:
+            self._replies.put(line)
+        self._replies.put(None)
+
+    def _send(self, request: dict):
+        try:
+            self.process.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+            self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise WorkerError(f"worker is not running: {e}") from None
+
+    def _reply(self, timeout: float) -> dict:
+        """Next reply of the worker.
+
+        Raises:
+            queue.Empty: If none arrives in time
+            WorkerError: If the worker exited or sent garbage
+        """
+        line = self._replies.get(timeout=timeout)
+        if line is None:
+            self._replies.put(None)
+            raise WorkerError(f"worker exited with code {self.process.wait()}")
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise WorkerError("worker sent an invalid reply") from None
+
+    def warm(self, modules: list[str]):
+        """Import modules in the background, ahead of the next run."""
+        self._send({"warm": list(modules)})
+        self._pending += 1
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, code: str, timeout: float) -> RunResult:
+        """Run a snippet; the caller must hold ``lock``.
+
+        Raises:
+            WorkerError: If the worker died
+        """
+        start = time.monotonic()
+        try:
+            while self._pending:
+                self._reply(READY_TIMEOUT)
+                self._pending -= 1
+        except queue.Empty:
+            self.kill()
+            raise WorkerError("worker did not start in time") from None
+
+        self._send(
+            {
+                "code": code,
+                "cwd": self.cwd,
+                "max_output": MAX_OUTPUT_BYTES,
+                "cpu_seconds": sandbox.limits.cpu_seconds,
+            }
+        )
+        self.runs += 1
+        timed_out = False
+        try:
+            reply = self._reply(timeout)
+        except queue.Empty:
+            timed_out = True
+            reply = self._interrupt()
+        self.last_used = time.monotonic()
+        if reply is None:
+            self.kill()
+            return RunResult("", "", None, self.last_used - start, timed_out=True)
+
+        self.rss_kb = max(self.rss_kb, reply.get("rss_kb", 0))
+        return RunResult(
+            reply["stdout"],
+            reply["stderr"],
+            None if timed_out else reply["returncode"],
+            self.last_used - start,
+            timed_out=timed_out,
+            imported=reply.get("imported", []),
+            cpu_seconds=reply.get("cpu_seconds"),
+            peak_rss_kb=reply.get("rss_kb"),
+        )
+
+    def _interrupt(self) -> dict | None:
+        """Interrupt a snippet that ran out of time, and collect its partial output."""
+        if os.name != "posix":
+            return None
+        try:
+            os.kill(self.process.pid, signal.SIGINT)
+            return self._reply(INTERRUPT_GRACE)
+        except (OSError, queue.Empty, WorkerError):
+            return None
+
+    def worn_out(self) -> str | None:
+        """Why the worker should be replaced, if it should."""
+        if self.rss_kb > MAX_WORKER_RSS_MB * 1024:
+            return f"peak memory {self.rss_kb // 1024} MiB"
+        if time.monotonic() - self.started > MAX_WORKER_AGE:
+            return f"running for more than {MAX_WORKER_AGE // 60} minutes"
+        if self.runs >= MAX_WORKER_RUNS:
+            return f"{self.runs} runs"
+        return None
+
+    def close(self):
+        """Let the worker exit; processes the snippets started are left alone."""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+    def kill(self):
+        try:
+            if os.name == "posix":
+                os.killpg(self.process.pid, signal.SIGKILL)
+            else:
+                self.process.kill()
+        except OSError:
+            pass
+        self.process.wait()
+
+
+class WorkerPool:
+    """Warm Python interpreters for execute_code, per workspace.
+
+    Clean runs take a spare worker that was started, and has preloaded the
+    installed packages earlier snippets of the workspace imported, before
+    the request arrived; the worker is discarded afterwards, so no state
+    leaks between runs, and a new spare starts warming up right away.
+    Session runs keep one worker per workspace and conversation, so
+    variables, functions and imports persist between calls, notebook
+    style, until the session is reset, idles out or the worker is recycled
+    for its memory use, age or number of runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spares: OrderedDict[str, PythonWorker] = OrderedDict()
+        self._sessions: dict[tuple[str, str], PythonWorker] = {}
+        self._modules: dict[str, OrderedDict[str, None]] = {}
+        self.warm_starts = 0
+        self.cold_starts = 0
+        self.timeouts = 0
+        self.recycled = 0
+        atexit.register(self.shutdown)
+
+    def _modules_of(self, cwd: str) -> list[str]:
+        return list(self._modules.get(cwd, ()))
+
+    def _take_spare_locked(self, cwd: str) -> PythonWorker:
+        worker = self._spares.pop(cwd, None)
+        if worker is not None and (not worker.alive or worker.worn_out()):
+            worker.close()
+            worker = None
+        if worker is None:
+            self.cold_starts += 1
+            worker = PythonWorker(cwd, self._modules_of(cwd))
+        else:
+            self.warm_starts += 1
+        # the next run finds a warm worker too
+        self._spares[cwd] = PythonWorker(cwd, self._modules_of(cwd))
+        while len(self._spares) > MAX_SPARE_WORKSPACES:
+            _, evicted = self._spares.popitem(last=False)
+            evicted.close()
+        return worker
+
+    def _learn(self, cwd: str, modules: list[str]):
+        """Remember the packages a workspace's snippets import and preload them."""
+        with self._lock:
+            known = self._modules.setdefault(cwd, OrderedDict())
+            new = [name for name in modules if name not in known]
+            for name in new:
+                known[name] = None
+            while len(known) > MAX_WARM_MODULES:
+                known.popitem(last=False)
+            spare = self._spares.get(cwd)
+        if new and spare is not None:
+            with spare.lock:
+                try:
+                    spare.warm(new)
+                except WorkerError:
+                    pass
+
+    def _close_idle_sessions_locked(self):
+        now = time.monotonic()
+        for key, worker in list(self._sessions.items()):
+            if now - worker.last_used > SESSION_IDLE_TIMEOUT or not worker.alive:
+                del self._sessions[key]
+                worker.close()
+
+    def run(
+        self,
+        code: str,
+        cwd: str,
+        timeout: float = DEFAULT_TIMEOUT,
+        session: str | None = None,
+        reset: bool = False,
+    ) -> RunResult:
+        """Run a snippet in a clean worker, or in the named session.
+
+        Raises:
+            OSError: If no worker could be started
+            WorkerError: If the worker died during the run
+        """
+        cwd = os.path.realpath(cwd)
+        if session is None:
+            with self._lock:
+                worker = self._take_spare_locked(cwd)
+            try:
+                with worker.lock:
+                    result = worker.run(code, timeout)
+            finally:
+                worker.close()
+            with self._lock:
+                self.timeouts += result.timed_out
+            self._learn(cwd, result.imported)
+            return result
+
+        key, note = (cwd, session), None
+        with self._lock:
+            self._close_idle_sessions_locked()
+            worker = self._sessions.get(key)
+            if worker is not None and reset:
+                del self._sessions[key]
+                worker.close()
+                worker, note = None, "session reset, previous variables were discarded"
+            if worker is None:
+                worker = self._sessions[key] = self._take_spare_locked(cwd)
+                note = note or "new session started"
+
+        with worker.lock:
+            try:
+                result = worker.run(code, timeout)
+            except WorkerError:
+                with self._lock:
+                    if self._sessions.get(key) is worker:
+                        del self._sessions[key]
+                raise
+
+        reason = None if worker.alive else "the worker was stopped"
+        if worker.alive and (reason := worker.worn_out()):
+            worker.close()
+        with self._lock:
+            self.timeouts += result.timed_out
+            self.recycled += reason is not None
+            if reason is not None and self._sessions.get(key) is worker:
+                del self._sessions[key]
+        if reason is not None:
+            recycled = f"session ended after this run ({reason}); the next run starts a new one"
+            note = f"{note}; {recycled}" if note else recycled
+        result.note = note
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            workers = list(self._spares.values()) + list(self._sessions.values())
+            self._spares.clear()
+            self._sessions.clear()
+        for worker in workers:
+            worker.close()
+
+    def report(self) -> str:
+        with self._lock:
+            sessions, spares = len(self._sessions), len(self._spares)
+        return (
+            f"{self.warm_starts} warm and {self.cold_starts} cold starts, {sessions} "
+            f"sessions, {spares} spare workers, {self.timeouts} timeouts, "
+            f"{self.recycled} recycled"
+        )
+
+
+worker_pool = WorkerPool()
@@ -0,0 +1,202 @@
+"""Entry point of the warm interpreters managed by worker_pool.
+
+Started as a script, never imported by the application, so it only uses
+the standard library. Requests and replies are JSON lines exchanged over
+the stdin and stdout the worker was started with. While a snippet runs,
+file descriptors 1 and 2 point at temporary files, so that the output of
+subprocesses and C extensions is captured along with print().
+"""
+
+import traceback
+import linecache
+import tempfile
+import builtins
+import signal
+import json
+import sys
+import os
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+SNIPPET = "<snippet>"
+
+
+class CpuLimitExceeded(BaseException):
+    """Raised in a snippet that used up the CPU time of its run."""
+
+
+def _on_sigxcpu(signum, frame):
+    raise CpuLimitExceeded("CPU time limit of the run exceeded")
+
+
+def _peak_rss_kb() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _cpu_seconds() -> float:
+    if resource is None:
+        return 0.0
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def _limit_cpu(seconds: int | None):
+    """Allow the run ``seconds`` more CPU time; returns the limit to restore.
+
+    The worker outlives many runs, so its CPU limit moves along with the
+    time it already used. Only the soft limit moves: SIGXCPU turns into an
+    exception in the snippet, and the worker survives it.
+    """
+    if resource is None or not seconds:
+        return None
+    saved = resource.getrlimit(resource.RLIMIT_CPU)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + seconds
+    if saved[1] != resource.RLIM_INFINITY:
+        soft = min(soft, saved[1])
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, saved[1]))
+    return saved
+
+
+def _read_capped(f, limit: int) -> str:
+    size = f.seek(0, os.SEEK_END)
+    f.seek(0)
+    text = f.read(limit).decode("utf-8", errors="replace")
+    if size > limit:
+        text += f"\n[... {size - limit} more bytes of output truncated ...]"
+    return text
+
+
+def _shared_modules(before: set, cwd: str) -> list[str]:
+    """Top-level modules imported by the snippet that are not workspace code.
+
+    Workspace modules change while the agent works on them, so only
+    installed packages and the standard library are worth preloading.
+    """
+    names = []
+    for name in set(sys.modules) - before:
+        if "." in name or name.startswith("_"):
+            continue
+        path = getattr(sys.modules.get(name), "__file__", None) or ""
+        path = os.path.abspath(path) if path else ""
+        if path.startswith(cwd + os.sep) and "site-packages" not in path:
+            continue
+        names.append(name)
+    return sorted(names)
+
+
+def _exit_code(e: SystemExit) -> int:
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+def warm(modules: list[str]):
+    for name in modules:
+        try:
+            __import__(name)
+        except BaseException:
+            pass
+
+
+def run(request: dict, namespace: dict) -> dict:
+    code, cwd, limit = request["code"], request["cwd"], request["max_output"]
+    os.chdir(cwd)
+    # like running a script from the workspace: its packages are importable
+    sys.path[0] = cwd
+    sys.argv = [SNIPPET]
+    linecache.cache[SNIPPET] = (len(code), None, code.splitlines(True), SNIPPET)
+
+    before = set(sys.modules)
+    cpu_before = _cpu_seconds()
+    returncode = 0
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        saved = os.dup(1), os.dup(2)
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        cpu_limit = _limit_cpu(request.get("cpu_seconds"))
+        try:
+            exec(compile(code, SNIPPET, "exec"), namespace)
+        except SystemExit as e:
+            returncode = _exit_code(e)
+        except BaseException as e:
+            # hide the frames of this script (run, signal handlers) from the traceback
+            report = traceback.TracebackException.from_exception(e)
+            report.stack = traceback.StackSummary.from_list(
+                [frame for frame in report.stack if frame.filename != __file__]
+            )
+            print("".join(report.format()), end="", file=sys.stderr)
+            returncode = 1
+        finally:
+            if cpu_limit is not None:
+                resource.setrlimit(resource.RLIMIT_CPU, cpu_limit)
+            for stream in (sys.stdout, sys.stderr, sys.__stdout__, sys.__stderr__):
+                try:
+                    stream.flush()
+                except BaseException:
+                    pass
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+        stdout, stderr = _read_capped(out, limit), _read_capped(err, limit)
+
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "returncode": returncode,
+        "rss_kb": _peak_rss_kb(),
+        "cpu_seconds": _cpu_seconds() - cpu_before,
+        "imported": _shared_modules(before, cwd),
+    }
+
+
+def main():
+    # keep the protocol channels away from the descriptors snippets write to
+    requests = os.fdopen(os.dup(0), "rb")
+    replies = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1):
+        os.dup2(devnull, fd)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    if hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    # not this script's directory, which holds application modules
+    sys.path[0] = os.getcwd()
+    namespace = {"__name__": "__main__", "__builtins__": builtins}
+
+    while True:
+        try:
+            line = requests.readline()
+            if not line:
+                return
+            request = json.loads(line)
+            if "warm" in request:
+                warm(request["warm"])
+                reply = {"ready": True}
+            else:
+                reply = run(request, namespace)
+            replies.write(json.dumps(reply).encode("utf-8") + b"\n")
+            replies.flush()
+        except (KeyboardInterrupt, CpuLimitExceeded):
+            # a timeout interrupt or CPU limit signal that arrived after the
+            # snippet had finished
+            continue
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+from collections import OrderedDict
+from typing import Callable
+from dataclasses import dataclass
+import threading
+import os
+
+
+DEFAULT_CACHE_BUDGET = 64 * 1024 * 1024  # bytes of file content kept in memory
+MAX_CACHED_FILE = 4 * 1024 * 1024  # bigger files are always read from disk
+MAX_CACHED_DIRS = 4096
+
+
+@dataclass(frozen=True)
+class DirItem:
+    """A directory entry as returned by os.scandir, minus the live handle."""
+
+    name: str
+    path: str
+    is_dir: bool
+    is_symlink: bool
+
+
+def _file_key(st: os.stat_result) -> tuple[int, int, int]:
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _dir_key(st: os.stat_result) -> tuple[int, int]:
+    # a directory's mtime changes whenever an entry is added, removed or renamed
+    return st.st_mtime_ns, st.st_ino
+
+
+def universal_newlines(text: str) -> str:
+    """Translate line endings the way opening a file in text mode does."""
+    return text.replace("\r\n", "\n").replace("\r", "\n") if "\r" in text else text
+
+
+class WorkspaceCache:
+    """Process-wide cache of file contents and directory listings.
+
+    Entries are keyed by real path and validated against (mtime, size,
+    inode) on every access, so a file changed behind our back is simply
+    read again. The file tools update it write-through. Least recently used
+    files are evicted once the cached content exceeds ``max_bytes``.
+
+    Args:
+        max_bytes: Budget for cached file content
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BUDGET):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._files: OrderedDict[str, tuple[tuple, bytes]] = OrderedDict()
+        self._dirs: OrderedDict[str, tuple[tuple, list[DirItem]]] = OrderedDict()
+        self._size = 0
+        # versions of the files each conversation has been shown
+        self._seen: dict[tuple, tuple] = {}
+        self._listeners: list[Callable[[str], None]] = []
+
+    def add_listener(self, listener: Callable[[str], None]):
+        """Call ``listener(real_path)`` whenever a tool writes or deletes a path."""
+        self._listeners.append(listener)
+
+    def _notify(self, path: str):
+        for listener in self._listeners:
+            listener(path)
+
+    def _count(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def _put_locked(self, path: str, key: tuple, data: bytes):
+        previous = self._files.pop(path, None)
+        if previous is not None:
+            self._size -= len(previous[1])
+        if len(data) > MAX_CACHED_FILE:
+            return
+        self._files[path] = (key, data)
+        self._size += len(data)
+        while self._size > self.max_bytes and self._files:
+            _, (_, evicted) = self._files.popitem(last=False)
+            self._size -= len(evicted)
+
+    def read_bytes(self, file_path: str) -> bytes:
+        """Content of a file, from memory when it has not changed on disk.
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        path = os.path.realpath(file_path)
+        key = _file_key(os.stat(path))
+        with self._lock:
+            cached = self._files.get(path)
+            hit = cached is not None and cached[0] == key
+            self._count(hit)
+            if hit:
+                self._files.move_to_end(path)
+                return cached[1]
+
+        with open(path, "rb") as f:
+            data = f.read()
+            # key the content by the state of the file it was read from
+            key = _file_key(os.fstat(f.fileno()))
+        with self._lock:
+            self._put_locked(path, key, data)
+        return data
+
+    def read_text(self, file_path: str, encoding: str = "utf-8") -> str:
+        """Decoded content with universal newlines, like ``open(path).read()``.
+
+        Raises:
+            OSError: If the file cannot be read
+            UnicodeDecodeError: If the content is not valid in the encoding
+        """
+        return universal_newlines(self.read_bytes(file_path).decode(encoding))
+
+    def version(self, file_path: str) -> tuple | None:
+        """The (mtime, size, inode) of a file, or None if it does not exist."""
+        try:
+            return _file_key(os.stat(file_path))
+        except OSError:
+            return None
+
+    def store(self, file_path: str, data: bytes):
+        """Record content just written to a file by one of our tools."""
+        path = os.path.realpath(file_path)
+        try:
+            key = _file_key(os.stat(path))
+        except OSError:
+            self.invalidate(path)
+            return
+        with self._lock:
+            self._put_locked(path, key, data)
+        self._notify(path)
+
+    def appended(self, file_path: str, before: tuple | None, data: bytes):
+        """Record an append, extending the cached content if it was current."""
+        path = os.path.realpath(file_path)
+        with self._lock:
+            cached = self._files.get(path)
+            current = cached is not None and cached[0] == before
+        if current:
+            self.store(path, cached[1] + data)
+        else:
+            self.invalidate(path)
+
+    def invalidate(self, path: str):
+        """Forget a file, or a directory and everything below it."""
+        path = os.path.realpath(path)
+        prefix = path + os.sep
+        with self._lock:
+            for cached in [p for p in self._files if p == path or p.startswith(prefix)]:
+                self._size -= len(self._files.pop(cached)[1])
+            for cached in [p for p in self._dirs if p == path or p.startswith(prefix)]:
+                del self._dirs[cached]
+        self._notify(path)
+
+    def scan_dir(self, directory: str) -> list[DirItem]:
+        """Entries of a directory, re-read only when the directory changed.
+
+        Raises:
+            OSError: If the directory cannot be read
+        """
+        path = os.path.realpath(directory)
+        key = _dir_key(os.stat(path))
+        with self._lock:
+            cached = self._dirs.get(path)
+            hit = cached is not None and cached[0] == key
+            self._count(hit)
+            if hit:
+                self._dirs.move_to_end(path)
+                # keep the paths under the name the caller used
+                return [
+                    DirItem(i.name, os.path.join(directory, i.name), i.is_dir, i.is_symlink)
+                    for i in cached[1]
+                ]
+
+        items = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                items.append(DirItem(entry.name, entry.path, is_dir, entry.is_symlink()))
+        with self._lock:
+            self._dirs[path] = (key, items)
+            self._dirs.move_to_end(path)
+            while len(self._dirs) > MAX_CACHED_DIRS:
+                self._dirs.popitem(last=False)
+        return items
+
+    def unchanged_since_seen(self, scope: str, file_path: str, view: tuple) -> bool:
+        """Whether a conversation was already shown this view of the file as it is now."""
+        key = (scope, os.path.realpath(file_path), view)
+        version = self.version(file_path)
+        with self._lock:
+            return version is not None and self._seen.get(key) == version
+
+    def mark_seen(self, scope: str, file_path: str, view: tuple):
+        """Remember the version of a file a conversation was just shown."""
+        key = (scope, os.path.realpath(file_path), view)
+        version = self.version(file_path)
+        with self._lock:
+            if version is None:
+                self._seen.pop(key, None)
+            else:
+                self._seen[key] = version
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+            self._dirs.clear()
+            self._seen.clear()
+            self._size = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "files": len(self._files),
+                "directories": len(self._dirs),
+                "bytes": self._size,
+            }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (
+            f"{stats['hits']} hits, {stats['misses']} misses, {stats['files']} files "
+            f"({stats['bytes'] / 1024 / 1024:.1f} MiB) and {stats['directories']} "
+            "directory listings cached"
+        )
+
+
+workspace_cache = WorkspaceCache()
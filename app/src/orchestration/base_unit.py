@@ -4,6 +4,11 @@ from app.src.config.ui import AgentUI
 from rich.console import Console
 from app.utils.constants import CONSOLE_WIDTH
 from app.src.config.base import BaseAgent
+from app.src.config.snapshots import start_journal
+import hashlib
+import asyncio
+import sqlite3
+import os
 
 
 class BaseUnit(ABC):
@@ -16,6 +21,7 @@ class BaseUnit(ABC):
             agents: Dictionary of agent instances
         """
         self.agents = agents
+        self.working_dir = None
         self.console = Console(width=CONSOLE_WIDTH)
         self.ui = AgentUI(self.console)
         self._validate_agents()
@@ -33,6 +39,13 @@ class BaseUnit(ABC):
             bool: True if execution completed successfully, False otherwise
         """
         pass
+
+    async def arun(self, **kwargs) -> bool:
+        """Async variant of run.
+
+        Units without a native async workflow run it in a worker thread.
+        """
+        return await asyncio.to_thread(self.run, **kwargs)
     
     def _setup_working_directory(self, default_dir: str = None) -> str:
         """Setup and validate working directory with user interaction.
@@ -43,8 +56,6 @@ class BaseUnit(ABC):
         Returns:
             str: Validated working directory path
         """
-        import os
-        
         working_dir = default_dir or os.getcwd()
         
         while True:
@@ -60,9 +71,20 @@ class BaseUnit(ABC):
                 self.ui.error("Failed to create project directory")
                 working_dir = None
     
+    def _start_snapshots(self, working_dir: str):
+        """Journal the workspace so tool changes can be rolled back with /rollback."""
+        try:
+            start_journal(working_dir)
+        except (OSError, sqlite3.Error) as e:
+            self.ui.warning(f"Workspace snapshots are disabled: {e}")
+
     def _create_agent_config(self, thread_id: str, recursion_limit: int = 100) -> Dict[str, Any]:
         """Create standardized configuration for agent operations.
         
+        Thread ids are namespaced by the working directory, so a persistent
+        checkpointer can resume the same project's threads after a restart
+        without mixing up different projects.
+        
         Args:
             thread_id: Unique identifier for the conversation thread
             recursion_limit: Maximum recursion depth
@@ -70,6 +92,9 @@ class BaseUnit(ABC):
         Returns:
             Configuration dictionary
         """
+        if self.working_dir:
+            project = os.path.realpath(os.path.abspath(self.working_dir))
+            thread_id = f"{thread_id}:{hashlib.sha256(project.encode('utf-8')).hexdigest()[:16]}"
         return {
             "configurable": {"thread_id": thread_id},
             "recursion_limit": recursion_limit,
@@ -1,5 +1,6 @@
 from app.src.agents.web_searcher.web_searcher import WebSearcherAgent
 from app.src.config.base import BaseAgent
+from app.src.config.rate_limiter import priority, BACKGROUND
 from langchain_core.tools import tool
 
 
@@ -7,37 +8,47 @@ def integrate_web_search(agent: BaseAgent, web_searcher: WebSearcherAgent) -> No
     """Enhance an agent with web search capabilities.
     
     Adds a search tool to the agent that delegates web research queries
-    to the web searcher agent.
+    to the web searcher agent. The agent graph is not rebuilt here; it is
+    fetched from the agent registry with the extra tool on next use.
     
     Args:
         agent: Agent to enhance with search capabilities
         web_searcher: Web searcher agent to handle search queries
     """
 
-    @tool
-    def call_searcher(query: str) -> str:
-        """
-        Ask the assistant to get reliable info from the web.
-        The assistant can choose the best queries for your issue to search for.
-        You just need to provide a description of the problem you are facing.
-        You can also provide a direct query for the assistant to use if you know it.
-        Feel free to prompt it as you wish, but keep it concise.
-        Args:
-            query (str): The query or description of the problem to search for.
-        """
-        return web_searcher.invoke(
-            message=query,
-            recursion_limit=100,
-            quiet=True,
-        )
-
-    enhanced_graph, enhanced_agent = agent.get_agent(
-        model_name=agent.model_name,
-        api_key=agent.api_key,
-        extra_tools=[call_searcher],
-        temperature=agent.temperature,
-        include_graph=True,
-    )
-
-    agent.agent = enhanced_agent
-    agent.graph = enhanced_graph
\ No newline at end of file
+    call_searcher = getattr(web_searcher, "search_tool", None)
+    if call_searcher is None:
+
+        @tool
+        def call_searcher(query: str) -> str:
+            """
+            Ask the assistant to get reliable info from the web.
+            The assistant can choose the best queries for your issue to search for.
+            You just need to provide a description of the problem you are facing.
+            You can also provide a direct query for the assistant to use if you know it.
+            Feel free to prompt it as you wish, but keep it concise.
+            Args:
+                query (str): The query or description of the problem to search for.
+            """
+            # searches queue behind the interactive agents' own model calls
+            with priority(BACKGROUND):
+                return web_searcher.invoke(
+                    message=query,
+                    recursion_limit=100,
+                    quiet=True,
+                )
+
+        async def acall_searcher(query: str) -> str:
+            with priority(BACKGROUND):
+                return await web_searcher.ainvoke(
+                    message=query,
+                    recursion_limit=100,
+                    quiet=True,
+                )
+
+        call_searcher.coroutine = acall_searcher
+
+        # one tool instance per searcher keeps the registry key stable
+        web_searcher.search_tool = call_searcher
+
+    agent.add_tools([call_searcher])
@@ -1,9 +1,21 @@
 from app.src.orchestration.base_unit import BaseUnit
 from app.src.config.exception_handler import AgentExceptionHandler
 from app.src.orchestration.integrate_web_search import integrate_web_search
+from app.src.config.process_manager import process_manager
 from app.utils.constants import UI_MESSAGES
 from app.utils.ascii_art import ASCII_ART
 from pathlib import Path
+import asyncio
+
+
+def _run_sync(coroutine):
+    """Run a coroutine that never suspends to completion, without an event loop."""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    coroutine.close()
+    raise RuntimeError("The synchronous workflow awaited an asynchronous step")
 
 
 class CodeGenUnit(BaseUnit):
@@ -33,6 +45,38 @@ class CodeGenUnit(BaseUnit):
         working_dir: str = None,
     ) -> bool:
         """Execute the complete project generation workflow."""
+        return _run_sync(
+            self._run(False, recursion_limit, config, stream, show_welcome, working_dir)
+        )
+
+    async def arun(
+        self,
+        recursion_limit: int = 100,
+        config: dict = None,
+        stream: bool = False,
+        show_welcome: bool = True,
+        working_dir: str = None,
+    ) -> bool:
+        """Async variant of run; agents execute on the event loop."""
+        return await self._run(
+            True, recursion_limit, config, stream, show_welcome, working_dir
+        )
+
+    async def _run(
+        self,
+        asynchronous: bool,
+        recursion_limit: int,
+        config: dict,
+        stream: bool,
+        show_welcome: bool,
+        working_dir: str,
+    ) -> bool:
+        """The workflow of run and arun.
+
+        Every step that blocks goes through ``_blocking`` or ``_agent_call``,
+        which only suspend when ``asynchronous`` is set; the synchronous
+        workflow therefore runs to completion without an event loop.
+        """
         try:
             self._enhance_agents()
 
@@ -40,70 +84,124 @@ class CodeGenUnit(BaseUnit):
                 self.ui.logo(ASCII_ART)
                 self.ui.help()
 
-            working_dir = working_dir or self._setup_working_directory()
+            working_dir = working_dir or await self._blocking(
+                asynchronous, self._setup_working_directory
+            )
+            self.working_dir = working_dir
+            await self._blocking(asynchronous, self._start_snapshots, working_dir)
 
-            return self._execute_generation_workflow(
-                working_dir, recursion_limit, config, stream
+            return await self._execute_generation_workflow(
+                asynchronous, working_dir, recursion_limit, config, stream
             )
 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
             self.ui.session_interrupted()
             return True
         except Exception as e:
             self.ui.error(f"Workflow execution failed: {e}")
             return False
-
-    def _execute_generation_workflow(
-        self, working_dir: str, recursion_limit: int, config: dict, stream: bool
+        finally:
+            await self._blocking(asynchronous, self._stop_background_processes)
+
+    async def _blocking(self, asynchronous: bool, func, *args, **kwargs):
+        """Call blocking code, in a worker thread when running on the event loop."""
+        if asynchronous:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    async def _agent_call(self, asynchronous: bool, agent, method: str, **kwargs):
+        """Call an agent method, or its ``a``-prefixed async variant."""
+        if asynchronous:
+            return await getattr(agent, "a" + method)(**kwargs)
+        return getattr(agent, method)(**kwargs)
+
+    def _stop_background_processes(self):
+        """Stop the servers and watchers the agent left running in this session."""
+        stopped = process_manager.stop_all()
+        if stopped:
+            self.ui.warning(f"Stopped {stopped} background process(es) left running")
+
+    async def _execute_generation_workflow(
+        self,
+        asynchronous: bool,
+        working_dir: str,
+        recursion_limit: int,
+        config: dict,
+        stream: bool,
     ) -> bool:
         """Execute the main generation workflow steps."""
         # Step 1: Context Engineering
-        if not self._run_brainstorming_phase(
-            working_dir, recursion_limit, config, stream
+        if not await self._run_brainstorming_phase(
+            asynchronous, working_dir, recursion_limit, config, stream
         ):
             return False
 
         # Step 2: Optional additional context
-        if not self._handle_additional_context(working_dir, recursion_limit, config):
+        if not await self._handle_additional_context(
+            asynchronous, working_dir, recursion_limit, config
+        ):
             return False
 
         # Step 3: Code Generation
-        if not self._run_code_generation_phase(
-            working_dir, recursion_limit, config, stream
+        if not await self._run_code_generation_phase(
+            asynchronous, working_dir, recursion_limit, config, stream
         ):
             return False
 
         # Step 4: Interactive coding session
-        return self._run_interactive_session(recursion_limit, config)
+        return await self._run_interactive_session(
+            asynchronous, recursion_limit, config
+        )
 
-    def _run_brainstorming_phase(
-        self, working_dir: str, recursion_limit: int, config: dict, stream: bool
+    async def _run_brainstorming_phase(
+        self,
+        asynchronous: bool,
+        working_dir: str,
+        recursion_limit: int,
+        config: dict,
+        stream: bool,
     ) -> bool:
         """Execute the brainstorming and context engineering phase."""
-        user_input = self.ui.get_input(
-            message=UI_MESSAGES["project_prompt"],
-            cwd=working_dir,
-        ).strip()
-
-        brainstormer_prompt = self._create_brainstormer_prompt(user_input, working_dir)
+        agent = self.agents["brainstormer"]
         configuration = config or self._create_agent_config("START", recursion_limit)
+        resume = await self._prepare_thread(asynchronous, agent, configuration)
+
+        brainstormer_prompt = None
+        if not resume:
+            user_input = await self._blocking(
+                asynchronous,
+                self.ui.get_input,
+                message=UI_MESSAGES["project_prompt"],
+                cwd=working_dir,
+            )
+            brainstormer_prompt = self._create_brainstormer_prompt(
+                user_input.strip(), working_dir
+            )
 
-        return self._execute_with_retry(
-            lambda: self.agents["brainstormer"].invoke(
-                message=brainstormer_prompt,
-                config=configuration,
-                stream=stream,
-                quiet=not stream,
-                propagate_exceptions=True,
-            ),
+        return await self._execute_with_retry(
+            asynchronous,
+            agent,
+            {
+                "message": brainstormer_prompt,
+                "config": configuration,
+                "stream": stream,
+                "quiet": not stream,
+                "propagate_exceptions": True,
+            },
             "Performing brainstorming and generating the context space...",
             UI_MESSAGES["titles"]["context_complete"],
             f"Files generated at {working_dir}",
             stream,
+            resume=resume,
         )
 
-    def _run_code_generation_phase(
-        self, working_dir: str, recursion_limit: int, config: dict, stream: bool
+    async def _run_code_generation_phase(
+        self,
+        asynchronous: bool,
+        working_dir: str,
+        recursion_limit: int,
+        config: dict,
+        stream: bool,
     ) -> bool:
         """Execute the code generation phase."""
         self.ui.status_message(
@@ -112,28 +210,35 @@ class CodeGenUnit(BaseUnit):
             style="success",
         )
 
+        agent = self.agents["code_gen"]
         codegen_prompt = self._create_codegen_prompt(working_dir)
         configuration = self._create_agent_config("START2", recursion_limit)
-
-        return self._execute_with_retry(
-            operation=lambda: self.agents["code_gen"].invoke(
-                message=codegen_prompt,
-                config=configuration,
-                stream=stream,
-                quiet=not stream,
-                propagate_exceptions=True,
-            ),
+        resume = await self._prepare_thread(asynchronous, agent, configuration)
+
+        return await self._execute_with_retry(
+            asynchronous,
+            agent,
+            invoke_kwargs={
+                "message": codegen_prompt,
+                "config": configuration,
+                "stream": stream,
+                "quiet": not stream,
+                "propagate_exceptions": True,
+            },
             status_msg="Generating project. Please wait while the coding agent does all the work...",
             success_title=UI_MESSAGES["titles"]["generation_complete"],
             success_msg=f"Code generated at {working_dir}",
             stream=stream,
+            resume=resume,
         )
 
-    def _handle_additional_context(
-        self, working_dir: str, recursion_limit: int, config: dict
+    async def _handle_additional_context(
+        self, asynchronous: bool, working_dir: str, recursion_limit: int, config: dict
     ) -> bool:
         """Handle optional additional context gathering."""
-        usr_answer = self.ui.get_input(
+        usr_answer = await self._blocking(
+            asynchronous,
+            self.ui.get_input,
             message=UI_MESSAGES["add_context"],
             default="y",
             choices=["y", "n"],
@@ -152,11 +257,17 @@ class CodeGenUnit(BaseUnit):
             configuration = config or self._create_agent_config(
                 "START", recursion_limit
             )
-            exited_safely = self.agents["brainstormer"].start_chat(
-                config=configuration, show_welcome=False
+            exited_safely = await self._agent_call(
+                asynchronous,
+                self.agents["brainstormer"],
+                "start_chat",
+                config=configuration,
+                show_welcome=False,
             )
 
-            if not exited_safely and not self.ui.confirm(
+            if not exited_safely and not await self._blocking(
+                asynchronous,
+                self.ui.confirm,
                 message=UI_MESSAGES["continue_generation"],
                 default=True,
             ):
@@ -166,7 +277,9 @@ class CodeGenUnit(BaseUnit):
 
         return True
 
-    def _run_interactive_session(self, recursion_limit: int, config: dict) -> bool:
+    async def _run_interactive_session(
+        self, asynchronous: bool, recursion_limit: int, config: dict
+    ) -> bool:
         """Run the interactive coding session."""
         self.ui.status_message(
             title=UI_MESSAGES["titles"]["codegen_ready"],
@@ -175,8 +288,12 @@ class CodeGenUnit(BaseUnit):
         )
 
         configuration = self._create_agent_config("START2", recursion_limit)
-        exited_safely = self.agents["code_gen"].start_chat(
-            config=configuration, show_welcome=False
+        exited_safely = await self._agent_call(
+            asynchronous,
+            self.agents["code_gen"],
+            "start_chat",
+            config=configuration,
+            show_welcome=False,
         )
 
         if not exited_safely:
@@ -185,37 +302,59 @@ class CodeGenUnit(BaseUnit):
 
         return True
 
-    def _execute_with_retry(
+    async def _prepare_thread(self, asynchronous: bool, agent, configuration: dict) -> bool:
+        """Decide whether a phase resumes an interrupted run on its thread.
+
+        With a persistent checkpointer a run that crashed or was interrupted
+        in an earlier process is still there. Otherwise, or if the user does
+        not want to resume it, the thread is discarded so the phase starts
+        clean.
+        """
+        if await self._agent_call(
+            asynchronous, agent, "has_pending_run", configuration=configuration
+        ) and await self._blocking(
+            asynchronous, self.ui.confirm, UI_MESSAGES["resume_run"], default=True
+        ):
+            return True
+        agent.discard_thread(configuration["configurable"]["thread_id"])
+        return False
+
+    async def _execute_with_retry(
         self,
-        operation,
+        asynchronous: bool,
+        agent,
+        invoke_kwargs: dict,
         status_msg: str,
         success_title: str,
         success_msg: str,
         stream: bool,
+        resume: bool = False,
     ):
-        """Execute an operation with retry logic and consistent UI handling."""
-        continue_flag = True
-        result = None
+        """Invoke an agent with retry logic and consistent UI handling.
 
-        while continue_flag:
+        After a recoverable failure the agent is invoked again with
+        ``resume=True`` so it continues from its last checkpoint instead of
+        starting the phase over.
+        """
+        while True:
             try:
                 if not stream:
                     with self.console.status(f"[bold]{status_msg}", spinner="dots"):
-                        result = operation()
+                        result = await self._agent_call(
+                            asynchronous, agent, "invoke", resume=resume, **invoke_kwargs
+                        )
                 else:
-                    result = operation()
-                continue_flag = False
-
-            except Exception:
-                result, continue_flag = AgentExceptionHandler.handle_agent_exceptions(
-                    operation, self.ui, propagate=True
+                    result = await self._agent_call(
+                        asynchronous, agent, "invoke", resume=resume, **invoke_kwargs
+                    )
+                break
+
+            except Exception as e:
+                _, resume = await self._blocking(
+                    asynchronous, AgentExceptionHandler.handle_exception, e, self.ui
                 )
-                if result is None:
+                if not resume:
                     return False
-                if isinstance(result, str) and continue_flag:
-                    # This is a continue prompt, update operation
-                    original_op = operation
-                    operation = lambda: original_op()  # Keep the same operation
 
         self.ui.status_message(
             title=success_title,
@@ -1,5 +1,10 @@
+import os
+
 CONSOLE_WIDTH = 100
 
+# Persistent state (checkpoints, caches) lives here unless overridden
+DATA_DIR = os.getenv("PROJECTGEN_HOME", os.path.join(os.path.expanduser("~"), ".projectgen"))
+
 THEME = {
     "primary": "#6366f1",
     "secondary": "#8b5cf6", 
@@ -22,6 +27,7 @@ UI_MESSAGES = {
     "add_context": "Add more context before code generation?",
     "continue_generation": "Continue to code generation anyway?",
     "change_models": "Change any of the current models?",
+    "resume_run": "An interrupted run was found for this project. Resume it?",
     
     "titles": {
         "current_directory": "Current Directory",